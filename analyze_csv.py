@@ -1,6 +1,33 @@
-import pandas as pd
+from core.columnar import ds, export_available, open_dataset
+
+# Prefer the columnar export (python3 export_catalogue.py): only the
+# projected columns are read, instead of parsing the whole CSV.
+if export_available('medicines'):
+    dataset = open_dataset('medicines')
+    print("Columns:", dataset.schema.names)
+    print("-" * 20)
+    first_row = dataset.head(1).to_pylist()[0]
+    for h, v in first_row.items():
+        print(f"{h}: {v}")
+    print("-" * 20)
+    classes = dataset.to_table(columns=['therapeutic_class']).column('therapeutic_class')
+    print(f"Total medicines: {len(classes)}")
+    print("Top therapeutic classes:")
+    counts = classes.value_counts().to_pylist()
+    for entry in sorted(counts, key=lambda e: e['counts'], reverse=True)[:15]:
+        print(f"  {entry['values']}: {entry['counts']}")
+    # Filters are pushed into the scan: Parquet row groups whose min/max
+    # statistics cannot match are skipped, and only the listed columns are read
+    expensive = dataset.to_table(columns=['drug_name', 'mrp'], filter=ds.field('mrp') > 1000)
+    print(f"MRP above 1000: {expensive.num_rows}")
+    for row in expensive.sort_by([('mrp', 'descending')]).slice(0, 5).to_pylist():
+        print(f"  {row['drug_name']}: {row['mrp']}")
+    missing = dataset.count_rows(filter=ds.field('dosage').is_null() | ds.field('contraindications').is_null())
+    print(f"Missing dosage or contraindications: {missing}")
+    raise SystemExit(0)
 
 try:
+    import pandas as pd
     df = pd.read_csv('data/medicine_dataset.csv', nrows=5)
     print("Columns:", df.columns.tolist())
     print("-" * 20)
@@ -1,6 +1,17 @@
-import pandas as pd
+from core.columnar import export_available, open_dataset
+
+# The columnar export stores the joined use/sideEffect columns; read just those
+if export_available('medicines'):
+    dataset = open_dataset('medicines')
+    print("Columns:", dataset.schema.names)
+    row = dataset.head(1, columns=['drug_name', 'uses', 'side_effects']).to_pylist()[0]
+    print(f"Values in row 0 for 'use' related cols:")
+    for k, v in row.items():
+        print(f"{k}: {v}")
+    raise SystemExit(0)
 
 try:
+    import pandas as pd
     df = pd.read_csv('data/medicine_dataset.csv', nrows=2)
     print("Columns:", df.columns.tolist())
     # print detailed info about columns that look like they are split (use, sideEffect)
@@ -1,16 +1,35 @@
-from fastapi import FastAPI, HTTPException, Request
+from fastapi import FastAPI, HTTPException, Query, Request, Response
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import StreamingResponse, HTMLResponse
+from fastapi.responses import StreamingResponse, HTMLResponse, JSONResponse
 from fastapi.templating import Jinja2Templates
 from fastapi.staticfiles import StaticFiles
-from pydantic import BaseModel
-from typing import Optional
-import json
+from pydantic import BaseModel, Field
+from typing import Annotated, List, Optional
 import asyncio
-from langchain_core.messages import HumanMessage, AIMessage, ToolMessage
+import hmac
+import time
+import uuid
+from langchain_core.messages import HumanMessage, AIMessage
 from core.agent_graph import app as agent_app
+from core.llm_providers import configure_http_client
+from core.http_client import create_http_client
+from core.name_index import name_index
+from core.catalogue import catalogue
+from core.monographs import monographs
+from core.cost_engine import cost_table
+from core import browse
+from core import serialization, traffic
+from core.compression import CompressionMiddleware
+from core.batch import BatchRunner, parse_batch
+from core.loop_monitor import loop_monitor
+from core.store_refresh import store_refresher
+from core import fuzzy
 
-from core.database import engine, Base
+from core.database import engine, Base, AsyncSessionLocal
+from core.config import settings
+from core.admission import agent_admission, AdmissionRejected, db_slots
+from core import metrics
+from starlette.background import BackgroundTask
 from contextlib import asynccontextmanager
 
 templates = Jinja2Templates(directory="templates")
@@ -21,11 +40,30 @@ async def lifespan(app: FastAPI):
     # Commented out for Vercel: Database is pre-seeded and filesystem might be read-only
     # async with engine.begin() as conn:
     #     await conn.run_sync(Base.metadata.create_all)
+    # Fuzzy-match name lists and medicine catalogue; already built (and shared) when preloaded by serve.py
+    if settings.PRELOAD_NAME_INDEX and not name_index.loaded:
+        await name_index.load()
+    if settings.PRELOAD_CATALOGUE and not catalogue.loaded:
+        await catalogue.load()
+    if settings.PRELOAD_CATALOGUE and not cost_table.loaded:
+        await cost_table.load()
+    if settings.MONOGRAPHS_ENABLED and not monographs.loaded:
+        await monographs.load()
+    await fuzzy.prewarm()
+    # One pooled HTTP client (keep-alive, HTTP/2) shared by every LLM call
+    http_client = create_http_client()
+    configure_http_client(http_client)
+    loop_monitor.start()
+    await store_refresher.start()
     yield
     # Shutdown: close connection
+    await store_refresher.stop()
+    await loop_monitor.stop()
+    fuzzy.shutdown()
+    await http_client.aclose()
     await engine.dispose()
 
-app = FastAPI(lifespan=lifespan)
+app = FastAPI(lifespan=lifespan, default_response_class=serialization.FastJSONResponse)
 # app.mount("/static", StaticFiles(directory="static"), name="static") # Optional if we add local assets
 
 @app.get("/", response_class=HTMLResponse)
@@ -41,63 +79,343 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# Minimum body size to compress, per path prefix (None: never). Chat and batch
+# streams are compressed line by line; health probes are too small to bother.
+COMPRESSION_ROUTES = {
+    "/api/chat": 0,
+    "/api/batch": 0,
+    "/api/catalogue": 512,
+    "/api/health": None,
+}
+if settings.COMPRESSION_ENABLED:
+    app.add_middleware(
+        CompressionMiddleware,
+        minimum_size=settings.COMPRESSION_MIN_SIZE,
+        routes=COMPRESSION_ROUTES,
+        gzip_level=settings.COMPRESSION_GZIP_LEVEL,
+        brotli_quality=settings.COMPRESSION_BROTLI_QUALITY,
+    )
+
 class ChatRequest(BaseModel):
     message: str
     thread_id: Optional[str] = None
 
+class CostRequest(BaseModel):
+    drugs: Optional[List[str]] = None
+    # Packs per drug: positive and finite, anything else is a 422
+    quantities: Optional[List[Annotated[float, Field(gt=0, allow_inf_nan=False)]]] = None
+    allow_prior_authorization: bool = True
+
 @app.post("/api/chat")
-async def chat_endpoint(request: ChatRequest):
+async def chat_endpoint(request: ChatRequest, http_request: Request):
     """
     Chat endpoint that streams the agent's response.
     """
     print(f"DEBUG: Processing chat request: {request.message}")
+    # Admission control: fail fast with Retry-After instead of piling up work
+    try:
+        ticket = await agent_admission.acquire()
+    except AdmissionRejected as rejected:
+        return JSONResponse(
+            status_code=rejected.status_code,
+            content={"detail": rejected.reason},
+            headers={"Retry-After": str(rejected.retry_after)},
+        )
+
     try:
         inputs = {"messages": [HumanMessage(content=request.message)]}
         # Config for thread_id if needed in the future for persistence
         config = {"configurable": {"thread_id": request.thread_id}} if request.thread_id else {}
 
-        # Generator for streaming response
-        async def event_generator():
-            print("DEBUG: Starting event generator")
+        request_id = uuid.uuid4().hex
+        started = time.perf_counter()
+
+        event_line = serialization.dumps_line
+        # Sampled input, context and LLM outputs for offline replay (TRAFFIC_RECORD_PATH)
+        recording = traffic.recorder.start(request_id, request.message)
+
+        # Runs the graph and queues NDJSON lines; None marks the end of the stream.
+        # Cancelling this task cancels the graph node and, through it, the
+        # in-flight LLM call and DB session.
+        async def produce(queue):
+            if recording is not None:
+                traffic.current.set(recording)
             try:
-                # Stream events from the graph
-                async for event in agent_app.astream(inputs, config=config):
-                    print(f"DEBUG: Event received: {event.keys()}")
-                    for key, value in event.items():
-                        # We can categorize events. 
-                        # If it's from 'agent', it usually contains the AIMessage.
-                        if key == "agent":
-                            # This node returns "messages": [response]
-                            messages = value.get("messages", [])
-                            if messages:
-                                last_msg = messages[-1]
-                                content = last_msg.content if hasattr(last_msg, 'content') else str(last_msg)
-                                print(f"DEBUG: Yielding content length: {len(content)}")
-                                yield json.dumps({"type": "agent", "content": content}) + "\n"
-                        elif key == "tools":
-                            # Tool outputs
-                            print("DEBUG: Tool executed")
-                            messages = value.get("messages", [])
-                            if messages and isinstance(messages[-1], ToolMessage):
-                                 yield json.dumps({"type": "tool", "content": "Executing tool..."}) + "\n"
+                async for mode, chunk in agent_app.astream(inputs, config=config, stream_mode=["custom", "updates"]):
+                    if mode == "custom":
+                        if recording is not None:
+                            recording.event(chunk)
+                        queue.put_nowait(event_line(chunk))
+                        continue
+                    update = chunk.get("agent")
+                    if not update:
+                        continue
+                    messages = update.get("messages", [])
+                    if messages:
+                        last_msg = messages[-1]
+                        content = last_msg.content if hasattr(last_msg, 'content') else str(last_msg)
+                        print(f"DEBUG: Yielding content length: {len(content)}")
+                        queue.put_nowait(event_line({"type": "agent", "content": content}))
+                        if recording is not None:
+                            recording.answer = content
+                    queue.put_nowait(event_line({"type": "summary", "timings": update.get("timings", {})}))
+                    if recording is not None:
+                        recording.timings = update.get("timings", {})
+                        traffic.recorder.write(recording)
+            except asyncio.CancelledError:
+                print(f"DEBUG: Request {request_id} cancelled")
+                metrics.incr("chat.requests_cancelled")
+                raise
             except Exception as stream_err:
                 print(f"CRITICAL STREAM ERROR: {stream_err}")
                 import traceback
                 traceback.print_exc()
-                yield json.dumps({"type": "agent", "content": f"**System Error**: {str(stream_err)}"}) + "\n"
+                queue.put_nowait(event_line({"type": "agent", "content": f"**System Error**: {str(stream_err)}"}))
+            finally:
+                queue.put_nowait(None)
+
+        def stop(producer):
+            # Exactly one cancel: a second one would interrupt the graph while
+            # it is still cancelling its node, leaving the node running
+            if not producer.done() and not producer.cancelling():
+                producer.cancel()
+
+        # Servers only surface a disconnect on the next write (heartbeats can be
+        # seconds apart), so wait for the ASGI http.disconnect message and stop
+        # the graph as soon as it arrives. A blocking receive() is used rather
+        # than polling request.is_disconnected(), whose zero-timeout cancel scope
+        # can leak a cancellation into a plain asyncio task.
+        async def watch_disconnect(producer):
+            while (await http_request.receive())["type"] != "http.disconnect":
+                pass
+            print(f"DEBUG: Client disconnected, cancelling request {request_id}")
+            stop(producer)
 
-        return StreamingResponse(event_generator(), media_type="application/x-ndjson")
+        # Generator for streaming response. NDJSON protocol, one event per line:
+        #   accepted    {request_id}               sent immediately, before any work
+        #   heartbeat   {ms}                       while no other event for STREAM_HEARTBEAT_INTERVAL
+        #   extraction  {drugs, intent, ms}        drug extraction + intent done
+        #   retrieval   {branch, found, ms}        one per retrieval branch run
+        #   first_token {ms}                       answer started (ms since request start)
+        #   delta       {content}                  answer text, appended in order
+        #   agent       {content}                  the complete answer
+        #   summary     {timings}                  per-stage durations in ms
+        async def event_generator():
+            print(f"DEBUG: Starting event generator for request {request_id}")
+            queue = asyncio.Queue()
+            producer = watcher = None
+            try:
+                # First bytes go out before any work so proxies see a live response
+                yield event_line({"type": "accepted", "request_id": request_id})
+                producer = asyncio.create_task(produce(queue))
+                watcher = asyncio.create_task(watch_disconnect(producer))
+                while True:
+                    try:
+                        line = await asyncio.wait_for(queue.get(), timeout=settings.STREAM_HEARTBEAT_INTERVAL)
+                    except asyncio.TimeoutError:
+                        metrics.incr("chat.heartbeats")
+                        elapsed = round((time.perf_counter() - started) * 1000, 1)
+                        yield event_line({"type": "heartbeat", "ms": elapsed})
+                        continue
+                    if line is None:
+                        break
+                    yield line
+            finally:
+                # Stream closed early (client gone): stop the LLM and DB work too.
+                # Nothing is awaited here; the response may be tearing down.
+                if watcher is not None:
+                    watcher.cancel()
+                if producer is not None:
+                    stop(producer)
+                ticket.release()
+
+        # The background task covers streams that are never started (client gone)
+        return StreamingResponse(
+            event_generator(),
+            media_type="application/x-ndjson",
+            headers={
+                "X-Request-ID": request_id,
+                # Ask proxies (nginx, CDNs, serverless front-ends) not to buffer the stream
+                "Cache-Control": "no-cache",
+                "X-Accel-Buffering": "no",
+            },
+            background=BackgroundTask(ticket.release),
+        )
 
     except Exception as e:
+        ticket.release()
         print(f"CRITICAL ENDPOINT ERROR: {e}")
         import traceback
         traceback.print_exc()
         raise HTTPException(status_code=500, detail=str(e))
 
+@app.post("/api/batch")
+async def batch_endpoint(http_request: Request):
+    """
+    Offline bulk answering. The body is JSONL, one {"id", "message"} per line;
+    results stream back as JSONL in completion order, one line per query,
+    with "answer" or "error". To resume, resubmit only the ids without an answer.
+    """
+    try:
+        queries = parse_batch((await http_request.body()).decode().splitlines())
+    except (ValueError, UnicodeDecodeError) as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    if len(queries) > settings.BATCH_MAX_QUERIES:
+        raise HTTPException(status_code=413, detail=f"At most {settings.BATCH_MAX_QUERIES} queries per batch")
+    print(f"DEBUG: Processing batch of {len(queries)} queries")
+
+    # A batch holds one agent slot; BATCH_CONCURRENCY caps it internally
+    try:
+        ticket = await agent_admission.acquire()
+    except AdmissionRejected as rejected:
+        return JSONResponse(
+            status_code=rejected.status_code,
+            content={"detail": rejected.reason},
+            headers={"Retry-After": str(rejected.retry_after)},
+        )
+
+    async def result_lines():
+        try:
+            async for result in BatchRunner().run(queries):
+                yield serialization.dumps_line(result)
+        finally:
+            ticket.release()
+
+    return StreamingResponse(
+        result_lines(),
+        media_type="application/x-ndjson",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+        background=BackgroundTask(ticket.release),
+    )
+
+@app.post("/api/costs")
+async def costs_endpoint(request: CostRequest):
+    """
+    Out-of-pocket comparison across plans. With one drug: its plans, cheapest
+    first. With several (optionally with pack quantities), or none for the
+    whole formulary: each plan's total for the basket, cheapest first.
+    """
+    if request.quantities is not None and (request.drugs is None or len(request.quantities) != len(request.drugs)):
+        raise HTTPException(status_code=400, detail="quantities needs one entry per drug")
+    if not cost_table.loaded:
+        await cost_table.load()
+    start = time.perf_counter()
+    if request.drugs is not None and len(request.drugs) == 1 and request.quantities is None:
+        result = {"drug": request.drugs[0],
+                  "plans": cost_table.cheapest_plans(request.drugs[0], limit=len(cost_table.plan_names),
+                                                     allow_prior_auth=request.allow_prior_authorization)}
+    else:
+        result = cost_table.compare_plans(request.drugs, request.quantities, request.allow_prior_authorization)
+    metrics.incr("costs.requests")
+    return {**result, "ms": round((time.perf_counter() - start) * 1000, 2)}
+
+async def browse_response(request: Request, build):
+    """
+    Compact JSON for the catalogue browsing endpoints. The ETag comes from the
+    data version and the query, so an unchanged listing is answered 304
+    without touching the database.
+    """
+    tag = browse.etag(await browse.data_version.get(), request.url.path, sorted(request.query_params.multi_items()))
+    headers = {"ETag": tag, "Cache-Control": "public, no-cache"}
+    if tag in [t.strip() for t in request.headers.get("if-none-match", "").split(",")]:
+        metrics.incr("browse.not_modified")
+        return Response(status_code=304, headers=headers)
+    try:
+        async with db_slots, AsyncSessionLocal() as session:
+            payload = await build(session)
+    except browse.BadCursor as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    metrics.incr("browse.requests")
+    return Response(serialization.dumps(payload), media_type="application/json", headers=headers)
+
+@app.get("/api/catalogue/classes")
+async def browse_classes(request: Request, kind: str = "therapeutic"):
+    """Every therapeutic, action or chemical class with its number of medicines."""
+    if kind not in browse.CLASS_COLUMNS:
+        raise HTTPException(status_code=400, detail=f"kind must be one of {', '.join(browse.CLASS_COLUMNS)}")
+    return await browse_response(request, lambda session: browse.class_counts(session, kind))
+
+@app.get("/api/catalogue/medicines")
+async def browse_medicines(
+    request: Request,
+    therapeutic_class: Optional[str] = None,
+    action_class: Optional[str] = None,
+    chemical_class: Optional[str] = None,
+    prefix: Optional[str] = None,
+    cursor: Optional[str] = None,
+    limit: int = Query(settings.BROWSE_PAGE_SIZE, ge=1, le=settings.BROWSE_MAX_PAGE_SIZE),
+):
+    """
+    Medicines by class and/or name prefix, ordered by name. Pass the
+    returned "next" as cursor for the following page; null means the end.
+    """
+    async def build(session):
+        class_ids = {}
+        for kind, name in (("therapeutic", therapeutic_class), ("action", action_class), ("chemical", chemical_class)):
+            if name:
+                class_ids[kind] = await browse.resolve_class(session, name)
+                if class_ids[kind] is None:
+                    raise HTTPException(status_code=404, detail=f"Unknown {kind} class: {name}")
+        return await browse.list_medicines(session, class_ids, prefix, cursor, limit)
+
+    return await browse_response(request, build)
+
+@app.get("/api/catalogue/plans")
+async def browse_plans(request: Request):
+    """Insurance plans with their number of reimbursement schemes."""
+    return await browse_response(request, browse.plan_counts)
+
+@app.get("/api/catalogue/plans/{plan_id}/medicines")
+async def browse_plan_medicines(
+    request: Request,
+    plan_id: int,
+    prefix: Optional[str] = None,
+    cursor: Optional[str] = None,
+    limit: int = Query(settings.BROWSE_PAGE_SIZE, ge=1, le=settings.BROWSE_MAX_PAGE_SIZE),
+):
+    """Drugs a plan covers, with coverage terms, ordered by name (keyset pages like /api/catalogue/medicines)."""
+    async def build(session):
+        if not await browse.plan_exists(session, plan_id):
+            raise HTTPException(status_code=404, detail=f"Unknown plan id: {plan_id}")
+        return await browse.list_plan_medicines(session, plan_id, prefix, cursor, limit)
+
+    return await browse_response(request, build)
+
 @app.get("/api/health")
 async def health_check():
     return {"status": "ok"}
 
+@app.get("/api/metrics")
+async def metrics_endpoint():
+    return {
+        "counters": metrics.snapshot(),
+        "admission": agent_admission.stats(),
+        "event_loop": loop_monitor.stats(),
+        "catalogue": catalogue.stats(),
+        "monographs": monographs.stats(),
+        "cost_table": cost_table.stats(),
+        "store_refresh": store_refresher.stats(),
+    }
+
+def require_admin(request: Request):
+    """Admin endpoints take ADMIN_TOKEN as a bearer token; without one configured they are off."""
+    scheme, _, token = request.headers.get("authorization", "").partition(" ")
+    if not settings.ADMIN_TOKEN or scheme.lower() != "bearer" or not hmac.compare_digest(
+        token.strip().encode(), settings.ADMIN_TOKEN.encode()
+    ):
+        raise HTTPException(status_code=403, detail="Admin token required")
+
+@app.post("/api/catalogue/refresh")
+async def refresh_catalogue(request: Request):
+    """
+    Reload the in-memory stores of this worker now (admin only). The other
+    workers notice the changed data version within STORE_REFRESH_INTERVAL
+    and reload on their own.
+    """
+    require_admin(request)
+    await store_refresher.refresh(force=True)
+    return {**catalogue.stats(), "cost_table": cost_table.stats(), "monographs": monographs.stats()}
+
 @app.get("/api/debug")
 async def debug_endpoint():
     import os
@@ -0,0 +1,92 @@
+import argparse
+import asyncio
+import json
+import os
+import time
+import httpx
+from core.batch import BatchRunner, parse_batch
+from core.catalogue import catalogue
+from core.database import engine
+from core.http_client import create_http_client
+from core.llm_providers import configure_http_client
+from core.name_index import name_index
+
+
+def load_done(output_path):
+    """Ids that already have an answer in the output file (the checkpoint)."""
+    done = set()
+    if not os.path.exists(output_path):
+        return done
+    with open(output_path) as f:
+        for line in f:
+            try:
+                result = json.loads(line)
+            except json.JSONDecodeError:
+                continue  # torn last line from an interrupted run
+            if "answer" in result:
+                done.add(str(result["id"]))
+    return done
+
+
+async def run_local(queries, concurrency):
+    await name_index.load()
+    await catalogue.load()
+    http_client = create_http_client()
+    configure_http_client(http_client)
+    try:
+        async for result in BatchRunner(concurrency).run(queries):
+            yield result
+    finally:
+        await http_client.aclose()
+        await engine.dispose()
+
+
+async def run_remote(queries, url):
+    body = "".join(json.dumps({"id": q.id, "message": q.message}) + "\n" for q in queries)
+    async with httpx.AsyncClient(timeout=None) as client:
+        async with client.stream("POST", f"{url}/api/batch", content=body,
+                                 headers={"Content-Type": "application/x-ndjson"}) as response:
+            if response.status_code != 200:
+                await response.aread()
+                raise SystemExit(f"Batch rejected ({response.status_code}): {response.text}")
+            async for line in response.aiter_lines():
+                if line:
+                    yield json.loads(line)
+
+
+async def main(args):
+    with open(args.input) as f:
+        queries = parse_batch(f)
+    done = load_done(args.output)
+    pending = [q for q in queries if q.id not in done]
+    print(f"Queries: {len(queries)}, already answered: {len(queries) - len(pending)}, to run: {len(pending)}")
+    if not pending:
+        return
+
+    results = run_remote(pending, args.url) if args.url else run_local(pending, args.concurrency)
+    answered = failed = 0
+    start = time.perf_counter()
+    # Appending one flushed line per result makes the output file the checkpoint:
+    # rerunning the same command skips every id that already has an answer
+    with open(args.output, "a") as out:
+        async for result in results:
+            out.write(json.dumps(result) + "\n")
+            out.flush()
+            if "answer" in result:
+                answered += 1
+            else:
+                failed += 1
+    elapsed = time.perf_counter() - start
+    print(f"Answered {answered}, failed {failed} in {elapsed:.1f}s ({len(pending) / elapsed:.1f} queries/s)")
+    if failed:
+        print("Rerun the same command to retry the failed queries.")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Answer a JSONL file of drug questions in bulk")
+    parser.add_argument("input", help='JSONL file, one {"id": ..., "message": ...} per line')
+    parser.add_argument("-o", "--output", default="data/batch_results.jsonl", help="JSONL results; also the resume checkpoint")
+    parser.add_argument("--concurrency", type=int, default=None, help="LLM calls in flight (default: BATCH_CONCURRENCY)")
+    parser.add_argument("--url", help="send the batch to a running server (e.g. http://127.0.0.1:8000) instead of running in-process")
+    args = parser.parse_args()
+    asyncio.run(main(args))
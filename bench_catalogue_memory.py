@@ -0,0 +1,78 @@
+import argparse
+import asyncio
+import gc
+import time
+import tracemalloc
+from sqlalchemy import select
+from core import dictionaries
+from core.catalogue import Catalogue
+from core.database import AsyncSessionLocal
+from core.singleflight import normalize_key
+from models.models import Medicine
+from tools.drug_db_tool import format_details
+
+
+async def measure(build):
+    """Run `build` and return (result, bytes still allocated by it)."""
+    gc.collect()
+    tracemalloc.start()
+    before = tracemalloc.take_snapshot()
+    result = await build()
+    gc.collect()
+    after = tracemalloc.take_snapshot()
+    tracemalloc.stop()
+    allocated = sum(stat.size_diff for stat in after.compare_to(before, "filename"))
+    return result, allocated
+
+
+async def load_orm():
+    session = AsyncSessionLocal()
+    result = await session.execute(select(Medicine).order_by(Medicine.id))
+    rows = result.scalars().all()
+    # The session keeps its identity map alive, as it does during a request
+    return session, rows
+
+
+async def load_catalogue():
+    catalogue = Catalogue()
+    await catalogue.load()
+    return catalogue
+
+
+def time_lookups(label, lookup, names, rounds):
+    start = time.perf_counter()
+    for _ in range(rounds):
+        for name in names:
+            format_details(lookup(name))
+    elapsed = time.perf_counter() - start
+    print(f"{label}: {elapsed / (rounds * len(names)) * 1e6:.1f} us per lookup+format")
+
+
+async def main(rounds):
+    async with AsyncSessionLocal() as session:
+        await dictionaries.load(session)
+
+    (session, rows), orm_bytes = await measure(load_orm)
+    catalogue, catalogue_bytes = await measure(load_catalogue)
+    count = len(rows)
+    if not count:
+        raise SystemExit("No medicines in the database; seed it first")
+
+    print(f"Medicines: {count}")
+    print(f"ORM objects:       {orm_bytes / 1024 / 1024:8.2f} MB, {orm_bytes / count:7.0f} bytes/record")
+    print(f"Catalogue records: {catalogue_bytes / 1024 / 1024:8.2f} MB, {catalogue_bytes / count:7.0f} bytes/record")
+
+    names = [row.drug_name for row in rows[:1000]]
+    orm_by_name = {}
+    for row in rows:
+        orm_by_name.setdefault(normalize_key(row.drug_name), row)
+    time_lookups("ORM objects      ", lambda name: orm_by_name[normalize_key(name)], names, rounds)
+    time_lookups("Catalogue records", catalogue.get, names, rounds)
+    await session.close()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Memory per record: ORM Medicine objects vs the in-memory catalogue")
+    parser.add_argument("--rounds", type=int, default=20, help="lookup timing rounds")
+    args = parser.parse_args()
+    asyncio.run(main(args.rounds))
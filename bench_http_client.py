@@ -0,0 +1,115 @@
+import argparse
+import asyncio
+import json
+import time
+import httpx
+from core.http_client import create_http_client
+
+# OpenAI-compatible chat completion body returned by the stub server
+COMPLETION = json.dumps({
+    "id": "chatcmpl-stub",
+    "object": "chat.completion",
+    "created": 0,
+    "model": "stub",
+    "choices": [{"index": 0, "finish_reason": "stop", "message": {"role": "assistant", "content": "Cetirizine"}}],
+    "usage": {"prompt_tokens": 10, "completion_tokens": 1, "total_tokens": 11},
+}).encode()
+
+
+class StubServer:
+    """
+    Minimal HTTP/1.1 keep-alive server standing in for OpenRouter.
+    `handshake_ms` is slept once per new connection to emulate TCP+TLS setup
+    to a remote provider (a local socket has almost no setup cost).
+    """
+
+    def __init__(self, handshake_ms: float):
+        self.handshake = handshake_ms / 1000
+        self.connections = 0
+        self.requests = 0
+
+    async def handle(self, reader, writer):
+        self.connections += 1
+        await asyncio.sleep(self.handshake)
+        try:
+            while True:
+                head = await reader.readuntil(b"\r\n\r\n")
+                length = 0
+                for line in head.decode().split("\r\n"):
+                    if line.lower().startswith("content-length:"):
+                        length = int(line.split(":", 1)[1])
+                if length:
+                    await reader.readexactly(length)
+                self.requests += 1
+                writer.write(
+                    b"HTTP/1.1 200 OK\r\nContent-Type: application/json\r\n"
+                    b"Connection: keep-alive\r\nContent-Length: " + str(len(COMPLETION)).encode() + b"\r\n\r\n" + COMPLETION
+                )
+                await writer.drain()
+        except (asyncio.IncompleteReadError, ConnectionResetError):
+            pass
+        finally:
+            writer.close()
+
+    async def start(self):
+        self.server = await asyncio.start_server(self.handle, "127.0.0.1", 0)
+        return self.server.sockets[0].getsockname()[1]
+
+
+async def post_completion(client, url):
+    response = await client.post(url, json={"model": "stub", "messages": [{"role": "user", "content": "hi"}]})
+    response.raise_for_status()
+
+
+async def run_fresh_clients(url, requests, concurrency):
+    # Baseline: a new client (and so a new connection) per call
+    async def one():
+        async with httpx.AsyncClient() as client:
+            await post_completion(client, url)
+    await run_concurrently(one, requests, concurrency)
+
+
+async def run_shared_client(url, requests, concurrency):
+    client = create_http_client()
+    try:
+        await run_concurrently(lambda: post_completion(client, url), requests, concurrency)
+    finally:
+        await client.aclose()
+
+
+async def run_concurrently(fn, requests, concurrency):
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def guarded():
+        async with semaphore:
+            await fn()
+    await asyncio.gather(*[guarded() for _ in range(requests)])
+
+
+async def bench(requests, concurrency, handshake_ms):
+    print(f"Requests: {requests}, concurrency: {concurrency}, simulated handshake: {handshake_ms}ms")
+    for label, runner in [("fresh client per call", run_fresh_clients), ("shared pooled client", run_shared_client)]:
+        stub = StubServer(handshake_ms)
+        port = await stub.start()
+        url = f"http://127.0.0.1:{port}/v1/chat/completions"
+
+        start = time.perf_counter()
+        await runner(url, requests, concurrency)
+        elapsed = time.perf_counter() - start
+
+        stub.server.close()
+        await stub.server.wait_closed()
+        print(
+            f"{label:<24} total {elapsed * 1000:8.1f}ms  "
+            f"per call {elapsed * 1000 / requests:6.2f}ms  "
+            f"connections opened {stub.connections}"
+        )
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark LLM HTTP connection reuse against a local stub server")
+    parser.add_argument("--requests", type=int, default=200)
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument("--handshake-ms", type=float, default=30.0)
+    args = parser.parse_args()
+    asyncio.run(bench(args.requests, args.concurrency, args.handshake_ms))
@@ -0,0 +1,143 @@
+import argparse
+import asyncio
+import json
+import re
+import time
+import zlib
+from core import browse
+from core.catalogue import catalogue
+from core.compression import _Compressor, brotli
+from core.cost_engine import cost_table
+from core.database import AsyncSessionLocal
+from core.fastpath import CLINICAL_TEMPLATES, fastpath
+from tools.commercial_tools import compare_reimbursement_schemes
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+DRUG = "Metformin"
+
+# Serializers as the endpoints used them before (stdlib) and now
+SERIALIZERS = {
+    # event_generator / batch lines: json.dumps(payload)
+    "json": lambda obj: json.dumps(obj).encode(),
+    # FastAPI JSONResponse.render and the browse endpoints
+    "json-compact": lambda obj: json.dumps(obj, separators=(",", ":"), ensure_ascii=False).encode(),
+}
+if orjson is not None:
+    SERIALIZERS["orjson"] = lambda obj: orjson.dumps(obj, option=orjson.OPT_SERIALIZE_NUMPY | orjson.OPT_NON_STR_KEYS)
+ENCODINGS = ["gzip", "br"] if brotli is not None else ["gzip"]
+
+
+async def answer_markdown():
+    """A long answer: every clinical section of one drug plus its scheme comparison."""
+    record = catalogue.get(DRUG)
+    sections = [fastpath.render_clinical(label, record) for label in CLINICAL_TEMPLATES]
+    sections.append(await compare_reimbursement_schemes.ainvoke(DRUG))
+    return "\n\n".join(s for s in sections if s)
+
+
+def chat_events(answer):
+    """The NDJSON events of one /api/chat answer, with the answer streamed as token-sized deltas."""
+    deltas = re.findall(r"\S*\s*", answer)
+    events = [
+        {"type": "accepted", "request_id": "9f0c6b1e2d3a4f5e8a7b6c5d4e3f2a1b"},
+        {"type": "extraction", "drugs": [DRUG], "intent": ["overview"], "ms": 412.7},
+        {"type": "retrieval", "branch": "clinical", "found": 1, "ms": 3.1},
+        {"type": "retrieval", "branch": "reimbursement", "found": 1, "ms": 4.8},
+        {"type": "first_token", "ms": 1210.4},
+    ]
+    events += [{"type": "delta", "content": d} for d in deltas if d]
+    events += [
+        {"type": "agent", "content": answer},
+        {"type": "summary", "timings": {"extraction": 412.7, "retrieval": 8.2, "answer": 2960.1,
+                                         "first_token": 1210.4, "total": 3381.0}},
+    ]
+    return events
+
+
+async def payloads():
+    await catalogue.load()
+    await cost_table.load()
+    answer = await answer_markdown()
+    async with AsyncSessionLocal() as session:
+        page = await browse.list_medicines(session, {}, None, None, 500)
+        classes = await browse.class_counts(session, "therapeutic")
+    batch = [{"id": f"q-{i:04d}", "drugs": [DRUG], "intent": ["dosage"], "answer": answer[:600], "ms": 3.2}
+             for i in range(200)]
+    return {
+        # name: (payload, streamed as NDJSON lines)
+        "health": ({"status": "ok"}, False),
+        "chat stream": (chat_events(answer), True),
+        "batch (200 lines)": (batch, True),
+        "browse page (500)": (page, False),
+        "browse classes": (classes, False),
+        "costs: one drug": ({"drug": DRUG, "plans": cost_table.cheapest_plans(DRUG, limit=100)}, False),
+        "costs: formulary": (cost_table.compare_plans(), False),
+    }
+
+
+def cpu_us(fn, repeat):
+    start = time.process_time()
+    for _ in range(repeat):
+        fn()
+    return (time.process_time() - start) / repeat * 1e6
+
+
+def serialize(dumps, payload, streamed):
+    if streamed:
+        return [dumps(item) + b"\n" for item in payload]
+    return [dumps(payload)]
+
+
+def compress(chunks, encoding):
+    """Wire bytes as CompressionMiddleware sends them: one flush per streamed chunk."""
+    compressor = _Compressor(encoding, gzip_level=6, brotli_quality=4)
+    out = 0
+    for chunk in chunks[:-1]:
+        out += len(compressor.compress(chunk) + compressor.flush())
+    return out + len(compressor.compress(chunks[-1]) + compressor.finish())
+
+
+async def main(repeat):
+    rows = []
+    data = await payloads()
+    for name, (payload, streamed) in data.items():
+        for serializer, dumps in SERIALIZERS.items():
+            chunks = serialize(dumps, payload, streamed)
+            row = {
+                "payload": name,
+                "serializer": serializer,
+                "chunks": len(chunks),
+                "bytes": sum(map(len, chunks)),
+                "serialize_us": cpu_us(lambda: serialize(dumps, payload, streamed), repeat),
+            }
+            for encoding in ENCODINGS:
+                row[f"{encoding}_bytes"] = compress(chunks, encoding)
+                row[f"{encoding}_us"] = cpu_us(lambda: compress(chunks, encoding), repeat)
+            rows.append(row)
+
+    header = ["payload", "serializer", "chunks", "bytes", "serialize µs"]
+    for encoding in ENCODINGS:
+        header += [f"{encoding} bytes", f"{encoding} µs"]
+    print("| " + " | ".join(header) + " |")
+    print("| " + " | ".join("---" for _ in header) + " |")
+    for row in rows:
+        cells = [row["payload"], row["serializer"], row["chunks"], row["bytes"], f"{row['serialize_us']:.1f}"]
+        for encoding in ENCODINGS:
+            cells += [row[f"{encoding}_bytes"], f"{row[f'{encoding}_us']:.1f}"]
+        print("| " + " | ".join(map(str, cells)) + " |")
+    if brotli is None:
+        print("\nbrotli not installed (pip install brotli): gzip only")
+    # Flushing per line costs a few bytes per chunk; compare with one flush at the end
+    whole = zlib.compress(b"".join(serialize(SERIALIZERS["json"], data["chat stream"][0], True)), 6)
+    print(f"\nchat stream gzip in one piece (no per-line flush): {len(whole)} bytes")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Bytes on the wire and CPU per response: json vs orjson, gzip/brotli")
+    parser.add_argument("--repeat", type=int, default=200, help="Iterations per CPU measurement")
+    args = parser.parse_args()
+    asyncio.run(main(args.repeat))
@@ -0,0 +1,91 @@
+import argparse
+import asyncio
+import os
+import subprocess
+import sys
+import time
+import httpx
+
+# Mix of exact names, typos (fuzzy path) and intents
+QUERIES = [
+    "What is the dosage of Metformin?",
+    "Side effects of Citrizine",
+    "Which schemes reimburse Paracutamal",
+    "Compare Ibuprofen and Diclofenac",
+    "Tell me about Atorvastatn",
+    "What is Pantoprazol used for?",
+    "Is Alprazolm habit forming?",
+    "Insurance coverage for Telmisartn",
+]
+
+
+async def wait_until_ready(base_url, timeout=60):
+    deadline = time.monotonic() + timeout
+    async with httpx.AsyncClient() as client:
+        while time.monotonic() < deadline:
+            try:
+                if (await client.get(f"{base_url}/api/health")).status_code == 200:
+                    return
+            except httpx.TransportError:
+                pass
+            await asyncio.sleep(0.5)
+    raise RuntimeError("Server did not become ready")
+
+
+async def load(base_url, duration, concurrency):
+    latencies = []
+    rejected = 0
+    deadline = time.monotonic() + duration
+
+    async with httpx.AsyncClient(timeout=60, limits=httpx.Limits(max_connections=concurrency)) as client:
+        async def user(offset):
+            nonlocal rejected
+            i = offset
+            while time.monotonic() < deadline:
+                start = time.perf_counter()
+                response = await client.post(f"{base_url}/api/chat", json={"message": f"{QUERIES[i % len(QUERIES)]} ({i})"})
+                await response.aread()
+                if response.status_code == 200:
+                    latencies.append(time.perf_counter() - start)
+                else:
+                    rejected += 1
+                i += concurrency
+
+        await asyncio.gather(*[user(n) for n in range(concurrency)])
+
+    latencies.sort()
+    p = lambda q: latencies[int(q * (len(latencies) - 1))] * 1000 if latencies else 0
+    return len(latencies) / duration, p(0.5), p(0.95), rejected
+
+
+async def bench(worker_counts, duration, concurrency, port):
+    env = dict(os.environ)
+    # Measure serving throughput, not the upstream LLM
+    env.setdefault("EXTRACTION_PROVIDER", "stub")
+    env.setdefault("ANSWER_PROVIDER", "stub")
+
+    print(f"CPU cores: {os.cpu_count()}, concurrency: {concurrency}, duration: {duration}s per run")
+    print(f"{'workers':>7} {'req/s':>8} {'p50 ms':>8} {'p95 ms':>8} {'rejected':>9}")
+    for workers in worker_counts:
+        server = subprocess.Popen(
+            [sys.executable, "serve.py", "--workers", str(workers), "--port", str(port)],
+            env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+        )
+        base_url = f"http://127.0.0.1:{port}"
+        try:
+            await wait_until_ready(base_url)
+            rps, p50, p95, rejected = await load(base_url, duration, concurrency)
+            print(f"{workers:>7} {rps:>8.1f} {p50:>8.1f} {p95:>8.1f} {rejected:>9}")
+        finally:
+            server.terminate()
+            server.wait()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Requests per second versus worker count (stub LLM)")
+    parser.add_argument("--workers", default="1,2,4", help="comma-separated worker counts")
+    parser.add_argument("--duration", type=float, default=20)
+    parser.add_argument("--concurrency", type=int, default=32)
+    parser.add_argument("--port", type=int, default=8765)
+    args = parser.parse_args()
+    asyncio.run(bench([int(w) for w in args.workers.split(",")], args.duration, args.concurrency, args.port))
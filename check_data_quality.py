@@ -0,0 +1,219 @@
+import argparse
+import asyncio
+import json
+import random
+import sys
+from datetime import datetime, timezone
+from sqlalchemy import select, func
+from core import dictionaries
+from core.database import AsyncSessionLocal
+from models.models import Medicine, ReimbursementScheme
+
+# Rows fetched per round trip; memory stays flat regardless of table size
+STREAM_BATCH_SIZE = 5000
+
+# Text columns profiled for nulls/empties and length distribution
+# (class columns are interned ids, profiled through their dictionary)
+PROFILED_COLUMNS = [
+    "drug_name", "uses", "side_effects", "substitutes", "dosage", "contraindications",
+    "therapeutic_class", "chemical_class", "action_class", "habit_forming",
+]
+
+# Gate thresholds; a report fails if any check fails
+DEFAULT_THRESHOLDS = {
+    "max_null_rate": {"drug_name": 0.0, "uses": 0.25},
+    "max_duplicate_name_rate": 0.01,
+    "max_orphaned_scheme_drugs": 0,
+}
+
+# Upper bounds of the length histogram buckets (last bucket is open-ended)
+LENGTH_BUCKETS = [0, 8, 16, 32, 64, 128, 256, 512, 1024, 4096]
+
+EXAMPLE_LIMIT = 20
+
+
+class ColumnProfile:
+    """Streaming null-rate and length statistics for one column."""
+
+    def __init__(self):
+        self.nulls = 0
+        self.empty = 0
+        self.count = 0
+        self.total_length = 0
+        self.min_length = None
+        self.max_length = 0
+        self.histogram = [0] * (len(LENGTH_BUCKETS) + 1)
+
+    def add(self, value):
+        self.count += 1
+        if value is None:
+            self.nulls += 1
+            return
+        length = len(value.strip())
+        if length == 0:
+            self.empty += 1
+        self.total_length += length
+        self.max_length = max(self.max_length, length)
+        self.min_length = length if self.min_length is None else min(self.min_length, length)
+        for i, bound in enumerate(LENGTH_BUCKETS):
+            if length <= bound:
+                self.histogram[i] += 1
+                break
+        else:
+            self.histogram[-1] += 1
+
+    def report(self) -> dict:
+        present = self.count - self.nulls
+        labels = [f"<={b}" for b in LENGTH_BUCKETS] + [f">{LENGTH_BUCKETS[-1]}"]
+        return {
+            "null_rate": round((self.nulls + self.empty) / self.count, 6) if self.count else 0.0,
+            "nulls": self.nulls,
+            "empty": self.empty,
+            "length": {
+                "min": self.min_length or 0,
+                "max": self.max_length,
+                "mean": round(self.total_length / present, 2) if present else 0.0,
+                "histogram": dict(zip(labels, self.histogram)),
+            },
+        }
+
+
+async def profile_medicines(session, sample_size: int) -> dict:
+    """One streaming pass: per-column profiles plus a reservoir sample (Algorithm R)."""
+    interned = dictionaries.LABEL_COLUMNS[Medicine]
+    columns = [getattr(Medicine, interned[name][0] if name in interned else name) for name in PROFILED_COLUMNS]
+    lookups = [interned[name][1].labels if name in interned else None for name in PROFILED_COLUMNS]
+    profiles = {name: ColumnProfile() for name in PROFILED_COLUMNS}
+    await dictionaries.load(session)
+    sample = []
+    seen = 0
+    min_id = max_id = None
+
+    result = await session.stream(select(Medicine.id, *columns))
+    async for rows in result.partitions(STREAM_BATCH_SIZE):
+        for row in rows:
+            row_id = row[0]
+            min_id = row_id if min_id is None else min(min_id, row_id)
+            max_id = row_id if max_id is None else max(max_id, row_id)
+            row = [row_id] + [
+                lookup.get(value) if lookup is not None else value
+                for lookup, value in zip(lookups, row[1:])
+            ]
+            for name, value in zip(PROFILED_COLUMNS, row[1:]):
+                profiles[name].add(value)
+
+            seen += 1
+            if len(sample) < sample_size:
+                sample.append(row)
+            else:
+                j = random.randrange(seen)
+                if j < sample_size:
+                    sample[j] = row
+
+    id_span = (max_id - min_id + 1) if seen else 0
+    return {
+        "rows": seen,
+        "id_range": [min_id, max_id],
+        "id_gaps": id_span - seen,
+        "columns": {name: profile.report() for name, profile in profiles.items()},
+        "sample": [dict(zip(["id"] + PROFILED_COLUMNS, row)) for row in sample],
+    }
+
+
+async def find_duplicate_names(session) -> dict:
+    # Grouping happens in the database; only the offending names come back
+    normalized = func.lower(func.trim(Medicine.drug_name))
+    stmt = (
+        select(normalized, func.count())
+        .group_by(normalized)
+        .having(func.count() > 1)
+        .order_by(func.count().desc())
+    )
+    result = await session.stream(stmt)
+    count = extra_rows = 0
+    examples = []
+    async for name, n in result:
+        count += 1
+        extra_rows += n - 1
+        if len(examples) < EXAMPLE_LIMIT:
+            examples.append({"name": name, "rows": n})
+    return {"distinct_names": count, "extra_rows": extra_rows, "examples": examples}
+
+
+async def find_orphaned_schemes(session) -> dict:
+    # Same case-insensitive matching the tools use to join schemes to medicines.
+    # NULL names are excluded: one NULL in a NOT IN list makes it NULL for every row.
+    known = select(func.lower(Medicine.drug_name)).where(Medicine.drug_name.is_not(None))
+    stmt = (
+        select(ReimbursementScheme.drug_name, func.count())
+        .where(func.lower(ReimbursementScheme.drug_name).not_in(known))
+        .group_by(ReimbursementScheme.drug_name)
+    )
+    result = await session.stream(stmt)
+    count = rows = 0
+    examples = []
+    async for name, n in result:
+        count += 1
+        rows += n
+        if len(examples) < EXAMPLE_LIMIT:
+            examples.append({"drug_name": name, "schemes": n})
+    total = (await session.execute(select(func.count(ReimbursementScheme.id)))).scalar()
+    return {"rows": total, "orphaned_drug_names": count, "orphaned_rows": rows, "examples": examples}
+
+
+def evaluate(report: dict, thresholds: dict) -> list:
+    medicines = report["medicines"]
+    checks = []
+    for column, limit in thresholds["max_null_rate"].items():
+        value = medicines["columns"][column]["null_rate"]
+        checks.append({"check": f"null_rate.{column}", "value": value, "max": limit, "passed": value <= limit})
+
+    rows = medicines["rows"]
+    duplicate_rate = round(report["duplicates"]["extra_rows"] / rows, 6) if rows else 0.0
+    limit = thresholds["max_duplicate_name_rate"]
+    checks.append({"check": "duplicate_name_rate", "value": duplicate_rate, "max": limit, "passed": duplicate_rate <= limit})
+
+    orphans = report["reimbursement_schemes"]["orphaned_drug_names"]
+    limit = thresholds["max_orphaned_scheme_drugs"]
+    checks.append({"check": "orphaned_scheme_drugs", "value": orphans, "max": limit, "passed": orphans <= limit})
+    return checks
+
+
+async def run_checks(sample_size: int = 5, thresholds: dict = DEFAULT_THRESHOLDS) -> dict:
+    async with AsyncSessionLocal() as session:
+        report = {
+            "generated_at": datetime.now(timezone.utc).isoformat(),
+            "medicines": await profile_medicines(session, sample_size),
+            "duplicates": await find_duplicate_names(session),
+            "reimbursement_schemes": await find_orphaned_schemes(session),
+        }
+    report["checks"] = evaluate(report, thresholds)
+    report["passed"] = all(check["passed"] for check in report["checks"])
+    return report
+
+
+def print_summary(report: dict):
+    medicines = report["medicines"]
+    print(f"Medicines: {medicines['rows']} rows, {medicines['id_gaps']} id gaps")
+    print(f"Duplicate normalized names: {report['duplicates']['distinct_names']}")
+    print(f"Orphaned scheme drug names: {report['reimbursement_schemes']['orphaned_drug_names']}")
+    for check in report["checks"]:
+        status = "PASS" if check["passed"] else "FAIL"
+        print(f"[{status}] {check['check']}: {check['value']} (max {check['max']})")
+    print("Data quality: " + ("PASSED" if report["passed"] else "FAILED"))
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Single-pass data-quality report for the medicine catalogue")
+    parser.add_argument("--report", help="write the JSON report to this path (default: stdout)")
+    parser.add_argument("--sample", type=int, default=5, help="reservoir sample size")
+    args = parser.parse_args()
+
+    report = asyncio.run(run_checks(args.sample))
+    if args.report:
+        with open(args.report, "w") as f:
+            json.dump(report, f, indent=2)
+        print_summary(report)
+    else:
+        print(json.dumps(report, indent=2))
+    sys.exit(0 if report["passed"] else 1)
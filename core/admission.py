@@ -0,0 +1,90 @@
+import asyncio
+from core import metrics
+from core.config import settings
+
+
+class AdmissionRejected(Exception):
+    """Raised when a request cannot be admitted; maps to a 429/503 response."""
+
+    def __init__(self, status_code: int, reason: str, retry_after: int):
+        super().__init__(reason)
+        self.status_code = status_code
+        self.reason = reason
+        self.retry_after = retry_after
+
+
+class AdmissionTicket:
+    """An admitted slot. release() is idempotent so every exit path can call it."""
+
+    def __init__(self, controller):
+        self._controller = controller
+        self._released = False
+
+    def release(self):
+        if not self._released:
+            self._released = True
+            self._controller._release()
+
+
+class AdmissionController:
+    """
+    Caps concurrent agent runs. Requests beyond the cap wait in a bounded
+    queue; a full queue is rejected immediately (429) and a queued request
+    that cannot get a slot within the timeout is rejected with 503.
+    """
+
+    def __init__(self, max_concurrent: int, max_queue: int, queue_timeout: float, retry_after: int):
+        self.max_concurrent = max_concurrent
+        self.max_queue = max_queue
+        self.queue_timeout = queue_timeout
+        self.retry_after = retry_after
+        self._slots = asyncio.Semaphore(max_concurrent)
+        self.active = 0
+        self.waiting = 0
+
+    async def acquire(self) -> AdmissionTicket:
+        if self._slots.locked():
+            if self.waiting >= self.max_queue:
+                metrics.incr("admission.rejected_queue_full")
+                raise AdmissionRejected(429, "Too many requests in queue", self.retry_after)
+
+            metrics.incr("admission.queued")
+            self.waiting += 1
+            try:
+                await asyncio.wait_for(self._slots.acquire(), timeout=self.queue_timeout)
+            except asyncio.TimeoutError:
+                metrics.incr("admission.rejected_timeout")
+                raise AdmissionRejected(503, "Server busy, timed out waiting for capacity", self.retry_after)
+            finally:
+                self.waiting -= 1
+        else:
+            await self._slots.acquire()
+
+        self.active += 1
+        metrics.incr("admission.admitted")
+        return AdmissionTicket(self)
+
+    def _release(self):
+        self.active -= 1
+        self._slots.release()
+
+    def stats(self) -> dict:
+        return {
+            "active": self.active,
+            "waiting": self.waiting,
+            "max_concurrent": self.max_concurrent,
+            "max_queue": self.max_queue,
+        }
+
+
+agent_admission = AdmissionController(
+    max_concurrent=settings.MAX_CONCURRENT_AGENT_RUNS,
+    max_queue=settings.ADMISSION_QUEUE_SIZE,
+    queue_timeout=settings.ADMISSION_QUEUE_TIMEOUT,
+    retry_after=settings.ADMISSION_RETRY_AFTER,
+)
+
+# Separate limits for the two downstream resources, so a slow LLM provider
+# cannot starve DB lookups (and a burst cannot open unbounded SQLite sessions)
+llm_slots = asyncio.Semaphore(settings.MAX_CONCURRENT_LLM_CALLS)
+db_slots = asyncio.Semaphore(settings.MAX_CONCURRENT_DB_LOOKUPS)
@@ -1,132 +1,138 @@
 from typing import TypedDict, Annotated, Sequence
 from langchain_core.messages import BaseMessage, HumanMessage, AIMessage, SystemMessage, ToolMessage
 from langchain_core.prompts import ChatPromptTemplate
-from langchain_openai import ChatOpenAI
 from langgraph.graph import StateGraph, END
+from langgraph.config import get_stream_writer
 from tools.clinical_tools import lookup_clinical_data
 from tools.commercial_tools import compare_reimbursement_schemes
 from tools.drug_db_tool import get_drug_details
 from core.config import settings
+from core.singleflight import SingleFlight, normalize_key
+from core.llm_providers import extraction_llm, answer_llm
+from core.prompts import build_extraction_messages, build_answer_messages, assemble_context
+from core.intent import classify_intent, clinical_fields
+from core.monographs import monographs
+from core.fastpath import fastpath
+from core import metrics, traffic
 import operator
+import time
 
 # Define State
 class AgentState(TypedDict):
     messages: Annotated[Sequence[BaseMessage], operator.add]
     next_step: str
+    # Stage durations in ms for the stream's summary event
+    timings: dict
 
 # Define Tools
 tools = [lookup_clinical_data, compare_reimbursement_schemes, get_drug_details]
 
-# Initialize LLM (OpenRouter)
-llm = ChatOpenAI(
-    model=settings.OPENROUTER_MODEL,
-    openai_api_key=settings.OPENROUTER_API_KEY,
-    openai_api_base=settings.OPENROUTER_BASE_URL,
-    temperature=0
-)
-
-# Define System Prompt
-SYSTEM_PROMPT = """You are IntelliPharma, an enterprise-grade Indian Pharma Digital Medical and Commercial Intelligence Assistant.
-
-You provide accurate, structured, and COMPREHENSIVE pharmaceutical information.
-You operate only on internal datasets and general medical knowledge.
-
-------------------------------------
-BRAND & VISUAL AWARENESS
-------------------------------------
-- Product name: IntelliPharma
-- UI theme: Clean white background with subtle purple accents
-- Output is rendered inside glass cards with blur and borders
-- Content must be visually clean but CLINICALLY COMPLETE
-
-------------------------------------
-GLOBAL BEHAVIOR RULES
-------------------------------------
-- Professional medical affairs tone
-- No chatbot language
-- No emojis
-- No explanations of tools, prompts, or internal reasoning
-- No instructional or developer-facing text
-- No square brackets [ ]
-
-------------------------------------
-FORMATTING RULES
-------------------------------------
-- Markdown only
-- ALL headers must be bold
-- Clean spacing between sections
-- Bullet points encouraged for readability
-
-------------------------------------
-CRITICAL CONTENT RULES
-------------------------------------
-- FOR REIMBURSEMENT/INSURANCE QUERIES: YOU MUST ONLY USE THE "CONTEXT FROM INTERNAL DATABASE".
-- IF NO REIMBURSEMENT CONTEXT IS PRESEINT, SIMPLY STATE THAT NO SCHEMES ARE CURRENTLY LISTED. 
-- NEGATIVE CONSTRAINTS (STRICT):
-    - NO Medicare, Medicaid, FDA, NHS, or US-specific schemes.
-    - NO CPT or HCPCS codes.
-    - If internal data is missing, DO NOT MAKE UP INFORMATION.
-- ONLY PROVIDE DATA IF IT IS PRESENT IN THE CONTEXT.
-- FOR COMPARISONS: If the user asks to compare drugs or asks for the difference, YOU MUST PRESENT THE DATA IN A MARKDOWN TABLE.
-    - Columns: Feature (Uses, Dosage, Side Effects, etc.), Drug A, Drug B, etc.
-    - Be concise in the table cells.
-"""
-
 import requests
 import json
 
+# Identical queries arriving together share one extraction call
+extraction_flight = SingleFlight("drug_extraction")
+
+def _ms_since(start: float) -> float:
+    return round((time.perf_counter() - start) * 1000, 1)
+
+# Pipeline steps shared by node_agent and the batch runner (core/batch.py)
+
+class ExtractionError(Exception):
+    """The extraction model call failed; unlike None, says nothing about the query."""
+
+
+async def extract_drugs(user_query: str):
+    """Comma-separated drug names the extraction model found in the query, or None. Raises ExtractionError."""
+    messages = build_extraction_messages(user_query)
+    started = time.perf_counter()
+    try:
+        extraction_response = await extraction_flight.do(
+            normalize_key(user_query),
+            lambda: extraction_llm.ainvoke(messages)
+        )
+    except Exception as e:
+        metrics.incr("extraction.errors")
+        raise ExtractionError(f"{type(e).__name__}: {e}") from e
+    traffic.note_llm_call("extraction", messages, extraction_response.content, started, extraction_response)
+    drug_names_str = extraction_response.content.strip().replace("'", "").replace('"', "").replace("The drug names are: ", "").strip()
+
+    if drug_names_str and drug_names_str.lower() != "none":
+        with open("debug.log", "a") as f:
+            f.write(f"\n[Agent] Extracted: {drug_names_str}\n")
+        print(f"DEBUG: Extracted drug names: {drug_names_str}")
+        return drug_names_str # Now can be "drug1, drug2"
+    return None
+
+def split_drugs(drug_names: str):
+    return [d.strip() for d in drug_names.split(",")]
+
 
 async def node_agent(state: AgentState):
     messages = state['messages']
     last_message = messages[-1]
     user_query = last_message.content
     
-    context = ""
-    
-    # Simple Keyword Intent Detection for RAG (Robust & Fast)
-    lower_query = user_query.lower()
+    clinical_results = commercial_results = ""
+    # Progress events for the NDJSON stream (no-op outside astream)
+    write = get_stream_writer()
+    started = time.perf_counter()
+    timings = {}
     
     # Combined Logic: Always try to extract intent/drug to ensure robustness
     extracted_drug = None
     
+    # 0. Purely structured question: answer from the database, no LLM calls
+    if settings.FASTPATH_ENABLED:
+        fast = await fastpath.answer(user_query)
+        if fast:
+            drug_name, intent, content = fast
+            timings["fastpath"] = _ms_since(started)
+            write({"type": "extraction", "drugs": [drug_name], "intent": sorted(intent.labels), "ms": timings["fastpath"]})
+            write({"type": "first_token", "ms": timings["fastpath"]})
+            write({"type": "delta", "content": content})
+            timings["total"] = _ms_since(started)
+            return {"messages": [AIMessage(content=content)], "next_step": "END", "timings": timings}
+
     # 1. Attempt Drug Extraction
+    stage_start = time.perf_counter()
     try:
-        extraction_prompt = (
-            f"Extract ALL drug names from this query: '{user_query}'. "
-            "Return them as a comma-separated list. "
-            "Example: 'aspirin, paracetamol'. "
-            "If no drug is mentioned, return 'None'. "
-            "Do not add any other text."
-        )
-        extraction_response = await llm.ainvoke([HumanMessage(content=extraction_prompt)])
-        drug_names_str = extraction_response.content.strip().replace("'", "").replace('"', "").replace("The drug names are: ", "").strip()
-        
-        if drug_names_str and drug_names_str.lower() != "none":
-            extracted_drug = drug_names_str # Now can be "drug1, drug2"
-            with open("debug.log", "a") as f:
-                f.write(f"\n[Agent] Extracted: {extracted_drug}\n")
-            print(f"DEBUG: Extracted drug names: {extracted_drug}")
-    except Exception as e:
+        extracted_drug = await extract_drugs(user_query)
+    except ExtractionError as e:
+        # Interactive chat carries on, searching with the query itself
         print(f"DEBUG: Extraction failed: {e}")
 
-    # 2. Retrieve Data (If drug found OR keywords present)
+    # 2. Retrieve only the branches (and Medicine fields) the intent needs
+    intent = classify_intent(user_query, has_drug=bool(extracted_drug))
+    print(f"DEBUG: Intent: {sorted(intent.labels)}")
+    timings["extraction"] = _ms_since(stage_start)
+    write({
+        "type": "extraction",
+        "drugs": split_drugs(extracted_drug) if extracted_drug else [],
+        "intent": sorted(intent.labels),
+        "ms": timings["extraction"],
+    })
     
     # Clinical Data
-    if extracted_drug or any(k in lower_query for k in ["what is", "dose", "side effect", "use", "price", "compare", "difference"]):
+    if intent.clinical:
+        stage_start = time.perf_counter()
+        found = False
         try:
             # If we have a drug name, use it for specific lookup, otherwise use query
             # get_drug_details now handles comma-separated strings
             search_term = extracted_drug if extracted_drug else user_query
-            clinical_results = await get_drug_details.ainvoke(search_term)
-            if clinical_results:
-                context += f"\n\n### Internal Clinical Guidelines:\n{clinical_results}"
+            clinical_results = await get_drug_details.ainvoke({"drug_names": search_term, "fields": clinical_fields(intent)})
+            found = bool(clinical_results)
         except Exception as e:
             print(f"DEBUG: Clinical lookup failed: {e}")
+        timings["clinical"] = _ms_since(stage_start)
+        write({"type": "retrieval", "branch": "clinical", "found": found, "ms": timings["clinical"]})
 
     # Commercial Data
-    if extracted_drug or any(k in lower_query for k in ["price", "cost", "reimbursement", "insurance", "coverage"]):
+    if intent.reimbursement:
+        stage_start = time.perf_counter()
+        found = False
         try:
-            # If we have a drug name, ALWAYS check reimbursement (User likely wants it)
             target_drug = extracted_drug if extracted_drug else user_query
             # Basic validation to ensure we don't query for "reimbursement" as a drug
             if len(target_drug) < 50: 
@@ -135,33 +141,59 @@ async def node_agent(state: AgentState):
                 with open("debug.log", "a") as f:
                     f.write(f"[Agent] Result Len: {len(commercial_results) if commercial_results else 0}\n")
                 
-                if commercial_results:
-                    context += f"\n\n### Reimbursement & Commercial Data:\n{commercial_results}"
+                found = bool(commercial_results)
         except Exception as e:
              with open("debug.log", "a") as f:
                  f.write(f"[Agent] Error: {str(e)}\n")
              print(f"DEBUG: Reimbursement lookup failed: {e}")
-
-    # Construct Augmented Prompt
-    final_system_prompt = SYSTEM_PROMPT
-    if context:
-        final_system_prompt += f"\n\nCONTEXT FROM INTERNAL DATABASE:{context}\n\nUse the above context to answer the user's question accurately."
+        timings["reimbursement"] = _ms_since(stage_start)
+        write({"type": "retrieval", "branch": "reimbursement", "found": found, "ms": timings["reimbursement"]})
+
+    context = assemble_context(clinical_results, commercial_results)
+
+    # Head query with a fresh precomputed monograph: serve it without an LLM call
+    # when the question is exactly the monograph's; otherwise hand it to the model
+    if settings.MONOGRAPHS_ENABLED and extracted_drug:
+        content, exact = monographs.lookup(extracted_drug, intent, context, user_query)
+        if exact:
+            traffic.note_context(context)
+            timings["first_token"] = _ms_since(started)
+            write({"type": "first_token", "ms": timings["first_token"]})
+            write({"type": "delta", "content": content})
+            timings["answer"] = 0.0
+            timings["total"] = _ms_since(started)
+            return {"messages": [AIMessage(content=content)], "next_step": "END", "timings": timings}
+        if content:
+            context = assemble_context(clinical_results, commercial_results, monograph=content)
+
+    traffic.note_context(context)
 
     # Generate Response using LangChain (Clean & Standard)
     try:
-        messages = [
-            SystemMessage(content=final_system_prompt),
-            HumanMessage(content=user_query)
-        ]
+        # Static system prompt first (cacheable prefix), retrieved context after it
+        messages = build_answer_messages(user_query, context)
         
-        print(f"DEBUG: Sending request to OpenRouter model: {settings.OPENROUTER_MODEL}")
-        response = await llm.ainvoke(messages)
+        print(f"DEBUG: Sending request to {answer_llm.provider} model: {answer_llm.model_name}")
+        stage_start = time.perf_counter()
+        content = ""
+        async for chunk in answer_llm.astream(messages):
+            if not chunk.content:
+                continue
+            if not content:
+                timings["first_token"] = _ms_since(started)
+                write({"type": "first_token", "ms": timings["first_token"]})
+            content += chunk.content
+            write({"type": "delta", "content": chunk.content})
+        timings["answer"] = _ms_since(stage_start)
+        timings["total"] = _ms_since(started)
+        traffic.note_llm_call("answer", messages, content, stage_start)
         
-        return {"messages": [response], "next_step": "END"}
+        return {"messages": [AIMessage(content=content)], "next_step": "END", "timings": timings}
         
     except Exception as e:
         print(f"DEBUG: LLM request failed: {e}")
-        return {"messages": [AIMessage(content=f"**System Error**: Could not connect to OpenRouter. Please check your API Key.\n\nDebug Info: {e}")], "next_step": "END"}
+        timings["total"] = _ms_since(started)
+        return {"messages": [AIMessage(content=f"**System Error**: Could not connect to OpenRouter. Please check your API Key.\n\nDebug Info: {e}")], "next_step": "END", "timings": timings}
 
 # Define Router (Simple pass-through now)
 def router(state: AgentState):
@@ -0,0 +1,206 @@
+import asyncio
+import json
+import time
+from typing import List, NamedTuple
+from core import metrics
+from core.config import settings
+from core.singleflight import normalize_key
+from core.intent import classify_intent, clinical_fields
+from core.llm_providers import answer_llm
+from core.prompts import build_answer_messages, assemble_context
+from core.agent_graph import ExtractionError, extract_drugs, split_drugs
+from core.fastpath import fastpath
+from tools.drug_db_tool import resolve_drugs, format_resolution
+from tools.commercial_tools import compare_reimbursement_schemes
+
+
+class BatchQuery(NamedTuple):
+    id: str
+    message: str
+
+
+def parse_batch(lines) -> List[BatchQuery]:
+    """
+    Parse JSONL queries: one object per line with "message" (or "query") and
+    an optional "id". Lines without an id are numbered from 1. Blank lines are
+    skipped; a malformed line raises ValueError naming its line number.
+    """
+    queries = []
+    seen = set()
+    for number, line in enumerate(lines, start=1):
+        line = line.strip()
+        if not line:
+            continue
+        try:
+            item = json.loads(line)
+        except json.JSONDecodeError as e:
+            raise ValueError(f"line {number}: invalid JSON ({e.msg})")
+        if not isinstance(item, dict):
+            raise ValueError(f"line {number}: expected an object")
+        message = item.get("message") or item.get("query")
+        if not isinstance(message, str) or not message.strip():
+            raise ValueError(f"line {number}: missing \"message\"")
+        query_id = str(item.get("id", number))
+        if query_id in seen:
+            raise ValueError(f"line {number}: duplicate id {query_id!r}")
+        seen.add(query_id)
+        queries.append(BatchQuery(query_id, message))
+    return queries
+
+
+class _Plan(NamedTuple):
+    query: BatchQuery
+    drugs: List[str]
+    intent: object
+    clinical_names: List[str]
+    reimbursement_target: str
+
+
+async def _capped(gate, coro_fn, *args):
+    async with gate:
+        return await coro_fn(*args)
+
+
+class BatchRunner:
+    """
+    Runs node_agent's pipeline (extraction -> retrieval -> answer) over many
+    queries; structured questions are answered by the fast path first.
+    Work is shared across the whole batch: each distinct query is
+    extracted once, each distinct drug is resolved once (exact matches in
+    bulk), and each reimbursement lookup runs once. `concurrency` caps the
+    batch's own LLM calls; they also count against the process-wide
+    MAX_CONCURRENT_LLM_CALLS, so interactive chats are not starved.
+    Queries go through in chunks, so results (and checkpoints) start flowing
+    before the whole batch is extracted. A query whose extraction call fails
+    gets an "error" result, not an answer without drugs, so a resume retries it.
+    """
+
+    def __init__(self, concurrency: int = None, chunk_size: int = None):
+        self.gate = asyncio.Semaphore(concurrency or settings.BATCH_CONCURRENCY)
+        self.chunk_size = chunk_size or settings.BATCH_CHUNK_SIZE
+        # normalize_key -> result, kept for the whole batch
+        self.extractions = {}
+        self.resolutions = {}
+        self.schemes = {}
+
+    async def run(self, queries: List[BatchQuery]):
+        """Yield one result dict per query, in completion order."""
+        for start in range(0, len(queries), self.chunk_size):
+            chunk = queries[start:start + self.chunk_size]
+            if settings.FASTPATH_ENABLED:
+                remaining = []
+                for query in chunk:
+                    started = time.perf_counter()
+                    fast = await fastpath.answer(query.message)
+                    if fast is None:
+                        remaining.append(query)
+                        continue
+                    drug_name, intent, content = fast
+                    yield {"id": query.id, "message": query.message, "drugs": [drug_name], "intent": sorted(intent.labels),
+                           "answer": content, "ms": round((time.perf_counter() - started) * 1000, 1)}
+                chunk = remaining
+            if not chunk:
+                continue
+            plans, failed = await self._plan(chunk)
+            for result in failed:
+                yield result
+            await self._retrieve(plans)
+            tasks = [asyncio.create_task(self._answer(plan)) for plan in plans]
+            try:
+                for next_done in asyncio.as_completed(tasks):
+                    yield await next_done
+            finally:
+                # Consumer stopped early (client gone): drop the remaining LLM calls
+                for task in tasks:
+                    task.cancel()
+
+    async def _plan(self, chunk):
+        """Plans for the chunk's queries, and error results for those whose extraction failed."""
+        # 1. Extraction, once per distinct query across the batch
+        pending = {}
+        for query in chunk:
+            key = normalize_key(query.message)
+            if key not in self.extractions:
+                pending.setdefault(key, query.message)
+        started = time.perf_counter()
+        extracted = await asyncio.gather(
+            *(_capped(self.gate, extract_drugs, message) for message in pending.values()),
+            return_exceptions=True,
+        )
+        # Failures are not kept: a later chunk (or a resumed run) asks again
+        errors = {}
+        for key, outcome in zip(pending, extracted):
+            if isinstance(outcome, ExtractionError):
+                errors[key] = outcome
+            elif isinstance(outcome, BaseException):
+                raise outcome
+            else:
+                self.extractions[key] = outcome
+        metrics.incr("batch.extractions", len(pending))
+
+        plans = []
+        failed = []
+        for query in chunk:
+            key = normalize_key(query.message)
+            if key in errors:
+                print(f"DEBUG: Batch query {query.id} failed: {errors[key]}")
+                failed.append({"id": query.id, "message": query.message, "drugs": [], "intent": [],
+                               "error": f"extraction failed: {errors[key]}",
+                               "ms": round((time.perf_counter() - started) * 1000, 1)})
+                metrics.incr("batch.errors")
+                continue
+            extracted_drug = self.extractions[key]
+            intent = classify_intent(query.message, has_drug=bool(extracted_drug))
+            # Same search terms node_agent uses
+            search_term = extracted_drug if extracted_drug else query.message
+            plans.append(_Plan(
+                query=query,
+                drugs=split_drugs(extracted_drug) if extracted_drug else [],
+                intent=intent,
+                clinical_names=split_drugs(search_term) if intent.clinical else [],
+                reimbursement_target=search_term if intent.reimbursement and len(search_term) < 50 else None,
+            ))
+        return plans, failed
+
+    async def _retrieve(self, plans):
+        # 2. Every new drug of the chunk resolved together
+        names = [name for plan in plans for name in plan.clinical_names if normalize_key(name) not in self.resolutions]
+        if names:
+            resolved = await resolve_drugs(names)
+            self.resolutions.update(resolved)
+            metrics.incr("batch.drugs_resolved", len(resolved))
+
+        targets = {}
+        for plan in plans:
+            if plan.reimbursement_target:
+                key = normalize_key(plan.reimbursement_target)
+                if key not in self.schemes:
+                    targets.setdefault(key, plan.reimbursement_target)
+        results = await asyncio.gather(*(compare_reimbursement_schemes.ainvoke(target) for target in targets.values()))
+        self.schemes.update(zip(targets, results))
+
+    def _clinical_results(self, plan) -> str:
+        fields = clinical_fields(plan.intent)
+        results = []
+        for name in plan.clinical_names:
+            corrected_name, medicine = self.resolutions[normalize_key(name)]
+            results.extend(format_resolution(name, corrected_name, medicine, fields))
+        return "\n\n".join(results)
+
+    async def _answer(self, plan):
+        query = plan.query
+        result = {"id": query.id, "message": query.message, "drugs": plan.drugs, "intent": sorted(plan.intent.labels)}
+        started = time.perf_counter()
+        try:
+            commercial_results = self.schemes.get(normalize_key(plan.reimbursement_target)) if plan.reimbursement_target else ""
+            context = assemble_context(self._clinical_results(plan), commercial_results)
+            async with self.gate:
+                response = await answer_llm.ainvoke(build_answer_messages(query.message, context))
+            result["answer"] = response.content
+            metrics.incr("batch.answered")
+        except Exception as e:
+            print(f"DEBUG: Batch query {query.id} failed: {e}")
+            result["error"] = str(e)
+            metrics.incr("batch.errors")
+        result["ms"] = round((time.perf_counter() - started) * 1000, 1)
+        return result
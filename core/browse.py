@@ -0,0 +1,204 @@
+import base64
+import hashlib
+import json
+import os
+import time
+from sqlalchemy import func, select, text, tuple_
+from core import dictionaries
+from core.database import engine, IS_POSTGRES
+from models.models import Medicine, ReimbursementScheme, class_labels, plan_labels
+
+# Class filters: query parameter / kind -> Medicine id column
+CLASS_COLUMNS = {
+    "therapeutic": Medicine.therapeutic_class_id,
+    "action": Medicine.action_class_id,
+    "chemical": Medicine.chemical_class_id,
+}
+
+MEDICINE_FIELDS = ["id", "drug_name", "therapeutic_class", "action_class", "chemical_class", "mrp"]
+PLAN_MEDICINE_FIELDS = ["id", "drug_name", "scheme_type", "coverage_percent", "copay_amount", "prior_authorization", "tier"]
+
+# How long a computed data version is reused before asking the database again
+DATA_VERSION_TTL = 1.0
+_BROWSED_TABLES = ("medicines", "reimbursement_schemes", "drug_classes", "insurance_plans")
+
+
+class BadCursor(ValueError):
+    pass
+
+
+def encode_cursor(drug_name, row_id):
+    """Opaque keyset position: the (drug_name, id) of the last row on the page."""
+    return base64.urlsafe_b64encode(json.dumps([drug_name, row_id], separators=(",", ":")).encode()).decode().rstrip("=")
+
+
+def decode_cursor(cursor):
+    try:
+        drug_name, row_id = json.loads(base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)))
+        if not isinstance(drug_name, str) or not isinstance(row_id, int):
+            raise ValueError
+        return drug_name, row_id
+    except (ValueError, TypeError):
+        raise BadCursor("Invalid cursor")
+
+
+def _prefix_range(column, prefix):
+    """
+    drug_name starting with prefix in any case ("met" finds "Metformin"), as a
+    range on lower(drug_name) that the expression indexes of migration 0006
+    can seek (LIKE 'x%' often cannot).
+    """
+    prefix = prefix.lower()
+    key = func.lower(column)
+    return [key >= prefix, key < prefix[:-1] + chr(ord(prefix[-1]) + 1)]
+
+
+def _page(rows, limit, key):
+    """Trim the look-ahead row and build the cursor for the next page."""
+    more = len(rows) > limit
+    rows = rows[:limit]
+    return rows, encode_cursor(*key(rows[-1])) if more else None
+
+
+async def resolve_class(session, name):
+    """Dictionary id of a class name (case-insensitive), or None."""
+    for attempt in range(2):
+        ids = dictionaries.classes.ids
+        if name in ids:
+            return ids[name]
+        lowered = name.lower()
+        for known, class_id in ids.items():
+            if known.lower() == lowered:
+                return class_id
+        if attempt == 0:
+            await dictionaries.load(session)
+    return None
+
+
+async def plan_exists(session, plan_id):
+    if plan_id not in plan_labels:
+        await dictionaries.load(session)
+    return plan_id in plan_labels
+
+
+async def list_medicines(session, class_ids, prefix, cursor, limit):
+    """
+    One page of medicines ordered by (drug_name, id). Class filters hit the
+    (class_id, drug_name, id) indexes and the cursor resumes with a row-value
+    comparison, so a page costs the same on page 1 and page 10,000.
+    """
+    stmt = select(
+        Medicine.id, Medicine.drug_name, Medicine.therapeutic_class_id,
+        Medicine.action_class_id, Medicine.chemical_class_id, Medicine.mrp,
+    ).where(Medicine.drug_name.is_not(None))
+    for kind, class_id in class_ids.items():
+        stmt = stmt.where(CLASS_COLUMNS[kind] == class_id)
+    if prefix:
+        stmt = stmt.where(*_prefix_range(Medicine.drug_name, prefix))
+    if cursor:
+        stmt = stmt.where(tuple_(Medicine.drug_name, Medicine.id) > tuple_(*decode_cursor(cursor)))
+    stmt = stmt.order_by(Medicine.drug_name, Medicine.id).limit(limit + 1)
+
+    rows = (await session.execute(stmt)).all()
+    if any(c is not None and c not in class_labels for row in rows for c in row[2:5]):
+        await dictionaries.load(session)
+    rows, next_cursor = _page(rows, limit, lambda row: (row.drug_name, row.id))
+    items = [
+        [row.id, row.drug_name, class_labels.get(row[2]), class_labels.get(row[3]), class_labels.get(row[4]), row.mrp]
+        for row in rows
+    ]
+    return {"fields": MEDICINE_FIELDS, "items": items, "next": next_cursor}
+
+
+async def list_plan_medicines(session, plan_id, prefix, cursor, limit):
+    """One page of the drugs a plan covers, ordered by (drug_name, id) on the (plan_id, drug_name, id) index."""
+    stmt = select(
+        ReimbursementScheme.id, ReimbursementScheme.drug_name, ReimbursementScheme.scheme_type,
+        ReimbursementScheme.coverage_percent, ReimbursementScheme.copay_amount,
+        ReimbursementScheme.prior_authorization, ReimbursementScheme.tier,
+    ).where(ReimbursementScheme.plan_id == plan_id, ReimbursementScheme.drug_name.is_not(None))
+    if prefix:
+        stmt = stmt.where(*_prefix_range(ReimbursementScheme.drug_name, prefix))
+    if cursor:
+        stmt = stmt.where(tuple_(ReimbursementScheme.drug_name, ReimbursementScheme.id) > tuple_(*decode_cursor(cursor)))
+    stmt = stmt.order_by(ReimbursementScheme.drug_name, ReimbursementScheme.id).limit(limit + 1)
+
+    rows, next_cursor = _page((await session.execute(stmt)).all(), limit, lambda row: (row.drug_name, row.id))
+    items = [
+        [row.id, row.drug_name, row.scheme_type.value if row.scheme_type else None, row.coverage_percent,
+         row.copay_amount, bool(row.prior_authorization), row.tier]
+        for row in rows
+    ]
+    return {"plan": plan_labels.get(plan_id), "fields": PLAN_MEDICINE_FIELDS, "items": items, "next": next_cursor}
+
+
+async def class_counts(session, kind):
+    """Every class of one kind with its number of medicines (an index-only scan)."""
+    column = CLASS_COLUMNS[kind]
+    rows = (await session.execute(
+        select(column, func.count()).where(column.is_not(None)).group_by(column)
+    )).all()
+    if any(class_id not in class_labels for class_id, _ in rows):
+        await dictionaries.load(session)
+    items = sorted(([class_labels.get(class_id), count] for class_id, count in rows), key=lambda item: item[0] or "")
+    return {"kind": kind, "fields": ["name", "medicines"], "items": items}
+
+
+async def plan_counts(session):
+    rows = (await session.execute(
+        select(ReimbursementScheme.plan_id, func.count()).where(ReimbursementScheme.plan_id.is_not(None))
+        .group_by(ReimbursementScheme.plan_id)
+    )).all()
+    if any(plan_id not in plan_labels for plan_id, _ in rows):
+        await dictionaries.load(session)
+    items = sorted(([plan_id, plan_labels.get(plan_id), count] for plan_id, count in rows), key=lambda item: item[1] or "")
+    return {"fields": ["id", "name", "schemes"], "items": items}
+
+
+class DataVersion:
+    """
+    A token that changes whenever the given tables change, the same in
+    every worker, so it can back ETags without running the listing query.
+    SQLite: modification time and size of the database file (and its WAL).
+    Postgres: the insert/update/delete counters of the tables.
+    """
+
+    def __init__(self, tables=_BROWSED_TABLES, ttl=DATA_VERSION_TTL):
+        self.tables = tables
+        self.ttl = ttl
+        self.value = None
+        self.checked = 0.0
+
+    async def get(self):
+        now = time.monotonic()
+        if self.value is None or now - self.checked > self.ttl:
+            self.value = await self._read()
+            self.checked = now
+        return self.value
+
+    async def _read(self):
+        if IS_POSTGRES:
+            async with engine.connect() as conn:
+                result = await conn.execute(text(
+                    "SELECT coalesce(sum(n_tup_ins + n_tup_upd + n_tup_del), 0) FROM pg_stat_user_tables "
+                    "WHERE relname = ANY(:tables)"
+                ), {"tables": list(self.tables)})
+                return f"pg-{result.scalar()}"
+        path = engine.url.database
+        parts = []
+        for suffix in ("", "-wal"):
+            try:
+                stat = os.stat(path + suffix)
+                parts.append(f"{stat.st_mtime_ns}-{stat.st_size}")
+            except (OSError, TypeError):
+                pass
+        return "sqlite-" + "-".join(parts)
+
+
+data_version = DataVersion()
+
+
+def etag(version, *parts):
+    """Weak ETag for one listing: the data version plus everything that shapes the response."""
+    digest = hashlib.sha1("\0".join([version, *map(str, parts)]).encode()).hexdigest()[:20]
+    return f'W/"{digest}"'
@@ -0,0 +1,113 @@
+from sqlalchemy import select
+from core import dictionaries
+from core.database import AsyncSessionLocal
+from core.singleflight import normalize_key
+from models.models import Medicine
+
+# Rows fetched per round trip while loading
+LOAD_BATCH_SIZE = 10000
+
+# Medicine attributes kept per record, in Medicine column order
+RECORD_FIELDS = (
+    "id", "drug_name", "substitutes", "side_effects", "uses",
+    "chemical_class", "habit_forming", "therapeutic_class", "action_class",
+    "dosage", "contraindications", "mrp",
+)
+
+
+class MedicineRecord:
+    """
+    Read-only medicine row. Same attribute names as Medicine, so the tool
+    formatters accept either, but no ORM state, __dict__ or instrumentation.
+    """
+    __slots__ = RECORD_FIELDS
+
+    def __init__(self, values):
+        for field, value in zip(RECORD_FIELDS, values):
+            object.__setattr__(self, field, value)
+
+    def __setattr__(self, name, value):
+        raise AttributeError("MedicineRecord is read-only")
+
+    def __repr__(self):
+        return f"MedicineRecord(id={self.id}, drug_name={self.drug_name!r})"
+
+
+class Catalogue:
+    """
+    In-process medicine catalogue for hot lookups, built from one bulk
+    query. Lookups by normalized name or id never touch the ORM. Call
+    load() again (core/store_refresh.py does when the data changes);
+    the new maps are swapped in whole, so readers never see a partial load.
+    """
+
+    def __init__(self):
+        self.by_name = {}
+        self.by_id = {}
+        self.loaded = False
+        self.version = 0
+
+    async def load(self):
+        labels = dictionaries.LABEL_COLUMNS[Medicine]
+        columns = [getattr(Medicine, labels[f][0] if f in labels else f) for f in RECORD_FIELDS]
+        # Repeated texts (default dosage, contraindications, ...) share one string object
+        shared = {}
+
+        def share(value):
+            return value if value is None else shared.setdefault(value, value)
+
+        convert = [
+            labels[f][1].labels.get if f in labels else None if f in ("id", "drug_name", "mrp") else share
+            for f in RECORD_FIELDS
+        ]
+        by_name = {}
+        by_id = {}
+
+        async with AsyncSessionLocal() as session:
+            await dictionaries.load(session)
+            result = await session.stream(select(*columns).order_by(Medicine.id))
+            async for rows in result.partitions(LOAD_BATCH_SIZE):
+                for row in rows:
+                    record = MedicineRecord([
+                        fn(value) if fn else value for fn, value in zip(convert, row)
+                    ])
+                    by_id[record.id] = record
+                    # Lowest id wins, like the first row of an unordered ilike match
+                    if record.drug_name:
+                        by_name.setdefault(normalize_key(record.drug_name), record)
+
+        self.by_name, self.by_id = by_name, by_id
+        self.loaded = True
+        self.version += 1
+        print(f"DEBUG: Catalogue loaded: {len(by_id)} medicines, {len(shared)} distinct texts")
+
+    def get(self, name: str):
+        return self.by_name.get(normalize_key(name))
+
+    def stats(self) -> dict:
+        return {"loaded": self.loaded, "version": self.version, "records": len(self.by_id)}
+
+
+catalogue = Catalogue()
+
+
+async def find_medicine(session, condition):
+    """
+    First medicine matching `condition`. With the catalogue loaded only the
+    id comes from the database and the record from memory; rows newer than
+    the last catalogue load fall back to the ORM.
+    """
+    if catalogue.loaded:
+        result = await session.execute(select(Medicine.id).where(condition).limit(1))
+        medicine_id = result.scalar()
+        if medicine_id is None:
+            return None
+        record = catalogue.by_id.get(medicine_id)
+        if record:
+            return record
+
+    result = await session.execute(select(Medicine).where(condition))
+    medicine = result.scalars().first()
+    if medicine:
+        await dictionaries.ensure_labels(session, [medicine])
+    return medicine
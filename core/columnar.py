@@ -0,0 +1,58 @@
+import os
+from core.config import settings
+
+try:
+    import pyarrow as pa
+    import pyarrow.dataset as ds
+    import pyarrow.ipc
+except ImportError:  # Optional: only the export/analysis scripts need it
+    pa = ds = None
+
+CATALOGUE_DIR = os.path.join(settings.ROOT_DIR, "data", "catalogue")
+
+# Low-cardinality columns stored dictionary-encoded (integer codes + one small dictionary)
+DICTIONARY_COLUMNS = {
+    "medicines": {"chemical_class", "habit_forming", "therapeutic_class", "action_class"},
+    "reimbursement_schemes": {"drug_name", "scheme_type", "plan_name"},
+}
+
+FORMATS = {"parquet": ".parquet", "arrow": ".arrow"}
+
+
+def require_pyarrow():
+    if pa is None:
+        raise SystemExit("pyarrow is required for the columnar catalogue: pip install pyarrow")
+
+
+def table_path(name: str, fmt: str = "parquet", directory: str = CATALOGUE_DIR) -> str:
+    return os.path.join(directory, name + FORMATS[fmt])
+
+
+def find_export(name: str, directory: str = CATALOGUE_DIR):
+    """Path of an existing export of `name` (Parquet preferred), or None."""
+    for fmt in FORMATS:
+        path = table_path(name, fmt, directory)
+        if os.path.exists(path):
+            return path
+    return None
+
+
+def export_available(name: str, directory: str = CATALOGUE_DIR) -> bool:
+    """True when an export exists and pyarrow is installed to read it."""
+    return pa is not None and find_export(name, directory) is not None
+
+
+def open_dataset(name: str, directory: str = CATALOGUE_DIR):
+    """
+    Open an export as a pyarrow dataset. Use to_table(columns=..., filter=...)
+    to read only the needed columns, and let Parquet row-group statistics
+    skip data that cannot match the filter.
+    """
+    require_pyarrow()
+    path = find_export(name, directory)
+    if path is None:
+        raise FileNotFoundError(f"No columnar export for '{name}' in {directory}. Run: python3 export_catalogue.py")
+    if path.endswith(".parquet"):
+        return ds.dataset(path, format="parquet")
+    # Arrow IPC: memory-mapped, so uncompressed columns are read without copying
+    return ds.dataset(pa.ipc.open_file(pa.memory_map(path)).read_all())
@@ -0,0 +1,169 @@
+import zlib
+from starlette.datastructures import Headers, MutableHeaders
+from core import metrics
+
+try:
+    import brotli
+except ImportError:
+    try:
+        import brotlicffi as brotli
+    except ImportError:
+        brotli = None
+
+# Preferred first when the client weighs them equally
+ENCODINGS = ("br", "gzip") if brotli is not None else ("gzip",)
+COMPRESSIBLE_TYPES = ("text/", "application/json", "application/x-ndjson", "application/javascript", "image/svg+xml")
+
+
+def negotiate(accept_encoding: str):
+    """The best encoding we support from an Accept-Encoding header (q-values honoured), or None."""
+    weights = {}
+    for part in accept_encoding.split(","):
+        token, _, params = part.strip().partition(";")
+        q = 1.0
+        params = params.strip()
+        if params.startswith("q="):
+            try:
+                q = float(params[2:])
+            except ValueError:
+                q = 0.0
+        if token:
+            weights[token.strip().lower()] = q
+    best, best_q = None, 0.0
+    for encoding in ENCODINGS:
+        q = weights.get(encoding, weights.get("*", 0.0))
+        if q > best_q:
+            best, best_q = encoding, q
+    return best
+
+
+class _Compressor:
+    """gzip or brotli stream; flush() ends each chunk on a byte boundary the client can decode at once."""
+
+    def __init__(self, encoding, gzip_level, brotli_quality):
+        self.encoding = encoding
+        if encoding == "br":
+            self._brotli = brotli.Compressor(quality=brotli_quality)
+        else:
+            self._zlib = zlib.compressobj(gzip_level, zlib.DEFLATED, 16 + zlib.MAX_WBITS)
+
+    def compress(self, data: bytes) -> bytes:
+        if self.encoding == "br":
+            return self._brotli.process(data)
+        return self._zlib.compress(data)
+
+    def flush(self) -> bytes:
+        if self.encoding == "br":
+            return self._brotli.flush()
+        return self._zlib.flush(zlib.Z_SYNC_FLUSH)
+
+    def finish(self) -> bytes:
+        if self.encoding == "br":
+            return self._brotli.finish()
+        return self._zlib.flush(zlib.Z_FINISH)
+
+
+class CompressionMiddleware:
+    """
+    gzip / brotli response compression with per-route size thresholds.
+    `routes` maps a path prefix to the minimum body size in bytes (the longest
+    prefix wins, None turns compression off), other paths use `minimum_size`.
+    Complete bodies below the threshold go out as they are. Streamed bodies
+    (NDJSON) have no size up front, so they are compressed whenever the route
+    allows it, with a flush after every chunk: each line or heartbeat still
+    reaches the client as soon as it is sent. `receive` passes through
+    untouched, so disconnect watchers keep working.
+    """
+
+    def __init__(self, app, minimum_size=1024, routes=None, gzip_level=6, brotli_quality=4):
+        self.app = app
+        self.minimum_size = minimum_size
+        self.routes = sorted((routes or {}).items(), key=lambda item: len(item[0]), reverse=True)
+        self.gzip_level = gzip_level
+        self.brotli_quality = brotli_quality
+
+    def threshold(self, path):
+        for prefix, minimum in self.routes:
+            if path.startswith(prefix):
+                return minimum
+        return self.minimum_size
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        minimum = self.threshold(scope["path"])
+        if minimum is None:
+            await self.app(scope, receive, send)
+            return
+        encoding = negotiate(Headers(scope=scope).get("accept-encoding", ""))
+        responder = _Responder(send, encoding, minimum, self)
+        await self.app(scope, receive, responder.send)
+
+
+class _Responder:
+    def __init__(self, send, encoding, minimum, config):
+        self._send = send
+        self.encoding = encoding
+        self.minimum = minimum
+        self.config = config
+        self.start = None
+        self.compressor = None
+        self.passthrough = False
+
+    async def send(self, message):
+        kind = message["type"]
+        if kind == "http.response.start":
+            headers = MutableHeaders(scope=message)
+            # The body depends on Accept-Encoding even when this one is not compressed
+            headers.add_vary_header("Accept-Encoding")
+            content_type = headers.get("content-type", "")
+            self.passthrough = (
+                self.encoding is None
+                or message["status"] in (204, 304)
+                or "content-encoding" in headers
+                or not content_type.startswith(COMPRESSIBLE_TYPES)
+            )
+            if self.passthrough:
+                await self._send(message)
+            else:
+                # Held until the first body chunk shows whether the body is streamed
+                self.start = message
+            return
+        if kind != "http.response.body" or self.passthrough:
+            await self._send(message)
+            return
+
+        body = message.get("body", b"")
+        more_body = message.get("more_body", False)
+        if self.start is not None:
+            start, self.start = self.start, None
+            headers = MutableHeaders(scope=start)
+            if not more_body and (not body or len(body) < self.minimum):
+                self.passthrough = True
+                await self._send(start)
+                await self._send(message)
+                return
+            self.compressor = _Compressor(self.encoding, self.config.gzip_level, self.config.brotli_quality)
+            headers["Content-Encoding"] = self.encoding
+            metrics.incr(f"compression.{self.encoding}.responses")
+            if more_body:
+                metrics.incr(f"compression.{self.encoding}.streams")
+                del headers["Content-Length"]
+            else:
+                compressed = self.compressor.compress(body) + self.compressor.finish()
+                metrics.incr(f"compression.{self.encoding}.bytes_in", len(body))
+                metrics.incr(f"compression.{self.encoding}.bytes_out", len(compressed))
+                headers["Content-Length"] = str(len(compressed))
+                await self._send(start)
+                await self._send({"type": "http.response.body", "body": compressed})
+                return
+            await self._send(start)
+        elif more_body and not body:
+            return
+
+        chunk = self.compressor.compress(body) if body else b""
+        chunk += self.compressor.flush() if more_body else self.compressor.finish()
+        metrics.incr(f"compression.{self.encoding}.bytes_in", len(body))
+        metrics.incr(f"compression.{self.encoding}.bytes_out", len(chunk))
+        await self._send({"type": "http.response.body", "body": chunk, "more_body": more_body})
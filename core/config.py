@@ -18,4 +18,89 @@ class Settings:
     OPENROUTER_BASE_URL = os.getenv("OPENROUTER_BASE_URL", "https://openrouter.ai/api/v1")
     OPENROUTER_MODEL = os.getenv("OPENROUTER_MODEL", "openai/gpt-3.5-turbo") # Default or user choice
 
+    # Per-stage LLM routing: provider is one of openrouter, ollama, stub.
+    # Model defaults to OPENROUTER_MODEL / OLLAMA_MODEL for the chosen provider.
+    EXTRACTION_PROVIDER = os.getenv("EXTRACTION_PROVIDER", "openrouter")
+    EXTRACTION_MODEL = os.getenv("EXTRACTION_MODEL")
+    EXTRACTION_TIMEOUT = float(os.getenv("EXTRACTION_TIMEOUT", "15"))
+    ANSWER_PROVIDER = os.getenv("ANSWER_PROVIDER", "openrouter")
+    ANSWER_MODEL = os.getenv("ANSWER_MODEL")
+    ANSWER_TIMEOUT = float(os.getenv("ANSWER_TIMEOUT", "60"))
+    STUB_LLM_LATENCY = float(os.getenv("STUB_LLM_LATENCY", "0"))
+
+    # Postgres only: connection pool, asyncpg prepared-statement cache per connection
+    # (0 disables it, needed behind pgbouncer transaction pooling) and pg_trgm fuzzy matching
+    DB_POOL_SIZE = int(os.getenv("DB_POOL_SIZE", "10"))
+    DB_MAX_OVERFLOW = int(os.getenv("DB_MAX_OVERFLOW", "10"))
+    PG_STATEMENT_CACHE_SIZE = int(os.getenv("PG_STATEMENT_CACHE_SIZE", "500"))
+    PG_TRGM_THRESHOLD = float(os.getenv("PG_TRGM_THRESHOLD", "0.3"))
+    PG_TRGM_CANDIDATES = int(os.getenv("PG_TRGM_CANDIDATES", "10"))
+
+    # Apply pending schema migrations in the serve.py master before workers fork
+    MIGRATE_ON_STARTUP = os.getenv("MIGRATE_ON_STARTUP", "false").lower() == "true"
+
+    # Admission Control (per worker process)
+    MAX_CONCURRENT_AGENT_RUNS = int(os.getenv("MAX_CONCURRENT_AGENT_RUNS", "8"))
+    ADMISSION_QUEUE_SIZE = int(os.getenv("ADMISSION_QUEUE_SIZE", "32"))
+    ADMISSION_QUEUE_TIMEOUT = float(os.getenv("ADMISSION_QUEUE_TIMEOUT", "10"))
+    ADMISSION_RETRY_AFTER = int(os.getenv("ADMISSION_RETRY_AFTER", "5"))
+    MAX_CONCURRENT_LLM_CALLS = int(os.getenv("MAX_CONCURRENT_LLM_CALLS", "8"))
+    MAX_CONCURRENT_DB_LOOKUPS = int(os.getenv("MAX_CONCURRENT_DB_LOOKUPS", "4"))
+
+    # Serving
+    PRELOAD_NAME_INDEX = os.getenv("PRELOAD_NAME_INDEX", "true").lower() == "true"
+    PRELOAD_CATALOGUE = os.getenv("PRELOAD_CATALOGUE", "true").lower() == "true"
+    FASTPATH_ENABLED = os.getenv("FASTPATH_ENABLED", "true").lower() == "true"
+    MONOGRAPHS_ENABLED = os.getenv("MONOGRAPHS_ENABLED", "true").lower() == "true"
+    WEB_CONCURRENCY = int(os.getenv("WEB_CONCURRENCY", str(os.cpu_count() or 1)))
+    STREAM_HEARTBEAT_INTERVAL = float(os.getenv("STREAM_HEARTBEAT_INTERVAL", "5"))
+    # Seconds between each worker's checks for changed data to reload its in-memory stores from (0: never)
+    STORE_REFRESH_INTERVAL = float(os.getenv("STORE_REFRESH_INTERVAL", "30"))
+    # Bearer token for admin endpoints (POST /api/catalogue/refresh); empty disables them
+    ADMIN_TOKEN = os.getenv("ADMIN_TOKEN", "")
+
+    # Response encoding: JSON serializer (auto = orjson when installed, orjson, json)
+    # and gzip/brotli compression of bodies of at least COMPRESSION_MIN_SIZE bytes
+    JSON_SERIALIZER = os.getenv("JSON_SERIALIZER", "auto").lower()
+    COMPRESSION_ENABLED = os.getenv("COMPRESSION_ENABLED", "true").lower() == "true"
+    COMPRESSION_MIN_SIZE = int(os.getenv("COMPRESSION_MIN_SIZE", "1024"))
+    COMPRESSION_GZIP_LEVEL = int(os.getenv("COMPRESSION_GZIP_LEVEL", "6"))
+    COMPRESSION_BROTLI_QUALITY = int(os.getenv("COMPRESSION_BROTLI_QUALITY", "4"))
+
+    # Record sampled /api/chat traffic (sanitized query, context, LLM outputs) as JSONL
+    # for replay_traffic.py; empty disables recording
+    TRAFFIC_RECORD_PATH = os.getenv("TRAFFIC_RECORD_PATH", "")
+    TRAFFIC_RECORD_SAMPLE = float(os.getenv("TRAFFIC_RECORD_SAMPLE", "1.0"))
+
+    # Batch question answering (/api/batch, batch_chat.py)
+    BATCH_CONCURRENCY = int(os.getenv("BATCH_CONCURRENCY", "8"))
+    BATCH_CHUNK_SIZE = int(os.getenv("BATCH_CHUNK_SIZE", "200"))
+    BATCH_MAX_QUERIES = int(os.getenv("BATCH_MAX_QUERIES", "10000"))
+
+    # Catalogue browsing endpoints (/api/catalogue/...): rows per page
+    BROWSE_PAGE_SIZE = int(os.getenv("BROWSE_PAGE_SIZE", "50"))
+    BROWSE_MAX_PAGE_SIZE = int(os.getenv("BROWSE_MAX_PAGE_SIZE", "500"))
+
+    # Fuzzy matching executors
+    FUZZY_THREADS = int(os.getenv("FUZZY_THREADS", "2"))
+    FUZZY_PROCESSES = int(os.getenv("FUZZY_PROCESSES", "2"))
+    FUZZY_PROCESS_POOL_MIN = int(os.getenv("FUZZY_PROCESS_POOL_MIN", "50000"))
+    FUZZY_CHUNK_SIZE = int(os.getenv("FUZZY_CHUNK_SIZE", "20000"))
+    LOOP_LAG_INTERVAL = float(os.getenv("LOOP_LAG_INTERVAL", "0.1"))
+    LOOP_LAG_THRESHOLD = float(os.getenv("LOOP_LAG_THRESHOLD", "0.05"))
+
+    # Shared HTTP client for LLM calls (pool, timeouts, retries)
+    LLM_HTTP_MAX_CONNECTIONS = int(os.getenv("LLM_HTTP_MAX_CONNECTIONS", "20"))
+    LLM_HTTP_MAX_KEEPALIVE = int(os.getenv("LLM_HTTP_MAX_KEEPALIVE", "10"))
+    LLM_HTTP_KEEPALIVE_EXPIRY = float(os.getenv("LLM_HTTP_KEEPALIVE_EXPIRY", "60"))
+    LLM_HTTP_CONNECT_TIMEOUT = float(os.getenv("LLM_HTTP_CONNECT_TIMEOUT", "5"))
+    LLM_HTTP_READ_TIMEOUT = float(os.getenv("LLM_HTTP_READ_TIMEOUT", "60"))
+    LLM_HTTP2 = os.getenv("LLM_HTTP2", "true").lower() == "true"
+    LLM_RETRY_MAX_ATTEMPTS = int(os.getenv("LLM_RETRY_MAX_ATTEMPTS", "3"))
+    LLM_RETRY_BACKOFF_BASE = float(os.getenv("LLM_RETRY_BACKOFF_BASE", "0.25"))
+    LLM_RETRY_BACKOFF_CAP = float(os.getenv("LLM_RETRY_BACKOFF_CAP", "4"))
+    LLM_RETRY_BUDGET_RATIO = float(os.getenv("LLM_RETRY_BUDGET_RATIO", "0.2"))
+    # Also retry 500/502/504, which may come after the provider already ran (and billed) the completion
+    LLM_RETRY_5XX = os.getenv("LLM_RETRY_5XX", "false").lower() == "true"
+
 settings = Settings()
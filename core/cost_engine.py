@@ -0,0 +1,258 @@
+import time
+from typing import List, NamedTuple
+import numpy as np
+from sqlalchemy import select
+from core import dictionaries
+from core.catalogue import LOAD_BATCH_SIZE, catalogue
+from core.database import AsyncSessionLocal
+from core.singleflight import normalize_key
+from models.models import Medicine, ReimbursementScheme, SchemeType, plan_labels
+
+# MRP upper bounds (INR per pack) of formulary tiers 1-3; dearer drugs are tier 4 (specialty)
+TIER_PRICE_BOUNDS = np.array([50.0, 200.0, 1000.0])
+# Rank key for schemes without a tier: after every real one
+UNKNOWN_TIER = len(TIER_PRICE_BOUNDS) + 2
+
+
+def tier_for_price(mrp):
+    """Default formulary tier (1 = low-cost generic ... 4 = specialty) for a price or an array of prices."""
+    return np.searchsorted(TIER_PRICE_BOUNDS, mrp, side="left") + 1
+
+
+def patient_cost(mrp, coverage_percent, copay_amount):
+    """
+    Out-of-pocket cost per pack: the uncovered share of the MRP plus the flat
+    per-claim co-pay, never more than the MRP itself. NaN where the price is unknown.
+    Works elementwise on scalars or arrays.
+    """
+    mrp = np.asarray(mrp, dtype=float)
+    coverage = np.nan_to_num(np.asarray(coverage_percent, dtype=float))
+    copay = np.nan_to_num(np.asarray(copay_amount, dtype=float))
+    return np.minimum(mrp * (1 - coverage / 100) + copay, mrp)
+
+
+def rank_key(cost):
+    """Sort key for costs with unknown (NaN) ones last."""
+    return np.where(np.isnan(cost), np.inf, cost)
+
+
+def rank(cost, prior_authorization, tier):
+    """
+    Order (indices) from cheapest to dearest. Equal costs put plans without
+    prior authorization first, then lower tiers; unknown costs go last.
+    """
+    tier = np.where(np.isnan(np.asarray(tier, dtype=float)), UNKNOWN_TIER, tier)
+    # lexsort sorts by the last key first
+    return np.lexsort((tier, np.asarray(prior_authorization, dtype=bool), rank_key(cost)))
+
+
+class DrugCoverage(NamedTuple):
+    """One drug's coverage rows (one per plan) as parallel arrays."""
+    mrp: float
+    plans: List[str]
+    govt: np.ndarray
+    coverage: np.ndarray
+    copay_amount: np.ndarray
+    cost: np.ndarray
+    prior_auth: np.ndarray
+    tier: np.ndarray
+
+
+class CostTable:
+    """
+    Every (drug, plan) coverage row as flat NumPy arrays, grouped by drug, for
+    out-of-pocket comparisons across the formulary. One row per drug and plan
+    (the cheapest, when a plan lists a drug twice). Sparse rather than a dense
+    plan x drug grid, so memory follows the number of schemes, not drugs x plans.
+    Like the catalogue, load() swaps in a complete new table.
+    """
+
+    def __init__(self):
+        self.loaded = False
+        self.version = 0
+        self.drug_index = {}
+        self.drug_names = []
+        self.drug_start = np.zeros(1, dtype=np.int64)
+        self.drug_mrp = np.array([])
+        self.plan_names = []
+        self.load_ms = 0.0
+
+    async def load(self):
+        start = time.perf_counter()
+        async with AsyncSessionLocal() as session:
+            await dictionaries.load(session)
+            rows = (await session.execute(select(
+                ReimbursementScheme.drug_name, ReimbursementScheme.plan_id, ReimbursementScheme.coverage_percent,
+                ReimbursementScheme.copay_amount, ReimbursementScheme.prior_authorization, ReimbursementScheme.tier,
+                ReimbursementScheme.scheme_type,
+            ))).all()
+            # Price of the lowest-id medicine with that name, as in the catalogue
+            if catalogue.loaded:
+                prices = {key: record.mrp for key, record in catalogue.by_name.items()}
+            else:
+                prices = {}
+                result = await session.stream(select(Medicine.drug_name, Medicine.mrp).order_by(Medicine.id))
+                async for partition in result.partitions(LOAD_BATCH_SIZE):
+                    for name, price in partition:
+                        if name:
+                            prices.setdefault(normalize_key(name), price)
+
+        names, plan_ids, coverage, copay, prior_auth, tier, scheme_type = (list(col) for col in zip(*rows)) if rows else ([],) * 7
+        # Drug codes in first-seen order: sorting small ints is far cheaper than sorting names
+        drug_index, drug_names = {}, []
+        drug = np.empty(len(names), dtype=np.int64)
+        for i, name in enumerate(names):
+            key = normalize_key(name or "")
+            code = drug_index.get(key)
+            if code is None:
+                code = drug_index[key] = len(drug_names)
+                drug_names.append(name)
+            drug[i] = code
+        plan_ids = np.array([p if p is not None else -1 for p in plan_ids], dtype=np.int64)
+        drug_mrp = np.array([prices.get(key) for key in drug_index], dtype=float)
+        coverage = np.nan_to_num(np.array(coverage, dtype=float))
+        copay = np.nan_to_num(np.array(copay, dtype=float))
+        cost = patient_cost(drug_mrp[drug], coverage, copay)
+        tier = np.array(tier, dtype=float)
+        prior_auth = np.array([bool(p) for p in prior_auth], dtype=bool)
+        govt = np.array([t == SchemeType.GOVT for t in scheme_type], dtype=bool)
+
+        # Sort by drug, plan, then cheapest first, and keep the first row per (drug, plan)
+        order = np.lexsort((rank_key(cost), plan_ids, drug))
+        columns = (drug, plan_ids, cost, tier, prior_auth, govt, coverage, copay)
+        drug, plan_ids, cost, tier, prior_auth, govt, coverage, copay = (a[order] for a in columns)
+        first = np.ones(len(drug), dtype=bool)
+        first[1:] = (drug[1:] != drug[:-1]) | (plan_ids[1:] != plan_ids[:-1])
+        columns = (drug, plan_ids, cost, tier, prior_auth, govt, coverage, copay)
+        drug, plan_ids, cost, tier, prior_auth, govt, coverage, copay = (a[first] for a in columns)
+        plan_ids, row_plan = np.unique(plan_ids, return_inverse=True)
+
+        self.drug_index = drug_index
+        self.drug_names = drug_names
+        self.drug_start = np.searchsorted(drug, np.arange(len(drug_names) + 1)).astype(np.int64)
+        self.drug_mrp = drug_mrp
+        self.row_plan = row_plan.astype(np.int64)
+        self.row_cost = cost
+        # What the plan saves the patient on one pack; NaN for unpriced drugs
+        self.row_saving = drug_mrp[drug] - cost
+        self.row_tier = tier
+        self.row_prior_auth = prior_auth
+        # Terms behind the cost, for the scheme comparison tool
+        self.row_govt = govt
+        self.row_coverage = coverage
+        self.row_copay = copay
+        self.plan_names = [plan_labels.get(int(p)) or "Unknown plan" for p in plan_ids]
+        self.loaded = True
+        self.version += 1
+        self.load_ms = (time.perf_counter() - start) * 1000
+        print(f"DEBUG: Cost table loaded: {len(drug)} coverage rows, {len(drug_names)} drugs, "
+              f"{len(self.plan_names)} plans in {self.load_ms:.0f} ms")
+
+    def _drug_index(self, drug_names):
+        codes = [self.drug_index.get(normalize_key(name), -1) for name in drug_names]
+        idx = np.array(codes, dtype=np.int64)
+        return np.maximum(idx, 0), idx >= 0
+
+    def drug_coverage(self, drug_name: str):
+        """The plans covering one drug (exact name, any case) with their terms, or None."""
+        idx, found = self._drug_index([drug_name])
+        if not found[0]:
+            return None
+        rows = slice(self.drug_start[idx[0]], self.drug_start[idx[0] + 1])
+        return DrugCoverage(
+            mrp=float(self.drug_mrp[idx[0]]),
+            plans=[self.plan_names[p] for p in self.row_plan[rows]],
+            govt=self.row_govt[rows],
+            coverage=self.row_coverage[rows],
+            copay_amount=self.row_copay[rows],
+            cost=self.row_cost[rows],
+            prior_auth=self.row_prior_auth[rows],
+            tier=self.row_tier[rows],
+        )
+
+    def cheapest_plans(self, drug_name: str, limit: int = 5, allow_prior_auth: bool = True) -> list:
+        """Plans covering one drug, cheapest out-of-pocket first."""
+        idx, found = self._drug_index([drug_name])
+        if not found[0]:
+            return []
+        lo, hi = self.drug_start[idx[0]], self.drug_start[idx[0] + 1]
+        cost, tier, prior_auth = self.row_cost[lo:hi], self.row_tier[lo:hi], self.row_prior_auth[lo:hi]
+        order = rank(cost, prior_auth, tier)
+        if not allow_prior_auth:
+            order = order[~prior_auth[order]]
+        return [{
+            "plan": self.plan_names[self.row_plan[lo + i]],
+            "patient_cost": _money(cost[i]),
+            "mrp": _money(self.drug_mrp[idx[0]]),
+            "tier": None if np.isnan(tier[i]) else int(tier[i]),
+            "prior_authorization": bool(prior_auth[i]),
+        } for i in order[:limit]]
+
+    def compare_plans(self, drug_names=None, quantities=None, allow_prior_auth: bool = True) -> dict:
+        """
+        Total out-of-pocket cost of a basket of drugs (default: one pack of every
+        priced drug in the formulary) under each plan, cheapest plan first.
+        A drug a plan does not cover is paid at full MRP, so each plan's total
+        is the full price minus its savings, summed per plan with np.bincount.
+        """
+        if drug_names is None:
+            priced = ~np.isnan(self.drug_mrp)
+            n_drugs, missing, unpriced = int(priced.sum()), [], []
+            full_price = float(self.drug_mrp[priced].sum())
+            rows = ~np.isnan(self.row_saving)
+            if not allow_prior_auth:
+                rows &= ~self.row_prior_auth
+            saving = self.row_saving[rows]
+        else:
+            quantities = np.ones(len(drug_names)) if quantities is None else np.asarray(quantities, dtype=float)
+            if not np.all(np.isfinite(quantities) & (quantities > 0)):
+                raise ValueError("quantities must be positive numbers")
+            idx, found = self._drug_index(drug_names)
+            missing = [name for name, ok in zip(drug_names, found) if not ok]
+            basket, qty = idx[found], quantities[found]
+            priced = ~np.isnan(self.drug_mrp[basket])
+            unpriced = [self.drug_names[i] for i in basket[~priced]]
+            basket, qty = basket[priced], qty[priced]
+            n_drugs = len(basket)
+            full_price = float(np.dot(self.drug_mrp[basket], qty))
+
+            # Coverage rows of the basket drugs, with each row's pack count
+            counts = self.drug_start[basket + 1] - self.drug_start[basket]
+            rows = np.repeat(self.drug_start[basket] - np.cumsum(np.r_[0, counts[:-1]]), counts) + np.arange(counts.sum())
+            row_qty = np.repeat(qty, counts)
+            if not allow_prior_auth:
+                usable = ~self.row_prior_auth[rows]
+                rows, row_qty = rows[usable], row_qty[usable]
+            saving = self.row_saving[rows] * row_qty
+
+        n_plans = len(self.plan_names)
+        plan = self.row_plan[rows]
+        total = full_price - np.bincount(plan, weights=saving, minlength=n_plans)
+        covered = np.bincount(plan, minlength=n_plans)
+        prior_auth = np.bincount(plan, weights=self.row_prior_auth[rows].astype(float), minlength=n_plans)
+        order = np.lexsort((-covered, total))
+        return {
+            "drugs": n_drugs,
+            "full_price": _money(full_price),
+            "plans": [{
+                "plan": self.plan_names[p],
+                "patient_cost": _money(total[p]),
+                "drugs_covered": int(covered[p]),
+                "needs_prior_authorization": int(prior_auth[p]),
+            } for p in order if covered[p]],
+            "not_found": missing,
+            "unpriced": unpriced,
+        }
+
+    def stats(self) -> dict:
+        return {
+            "loaded": self.loaded, "version": self.version, "drugs": len(self.drug_names),
+            "plans": len(self.plan_names), "rows": int(self.drug_start[-1]), "load_ms": round(self.load_ms, 1),
+        }
+
+
+def _money(value):
+    return None if value is None or np.isnan(value) else round(float(value), 2)
+
+
+cost_table = CostTable()
@@ -1,15 +1,43 @@
+from sqlalchemy import event
 from sqlalchemy.ext.asyncio import create_async_engine, AsyncSession
 from sqlalchemy.orm import sessionmaker, declarative_base
 from core.config import settings
+from core import metrics
 
 DATABASE_URL = settings.DATABASE_URL
 
 if DATABASE_URL and DATABASE_URL.startswith("postgres://"):
     DATABASE_URL = DATABASE_URL.replace("postgres://", "postgresql+asyncpg://", 1)
+elif DATABASE_URL and DATABASE_URL.startswith("postgresql://"):
+    DATABASE_URL = DATABASE_URL.replace("postgresql://", "postgresql+asyncpg://", 1)
 
 print(f"DEBUG: core/database.py using DATABASE_URL: {DATABASE_URL}")
 
-engine = create_async_engine(DATABASE_URL, echo=True)
+IS_POSTGRES = DATABASE_URL.startswith("postgresql")
+
+engine_options = {}
+if IS_POSTGRES:
+    engine_options = {
+        "pool_size": settings.DB_POOL_SIZE,
+        "max_overflow": settings.DB_MAX_OVERFLOW,
+        "pool_pre_ping": True,
+        "connect_args": {
+            # asyncpg prepares every statement server-side; keep them per connection
+            # so hot lookups skip parse/plan on repeat
+            "prepared_statement_cache_size": settings.PG_STATEMENT_CACHE_SIZE,
+            # Threshold of the pg_trgm % operator (core.fuzzy.trigram_match)
+            "server_settings": {"pg_trgm.similarity_threshold": str(settings.PG_TRGM_THRESHOLD)},
+        },
+    }
+
+engine = create_async_engine(DATABASE_URL, echo=True, **engine_options)
+
+
+# Statements sent to the database, for /api/metrics and per-request counts in replay_traffic.py
+@event.listens_for(engine.sync_engine, "before_cursor_execute")
+def _count_query(conn, cursor, statement, parameters, context, executemany):
+    metrics.incr("db.queries")
+
 
 AsyncSessionLocal = sessionmaker(
     engine, class_=AsyncSession, expire_on_commit=False
@@ -0,0 +1,98 @@
+from sqlalchemy import event, insert, select
+from sqlalchemy.orm import Session
+from models.models import DrugClass, InsurancePlan, Medicine, ReimbursementScheme, class_labels, plan_labels
+
+
+class Dictionary:
+    """
+    Cached id <-> name mapping for one small lookup table. Reads resolve
+    integer ids through the cache; writes intern new names (see _intern_labels).
+    """
+
+    def __init__(self, model, labels):
+        self.model = model
+        # id -> name, shared with the model properties in models.models
+        self.labels = labels
+        self.ids = {}
+
+    def _fill(self, rows):
+        for row_id, name in rows:
+            self.labels[row_id] = name
+            self.ids[name] = row_id
+
+    async def load(self, session):
+        result = await session.execute(select(self.model.id, self.model.name))
+        self._fill(result.all())
+
+    def intern(self, session, names):
+        """Ids for `names`, inserting unknown ones. Runs inside a sync flush."""
+        missing = {name for name in names if name not in self.ids}
+        if missing:
+            stmt = select(self.model.id, self.model.name).where(self.model.name.in_(missing))
+            self._fill(session.execute(stmt).all())
+            missing -= self.ids.keys()
+        if missing:
+            session.execute(insert(self.model), [{"name": name} for name in sorted(missing)])
+            stmt = select(self.model.id, self.model.name).where(self.model.name.in_(missing))
+            self._fill(session.execute(stmt).all())
+        return self.ids
+
+
+classes = Dictionary(DrugClass, class_labels)
+plans = Dictionary(InsurancePlan, plan_labels)
+
+# Label attribute -> (id column, dictionary) per model
+LABEL_COLUMNS = {
+    Medicine: {
+        "chemical_class": ("chemical_class_id", classes),
+        "habit_forming": ("habit_forming_id", classes),
+        "therapeutic_class": ("therapeutic_class_id", classes),
+        "action_class": ("action_class_id", classes),
+    },
+    ReimbursementScheme: {
+        "plan_name": ("plan_id", plans),
+    },
+}
+
+
+async def load(session):
+    """Load both dictionaries; call once at startup or before bulk reads."""
+    await classes.load(session)
+    await plans.load(session)
+
+
+async def ensure_labels(session, rows):
+    """Reload the dictionaries if any of `rows` points at an id not cached yet."""
+    for row in rows:
+        for id_attr, dictionary in LABEL_COLUMNS[type(row)].values():
+            value = getattr(row, id_attr)
+            if value is not None and value not in dictionary.labels:
+                await load(session)
+                return
+
+
+@event.listens_for(Session, "before_flush")
+def _intern_labels(session, flush_context, instances):
+    """Resolve label strings set on new or changed rows to dictionary ids, one batch per flush."""
+    pending_rows = [
+        obj for obj in list(session.new) + list(session.dirty)
+        if obj.__dict__.get("_pending_labels")
+    ]
+    if not pending_rows:
+        return
+
+    names = {classes: set(), plans: set()}
+    for obj in pending_rows:
+        columns = LABEL_COLUMNS[type(obj)]
+        for attr, value in obj.__dict__["_pending_labels"].items():
+            if value is not None:
+                names[columns[attr][1]].add(value)
+    for dictionary, wanted in names.items():
+        if wanted:
+            dictionary.intern(session, wanted)
+
+    for obj in pending_rows:
+        columns = LABEL_COLUMNS[type(obj)]
+        for attr, value in obj.__dict__.pop("_pending_labels").items():
+            id_attr, dictionary = columns[attr]
+            setattr(obj, id_attr, None if value is None else dictionary.ids[value])
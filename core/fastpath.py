@@ -0,0 +1,143 @@
+import re
+from core import metrics
+from core.catalogue import catalogue
+from core.intent import asks_only, classify_intent
+from core.name_index import name_index
+from tools.drug_db_tool import DETAIL_FIELDS
+from tools.commercial_tools import compare_reimbursement_schemes
+
+# Single-label intents answered straight from the database:
+# label -> (title, Medicine fields; the first one must be present)
+CLINICAL_TEMPLATES = {
+    "dosage": ("Dosage", ["dosage"]),
+    "side_effects": ("Side Effects", ["side_effects"]),
+    "uses": ("Uses", ["uses", "therapeutic_class"]),
+    "contraindications": ("Contraindications", ["contraindications"]),
+    "substitutes": ("Substitutes", ["substitutes"]),
+    "classification": ("Classification", ["therapeutic_class", "action_class", "chemical_class", "habit_forming"]),
+}
+
+FIELD_LABELS = {attr: label for attr, label, _ in DETAIL_FIELDS}
+
+FOOTER = "*Source: IntelliPharma internal clinical database. Confirm with a physician before prescribing or use.*"
+
+_WORD = re.compile(r"[a-z0-9]+")
+# Words, plus the "+" and "/" of combination products as tokens of their own
+_TOKEN = re.compile(r"[a-z0-9][a-z0-9\-]*|[+/]")
+
+
+def _name_key(text: str) -> str:
+    """Names and queries tokenized alike, so "Amoxicillin+Clavulanate" matches "amoxicillin + clavulanate"."""
+    return " ".join(_TOKEN.findall(text.lower()))
+
+
+class FastPath:
+    """
+    Deterministic answers for purely structured questions ("dosage of
+    Metformin", "which schemes reimburse Cetirizine"). The drug is found by
+    exact n-gram match against the in-memory catalogue and scheme names, the
+    intent by the regex classifier, and the answer is rendered from the row.
+    Anything ambiguous (no drug, several drugs, several intents, missing
+    data) or qualified ("dosage of Metformin for a child", "is Metformin
+    safe with alcohol") returns None and takes the LLM path.
+    """
+
+    def __init__(self):
+        self._names = {}
+        self._scheme_keys = set()
+        self._max_words = 0
+        self._version = None
+
+    def _refresh(self):
+        # Rebuilt whenever the catalogue or name index reloads
+        version = (catalogue.version, name_index.version)
+        if version == self._version:
+            return
+        names = {}
+        for record in catalogue.by_id.values():
+            if record.drug_name:
+                names.setdefault(_name_key(record.drug_name), record.drug_name)
+        self._scheme_keys = set()
+        for name in name_index.scheme_names:
+            if name:
+                self._scheme_keys.add(_name_key(name))
+                names.setdefault(_name_key(name), name)
+        self._names = names
+        self._max_words = max((len(key.split()) for key in names), default=0)
+        self._version = version
+
+    def detect_drug(self, query: str):
+        """
+        The one drug the query names, or None when there are none or several.
+        Combination products match when the query writes them with the same
+        separator as the catalogue ("+" or "/"; spacing does not matter).
+        """
+        tokens = _name_key(query).split()
+        spans = []
+        for size in range(min(self._max_words, len(tokens)), 0, -1):
+            for start in range(len(tokens) - size + 1):
+                key = " ".join(tokens[start:start + size])
+                if key in self._names:
+                    spans.append((start, start + size, key))
+        # Drop matches inside a longer one ("vitamin" inside "vitamin d3")
+        outer = {key for start, end, key in spans
+                 if not any(s <= start and end <= e and (s, e) != (start, end) for s, e, _ in spans)}
+        if len(outer) != 1:
+            return None
+        return outer.pop()
+
+    def render_clinical(self, label: str, record) -> str:
+        title, fields = CLINICAL_TEMPLATES[label]
+        if not getattr(record, fields[0]):
+            return None
+        lines = [f"**{title} of {record.drug_name}**", ""]
+        for attr in fields:
+            value = getattr(record, attr)
+            if value:
+                lines.append(f"- **{FIELD_LABELS[attr]}**: {value}")
+        lines.extend(["", FOOTER])
+        return "\n".join(lines)
+
+    async def answer(self, query: str):
+        """Returns (drug name, intent, answer) for a fast-path query, or None."""
+        if not (catalogue.loaded and name_index.loaded):
+            return None
+        self._refresh()
+
+        key = self.detect_drug(query)
+        if key is None:
+            metrics.incr("fastpath.skipped")
+            return None
+        intent = classify_intent(query, has_drug=True)
+        if len(intent.labels) != 1:
+            metrics.incr("fastpath.skipped")
+            return None
+        # Only the bare question: any qualifier (age, condition, another
+        # substance) needs the model, not a dump of the field
+        if not asks_only(query, intent.labels, _WORD.findall(key)):
+            metrics.incr("fastpath.qualified")
+            metrics.incr("fastpath.skipped")
+            return None
+        label = next(iter(intent.labels))
+
+        content = None
+        drug_name = self._names[key]
+        if label in CLINICAL_TEMPLATES:
+            record = catalogue.get(drug_name)
+            if record:
+                content = self.render_clinical(label, record)
+        elif label == "reimbursement" and key in self._scheme_keys:
+            # Exact scheme name, so the tool never falls back to a fuzzy match
+            content = await compare_reimbursement_schemes.ainvoke(drug_name)
+            if not content or content.startswith("Error"):
+                content = None
+
+        if content is None:
+            metrics.incr("fastpath.skipped")
+            return None
+        metrics.incr("fastpath.answered")
+        metrics.incr(f"fastpath.answered.{label}")
+        return drug_name, intent, content
+
+
+fastpath = FastPath()
@@ -0,0 +1,158 @@
+import asyncio
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from difflib import SequenceMatcher
+from sqlalchemy import select, func
+from core import metrics
+from core.config import settings
+from core.name_index import name_index
+
+# Candidate lists registered in each pool process (see _init_worker)
+_WORKER_CANDIDATES = {}
+
+_thread_pool = None
+_process_pool = None
+_process_pool_version = None
+
+
+def best_match(word, candidates, cutoff, start=0, stop=None):
+    """
+    Best (score, name) in candidates[start:stop] with score >= cutoff, or None.
+    Same scoring and tie-breaking as difflib.get_close_matches(n=1), but
+    resumable over slices so the work can be split into cancellable chunks.
+    """
+    s = SequenceMatcher()
+    s.set_seq2(word)
+    best = None
+    for x in candidates[start:stop]:
+        s.set_seq1(x)
+        if s.real_quick_ratio() >= cutoff and s.quick_ratio() >= cutoff:
+            score = s.ratio()
+            if score >= cutoff and (best is None or (score, x) > best):
+                best = (score, x)
+    return best
+
+
+def _init_worker(candidates_by_kind):
+    # Shipped once per pool process instead of once per lookup
+    _WORKER_CANDIDATES.update(candidates_by_kind)
+
+
+def _best_match_in_worker(kind, word, cutoff, start, stop):
+    return best_match(word, _WORKER_CANDIDATES[kind], cutoff, start, stop)
+
+
+def _get_thread_pool():
+    global _thread_pool
+    if _thread_pool is None:
+        _thread_pool = ThreadPoolExecutor(max_workers=settings.FUZZY_THREADS, thread_name_prefix="fuzzy")
+    return _thread_pool
+
+
+def _get_process_pool():
+    global _process_pool, _process_pool_version
+    if _process_pool_version != name_index.version:
+        if _process_pool is not None:
+            _process_pool.shutdown(wait=False, cancel_futures=True)
+        # spawn: never fork a process that runs an event loop and DB threads
+        _process_pool = ProcessPoolExecutor(
+            max_workers=settings.FUZZY_PROCESSES,
+            mp_context=multiprocessing.get_context("spawn"),
+            initializer=_init_worker,
+            initargs=({"medicine": name_index.medicine_names, "scheme": name_index.scheme_names},),
+        )
+        _process_pool_version = name_index.version
+    return _process_pool
+
+
+def _index_kind(candidates):
+    if candidates is name_index.medicine_names:
+        return "medicine"
+    if candidates is name_index.scheme_names:
+        return "scheme"
+    return None
+
+
+async def fuzzy_match(name: str, candidates, cutoff: float):
+    """
+    Closest candidate to `name` (or None), computed off the event loop.
+    Large index lists go to a process pool, everything else to a dedicated
+    thread pool. The scan runs in chunks; cancelling the awaiting task
+    (e.g. the client disconnected) stops it before the next chunk.
+    """
+    loop = asyncio.get_running_loop()
+    chunk = settings.FUZZY_CHUNK_SIZE
+    kind = _index_kind(candidates)
+    use_processes = (
+        kind is not None
+        and settings.FUZZY_PROCESSES > 0
+        and len(candidates) >= settings.FUZZY_PROCESS_POOL_MIN
+    )
+    metrics.incr("fuzzy.process_lookups" if use_processes else "fuzzy.thread_lookups")
+
+    best = None
+    try:
+        if use_processes:
+            pool = _get_process_pool()
+            futures = [
+                loop.run_in_executor(pool, _best_match_in_worker, kind, name, cutoff, start, start + chunk)
+                for start in range(0, len(candidates), chunk)
+            ]
+            for result in await asyncio.gather(*futures):
+                if result and (best is None or result > best):
+                    best = result
+        else:
+            pool = _get_thread_pool()
+            for start in range(0, len(candidates), chunk):
+                result = await loop.run_in_executor(
+                    pool, best_match, name, candidates, cutoff, start, start + chunk
+                )
+                if result and (best is None or result > best):
+                    best = result
+    except asyncio.CancelledError:
+        metrics.incr("fuzzy.cancelled")
+        raise
+
+    return best[1] if best else None
+
+
+async def prewarm():
+    """Start pool processes at startup so the first lookup does not pay for spawning them."""
+    if settings.FUZZY_PROCESSES > 0 and len(name_index.medicine_names) >= settings.FUZZY_PROCESS_POOL_MIN:
+        loop = asyncio.get_running_loop()
+        pool = _get_process_pool()
+        await asyncio.gather(*[
+            loop.run_in_executor(pool, _best_match_in_worker, "medicine", "", 1.0, 0, 0)
+            for _ in range(settings.FUZZY_PROCESSES)
+        ])
+
+
+def shutdown():
+    global _thread_pool, _process_pool, _process_pool_version
+    if _thread_pool is not None:
+        _thread_pool.shutdown(wait=False, cancel_futures=True)
+        _thread_pool = None
+    if _process_pool is not None:
+        _process_pool.shutdown(wait=False, cancel_futures=True)
+        _process_pool = None
+        _process_pool_version = None
+
+
+async def trigram_match(session, column, name: str, cutoff: float):
+    """
+    Postgres replacement for fuzzy_match over every name: one query on the
+    pg_trgm GIN index returns the PG_TRGM_CANDIDATES most similar values
+    (above pg_trgm.similarity_threshold), and only those few are re-scored
+    with the same difflib ratio and cutoff, so results match the SQLite path.
+    """
+    stmt = (
+        select(column)
+        .where(column.op("%")(name))
+        .group_by(column)
+        .order_by(func.similarity(column, name).desc())
+        .limit(settings.PG_TRGM_CANDIDATES)
+    )
+    result = await session.execute(stmt)
+    metrics.incr("fuzzy.trigram_queries")
+    match = best_match(name, result.scalars().all(), cutoff)
+    return match[1] if match else None
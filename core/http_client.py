@@ -0,0 +1,120 @@
+import asyncio
+import importlib.util
+import random
+import httpx
+from core import metrics
+from core.config import settings
+
+# Only failures where the provider did not run the completion are retried,
+# so a retry never pays for the same completion twice: connection errors
+# before the request was sent, rate limiting and "unavailable"
+RETRY_STATUSES = {429, 503}
+RETRY_EXCEPTIONS = (httpx.ConnectError, httpx.ConnectTimeout, httpx.PoolTimeout)
+
+# Other upstream errors may come after the provider generated (and billed)
+# the completion; retried only with LLM_RETRY_5XX
+RETRY_5XX_STATUSES = {500, 502, 504}
+
+
+class RetryBudget:
+    """
+    Token bucket limiting retries to a fraction of traffic. Every request
+    deposits `ratio` tokens and every retry withdraws one, so an upstream
+    outage cannot multiply load by the retry count.
+    """
+
+    def __init__(self, ratio: float, initial: float = 10.0, maximum: float = 100.0):
+        self.ratio = ratio
+        self.maximum = maximum
+        self.tokens = initial
+
+    def deposit(self):
+        self.tokens = min(self.maximum, self.tokens + self.ratio)
+
+    def withdraw(self) -> bool:
+        if self.tokens < 1:
+            return False
+        self.tokens -= 1
+        return True
+
+
+class RetryTransport(httpx.AsyncBaseTransport):
+    """Wraps a transport with capped, fully jittered exponential backoff."""
+
+    def __init__(self, transport: httpx.AsyncBaseTransport, max_attempts: int,
+                 backoff_base: float, backoff_cap: float, budget: RetryBudget,
+                 retry_statuses=RETRY_STATUSES):
+        self._transport = transport
+        self.retry_statuses = retry_statuses
+        self.max_attempts = max_attempts
+        self.backoff_base = backoff_base
+        self.backoff_cap = backoff_cap
+        self.budget = budget
+
+    def _can_retry(self, attempt: int) -> bool:
+        if attempt + 1 >= self.max_attempts:
+            return False
+        if not self.budget.withdraw():
+            metrics.incr("llm_http.retry_budget_exhausted")
+            return False
+        return True
+
+    def _backoff(self, attempt: int, response=None) -> float:
+        delay = random.uniform(0, min(self.backoff_cap, self.backoff_base * (2 ** attempt)))
+        retry_after = response.headers.get("Retry-After") if response is not None else None
+        if retry_after and retry_after.isdigit():
+            delay = max(delay, min(float(retry_after), self.backoff_cap))
+        return delay
+
+    async def handle_async_request(self, request: httpx.Request) -> httpx.Response:
+        self.budget.deposit()
+        attempt = 0
+        while True:
+            response = None
+            try:
+                response = await self._transport.handle_async_request(request)
+            except RETRY_EXCEPTIONS:
+                if not self._can_retry(attempt):
+                    raise
+            else:
+                if response.status_code not in self.retry_statuses or not self._can_retry(attempt):
+                    return response
+                await response.aclose()
+
+            metrics.incr("llm_http.retries")
+            await asyncio.sleep(self._backoff(attempt, response))
+            attempt += 1
+
+    async def aclose(self):
+        await self._transport.aclose()
+
+
+def create_http_client() -> httpx.AsyncClient:
+    """
+    Build the shared async client used for all outbound LLM calls.
+    Created once in the FastAPI lifespan and closed on shutdown.
+    """
+    http2 = settings.LLM_HTTP2 and importlib.util.find_spec("h2") is not None
+    if settings.LLM_HTTP2 and not http2:
+        print("DEBUG: LLM_HTTP2 requested but 'h2' is not installed, using HTTP/1.1")
+
+    limits = httpx.Limits(
+        max_connections=settings.LLM_HTTP_MAX_CONNECTIONS,
+        max_keepalive_connections=settings.LLM_HTTP_MAX_KEEPALIVE,
+        keepalive_expiry=settings.LLM_HTTP_KEEPALIVE_EXPIRY,
+    )
+    transport = RetryTransport(
+        httpx.AsyncHTTPTransport(http2=http2, limits=limits),
+        max_attempts=settings.LLM_RETRY_MAX_ATTEMPTS,
+        backoff_base=settings.LLM_RETRY_BACKOFF_BASE,
+        backoff_cap=settings.LLM_RETRY_BACKOFF_CAP,
+        budget=RetryBudget(settings.LLM_RETRY_BUDGET_RATIO),
+        retry_statuses=RETRY_STATUSES | RETRY_5XX_STATUSES if settings.LLM_RETRY_5XX else RETRY_STATUSES,
+    )
+    timeout = httpx.Timeout(
+        connect=settings.LLM_HTTP_CONNECT_TIMEOUT,
+        read=settings.LLM_HTTP_READ_TIMEOUT,
+        write=settings.LLM_HTTP_CONNECT_TIMEOUT,
+        pool=settings.LLM_HTTP_CONNECT_TIMEOUT,
+    )
+    return httpx.AsyncClient(transport=transport, timeout=timeout)
@@ -0,0 +1,113 @@
+import re
+from typing import FrozenSet, NamedTuple
+
+# Medicine columns the clinical formatter can emit
+ALL_FIELDS = frozenset({
+    "therapeutic_class", "action_class", "chemical_class", "habit_forming",
+    "uses", "dosage", "contraindications", "side_effects", "substitutes",
+})
+
+CLASS_FIELDS = frozenset({"therapeutic_class", "action_class", "chemical_class", "habit_forming"})
+
+# (label, pattern, Medicine fields needed). Patterns use word boundaries so
+# "use" does not fire on "because" or "user".
+CLINICAL_RULES = [
+    ("dosage", r"\b(dose|doses|dosage|dosing|posology|how much|how often|how many|mg|strength)\b",
+     frozenset({"dosage"})),
+    ("side_effects", r"\b(side[- ]?effects?|adverse|reactions?|toxicity|safety|safe)\b",
+     frozenset({"side_effects"})),
+    ("uses", r"\b(uses?|used|indications?|indicated|treats?|treatment|prescribed|good for)\b",
+     frozenset({"uses", "therapeutic_class"})),
+    ("contraindications", r"\b(contraindications?|contraindicated|avoid|should not|pregnan\w*|warnings?|precautions?)\b",
+     frozenset({"contraindications"})),
+    ("substitutes", r"\b(substitutes?|alternatives?|generics?|equivalents?|replacements?|brands?)\b",
+     frozenset({"substitutes"})),
+    ("classification", r"\b(class|category|mechanism|moa|how does \w+ work|habit[- ]forming|addictive)\b",
+     CLASS_FIELDS),
+]
+
+REIMBURSEMENT_PATTERN = re.compile(
+    r"\b(reimburs\w*|insurance|insurers?|cover|covers|coverage|covered|schemes?|plans?|"
+    r"co-?pays?|cghs|echs|esi|pmjay|ayushman|price|prices|cost|costs|afford\w*|cashless)\b"
+)
+COMPARISON_PATTERN = re.compile(r"\b(compare|comparison|versus|vs|difference|differ|better)\b")
+OVERVIEW_PATTERN = re.compile(r"\b(what is|what are|tell me about|about|overview|details?|information|info)\b")
+
+_COMPILED_RULES = [(label, re.compile(pattern), fields) for label, pattern, fields in CLINICAL_RULES]
+
+# The keywords behind each label, for matching a query against a question template
+LABEL_PATTERNS = {
+    **{label: pattern for label, pattern, _ in _COMPILED_RULES},
+    "reimbursement": REIMBURSEMENT_PATTERN,
+    "comparison": COMPARISON_PATTERN,
+    "overview": OVERVIEW_PATTERN,
+}
+
+# Words a query may add to a question template without asking something else
+FILLER_WORDS = frozenset({
+    "a", "an", "the", "of", "for", "on", "in", "to", "me", "my", "i", "you", "can", "could", "please",
+    "give", "show", "tell", "what", "which", "is", "are", "does", "do", "its", "s", "drug", "medicine",
+    "tablet", "tablets", "government",
+})
+
+_WORD = re.compile(r"[a-z0-9]+")
+
+
+class Intent(NamedTuple):
+    labels: FrozenSet[str]
+    clinical: bool
+    reimbursement: bool
+    fields: FrozenSet[str]
+
+
+def classify_intent(query: str, has_drug: bool = True) -> Intent:
+    """
+    Decide which retrieval branches (clinical, reimbursement) a query needs
+    and which Medicine fields the clinical branch should return.
+    Pure regex, no I/O; runs in microseconds.
+    """
+    text = query.lower()
+    labels = set()
+    fields = set()
+
+    for label, pattern, label_fields in _COMPILED_RULES:
+        if pattern.search(text):
+            labels.add(label)
+            fields |= label_fields
+
+    reimbursement = bool(REIMBURSEMENT_PATTERN.search(text))
+    if reimbursement:
+        labels.add("reimbursement")
+
+    if COMPARISON_PATTERN.search(text):
+        labels.add("comparison")
+        fields |= ALL_FIELDS
+
+    if not labels:
+        # Nothing specific asked ("Tell me about X", or just a drug name): the
+        # full clinical monograph. Coverage only when a cost or coverage keyword
+        # asks for it, and then the reimbursement rule above has matched.
+        labels.add("overview")
+        if OVERVIEW_PATTERN.search(text) or has_drug:
+            fields |= ALL_FIELDS
+
+    clinical = bool(fields)
+    return Intent(frozenset(labels), clinical, reimbursement, frozenset(fields))
+
+
+def clinical_fields(intent: Intent):
+    """Medicine fields for get_drug_details; None means all of them."""
+    return None if intent.fields == ALL_FIELDS else sorted(intent.fields)
+
+
+def asks_only(query: str, labels, allowed=frozenset()) -> bool:
+    """
+    Whether `query` asks for `labels` and nothing more: once their keywords,
+    filler words and the `allowed` words (the drug name, a template's own
+    words) are removed, no word may remain. "Dosage of Metformin" passes,
+    "dosage of Metformin for a child with kidney failure" does not.
+    """
+    text = query.lower()
+    for label in labels:
+        text = LABEL_PATTERNS[label].sub(" ", text)
+    return set(_WORD.findall(text)) <= FILLER_WORDS | set(allowed)
@@ -0,0 +1,230 @@
+import asyncio
+from typing import Any, List, Optional
+from langchain_core.callbacks import AsyncCallbackManagerForLLMRun, CallbackManagerForLLMRun
+from langchain_core.language_models.chat_models import BaseChatModel
+from langchain_core.messages import AIMessage, AIMessageChunk, BaseMessage
+from langchain_core.outputs import ChatGeneration, ChatGenerationChunk, ChatResult
+from langchain_openai import ChatOpenAI
+from core import metrics, traffic
+from core.admission import llm_slots
+from core.config import settings
+
+# Capitalised words that start questions rather than name drugs
+_STUB_STOPWORDS = {
+    "what", "which", "compare", "tell", "how", "is", "are", "does", "do", "can",
+    "the", "give", "show", "list", "explain", "difference", "between", "and",
+}
+
+
+class StubChatModel(BaseChatModel):
+    """
+    In-process, deterministic chat model for offline tests and load runs.
+    The extraction stage gets the capitalised words of the query back; the
+    answer stage gets a short canned answer.
+    """
+
+    stage: str = "answer"
+    latency: float = 0.0
+
+    @property
+    def _llm_type(self) -> str:
+        return "stub"
+
+    def _respond(self, messages: List[BaseMessage]) -> str:
+        query = messages[-1].content
+        if self.stage != "extraction":
+            return f"**Stub Answer**\n\n{query}"
+
+        names = [
+            word.strip("?,.!") for word in query.split()
+            if word[:1].isupper() and word.strip("?,.!").lower() not in _STUB_STOPWORDS
+        ]
+        return ", ".join(names) if names else "None"
+
+    def _generate(self, messages: List[BaseMessage], stop: Optional[List[str]] = None,
+                  run_manager: Optional[CallbackManagerForLLMRun] = None, **kwargs: Any) -> ChatResult:
+        message = AIMessage(content=self._respond(messages))
+        return ChatResult(generations=[ChatGeneration(message=message)])
+
+    async def _agenerate(self, messages: List[BaseMessage], stop: Optional[List[str]] = None,
+                         run_manager: Optional[AsyncCallbackManagerForLLMRun] = None, **kwargs: Any) -> ChatResult:
+        if self.latency:
+            await asyncio.sleep(self.latency)
+        return self._generate(messages, stop=stop, **kwargs)
+
+    async def _astream(self, messages: List[BaseMessage], stop: Optional[List[str]] = None,
+                       run_manager: Optional[AsyncCallbackManagerForLLMRun] = None, **kwargs: Any):
+        # Word-sized chunks, with the latency spread over the stream
+        words = self._respond(messages).split(" ")
+        for i, word in enumerate(words):
+            if self.latency:
+                await asyncio.sleep(self.latency / len(words))
+            text = word if i == len(words) - 1 else word + " "
+            yield ChatGenerationChunk(message=AIMessageChunk(content=text))
+
+
+class ReplayChatModel(StubChatModel):
+    """
+    Answers with the LLM outputs recorded for the case being replayed
+    (core/traffic.py, replay_traffic.py), so recorded traffic reruns offline.
+    Calls the recording does not have get the stub answer and are counted.
+    """
+
+    @property
+    def _llm_type(self) -> str:
+        return "replay"
+
+    def _respond(self, messages: List[BaseMessage]) -> str:
+        content = traffic.recorded_output(self.stage)
+        return content if content is not None else super()._respond(messages)
+
+
+def _openai_kwargs(http_async_client):
+    if http_async_client is None:
+        return {}
+    # Retries are handled (jittered, budgeted) by the shared client's transport
+    return {"http_async_client": http_async_client, "max_retries": 0}
+
+
+def _build_openrouter(stage, model, http_async_client):
+    return ChatOpenAI(
+        model=model or settings.OPENROUTER_MODEL,
+        openai_api_key=settings.OPENROUTER_API_KEY,
+        openai_api_base=settings.OPENROUTER_BASE_URL,
+        temperature=0,
+        stream_usage=True,
+        **_openai_kwargs(http_async_client)
+    )
+
+
+def _build_ollama(stage, model, http_async_client):
+    # Ollama serves an OpenAI-compatible API under /v1; the key is ignored
+    return ChatOpenAI(
+        model=model or settings.OLLAMA_MODEL,
+        openai_api_key="ollama",
+        openai_api_base=f"{settings.OLLAMA_BASE_URL.rstrip('/')}/v1",
+        temperature=0,
+        stream_usage=True,
+        **_openai_kwargs(http_async_client)
+    )
+
+
+def _build_stub(stage, model, http_async_client):
+    return StubChatModel(stage=stage, latency=settings.STUB_LLM_LATENCY)
+
+
+def _build_replay(stage, model, http_async_client):
+    return ReplayChatModel(stage=stage)
+
+
+PROVIDERS = {
+    "openrouter": _build_openrouter,
+    "ollama": _build_ollama,
+    "stub": _build_stub,
+    "replay": _build_replay,
+}
+
+
+class StageLLM:
+    """
+    One pipeline stage (extraction, answer) bound to a provider and model.
+    Every stage exposes the same ainvoke() and enforces its own timeout.
+    """
+
+    def __init__(self, stage: str, provider: str, model: Optional[str], timeout: float):
+        if provider not in PROVIDERS:
+            raise ValueError(f"Unknown LLM provider '{provider}' for stage '{stage}'. Choose from: {', '.join(PROVIDERS)}")
+        self.stage = stage
+        self.provider = provider
+        self.timeout = timeout
+        self._model_name = model
+        self.model = PROVIDERS[provider](stage, model, None)
+
+    @property
+    def model_name(self) -> str:
+        return getattr(self.model, "model_name", None) or self.provider
+
+    def configure_http_client(self, http_async_client):
+        self.model = PROVIDERS[self.provider](self.stage, self._model_name, http_async_client)
+
+    def use_provider(self, provider: str):
+        if provider not in PROVIDERS:
+            raise ValueError(f"Unknown LLM provider '{provider}'. Choose from: {', '.join(PROVIDERS)}")
+        self.provider = provider
+        self.model = PROVIDERS[provider](self.stage, self._model_name, None)
+
+    async def ainvoke(self, messages):
+        metrics.incr(f"llm.{self.stage}.calls")
+        # All outbound LLM calls share one concurrency limit (upstream rate limits)
+        async with llm_slots:
+            try:
+                response = await asyncio.wait_for(self.model.ainvoke(messages), timeout=self.timeout)
+            except asyncio.TimeoutError:
+                metrics.incr(f"llm.{self.stage}.timeouts")
+                raise
+            except asyncio.CancelledError:
+                # Request abandoned; the upstream call is dropped with it
+                metrics.incr(f"llm.{self.stage}.cancelled")
+                raise
+        self._record_usage(response)
+        return response
+
+    async def astream(self, messages):
+        """
+        Yield AIMessageChunks as the model produces them. The stage timeout
+        bounds the whole stream, not each chunk.
+        """
+        metrics.incr(f"llm.{self.stage}.calls")
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + self.timeout
+        message = None
+        async with llm_slots:
+            stream = self.model.astream(messages)
+            try:
+                while True:
+                    try:
+                        chunk = await asyncio.wait_for(anext(stream), timeout=deadline - loop.time())
+                    except StopAsyncIteration:
+                        break
+                    except asyncio.TimeoutError:
+                        metrics.incr(f"llm.{self.stage}.timeouts")
+                        raise
+                    except asyncio.CancelledError:
+                        metrics.incr(f"llm.{self.stage}.cancelled")
+                        raise
+                    message = chunk if message is None else message + chunk
+                    yield chunk
+            finally:
+                await stream.aclose()
+        if message is not None:
+            self._record_usage(message)
+
+    def _record_usage(self, response):
+        # Providers report prompt-cache hits as input_token_details.cache_read
+        usage = getattr(response, "usage_metadata", None)
+        if not usage:
+            return
+        metrics.incr(f"llm.{self.stage}.prompt_tokens", usage.get("input_tokens", 0))
+        metrics.incr(f"llm.{self.stage}.completion_tokens", usage.get("output_tokens", 0))
+        cached = (usage.get("input_token_details") or {}).get("cache_read") or 0
+        metrics.incr(f"llm.{self.stage}.cached_prompt_tokens", cached)
+
+
+extraction_llm = StageLLM(
+    "extraction", settings.EXTRACTION_PROVIDER, settings.EXTRACTION_MODEL, settings.EXTRACTION_TIMEOUT
+)
+answer_llm = StageLLM(
+    "answer", settings.ANSWER_PROVIDER, settings.ANSWER_MODEL, settings.ANSWER_TIMEOUT
+)
+
+
+def configure_http_client(http_async_client):
+    """Route all stages through the shared client created in the app lifespan."""
+    extraction_llm.configure_http_client(http_async_client)
+    answer_llm.configure_http_client(http_async_client)
+
+
+def use_provider(provider: str):
+    """Switch every stage to one provider (replay_traffic.py uses "replay")."""
+    extraction_llm.use_provider(provider)
+    answer_llm.use_provider(provider)
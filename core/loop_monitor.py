@@ -0,0 +1,53 @@
+import asyncio
+import time
+from core import metrics
+from core.config import settings
+
+
+class LoopLagMonitor:
+    """
+    Sleeps for a fixed interval and measures how late it wakes up. Any
+    delay beyond the interval is time the event loop spent blocked by
+    synchronous work (CPU-bound matching, blocking I/O, ...).
+    """
+
+    def __init__(self, interval: float, threshold: float):
+        self.interval = interval
+        self.threshold = threshold
+        self.max_lag = 0.0
+        self.last_lag = 0.0
+        self._task = None
+
+    async def _run(self):
+        while True:
+            start = time.perf_counter()
+            await asyncio.sleep(self.interval)
+            lag = time.perf_counter() - start - self.interval
+            self.last_lag = lag
+            self.max_lag = max(self.max_lag, lag)
+            if lag >= self.threshold:
+                metrics.incr("event_loop.stalls")
+                metrics.incr("event_loop.blocked_ms", int(lag * 1000))
+                print(f"DEBUG: Event loop blocked for {lag * 1000:.0f}ms")
+
+    def start(self):
+        if self._task is None:
+            self._task = asyncio.get_running_loop().create_task(self._run())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    def stats(self) -> dict:
+        return {
+            "last_lag_ms": round(self.last_lag * 1000, 2),
+            "max_lag_ms": round(self.max_lag * 1000, 2),
+        }
+
+
+loop_monitor = LoopLagMonitor(settings.LOOP_LAG_INTERVAL, settings.LOOP_LAG_THRESHOLD)
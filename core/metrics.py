@@ -0,0 +1,17 @@
+from collections import Counter
+
+# Process-wide counters (coalesced lookups, rejected requests, ...).
+# Exposed through /api/metrics; values are per worker process.
+_counters = Counter()
+
+
+def incr(name: str, amount: int = 1):
+    _counters[name] += amount
+
+
+def get(name: str) -> int:
+    return _counters[name]
+
+
+def snapshot() -> dict:
+    return dict(sorted(_counters.items()))
@@ -0,0 +1,165 @@
+import importlib
+import pkgutil
+from datetime import datetime
+from typing import Awaitable, Callable, NamedTuple
+from sqlalchemy import inspect, select, text
+
+import migrations as migrations_package
+from models.models import Base, SchemaMigration
+
+
+class Migration(NamedTuple):
+    version: int
+    name: str
+    upgrade: Callable[["Operations"], Awaitable[None]]
+    # False runs the migration on an autocommit connection (CREATE INDEX CONCURRENTLY, VACUUM)
+    transactional: bool
+
+
+class Operations:
+    """
+    What a migration's upgrade(op) gets: the connection plus dialect-aware,
+    idempotent schema helpers. A migration must be safe to re-run, since a
+    new database is created from models/models.py and stamped instead.
+    """
+
+    def __init__(self, conn, transactional):
+        self.conn = conn
+        self.dialect = conn.dialect.name
+        self.transactional = transactional
+
+    async def execute(self, sql, **params):
+        return await self.conn.execute(text(sql), params)
+
+    async def has_table(self, table):
+        return await self.conn.run_sync(lambda c: inspect(c).has_table(table))
+
+    async def columns(self, table):
+        return await self.conn.run_sync(lambda c: {col["name"] for col in inspect(c).get_columns(table)})
+
+    async def indexes(self, table):
+        return await self.conn.run_sync(_index_names, table)
+
+    async def create_tables(self, *tables):
+        """Create the given model tables (all of them by default) that do not exist yet."""
+        tables = [t.__table__ for t in tables] or None
+        await self.conn.run_sync(Base.metadata.create_all, tables=tables, checkfirst=True)
+
+    async def add_column(self, table, column, ddl):
+        """ALTER TABLE ... ADD COLUMN unless it exists. Keep ddl nullable (or with a constant default) so no rewrite is needed."""
+        if column in await self.columns(table):
+            return False
+        await self.execute(f"ALTER TABLE {table} ADD COLUMN {column} {ddl}")
+        return True
+
+    async def create_index(self, name, table, columns, using=None, unique=False):
+        """
+        Build an index if it does not exist. On Postgres, outside a transaction,
+        it is built CONCURRENTLY so the table stays writable; an invalid index
+        left behind by an interrupted concurrent build is dropped and rebuilt.
+        """
+        postgres = self.dialect == "postgresql"
+        concurrently = "CONCURRENTLY " if postgres and not self.transactional else ""
+        if postgres:
+            invalid = await self.execute(
+                "SELECT 1 FROM pg_index i JOIN pg_class c ON c.oid = i.indexrelid "
+                "WHERE c.relname = :name AND NOT i.indisvalid", name=name)
+            if invalid.first():
+                print(f"DEBUG: Dropping invalid index {name} from an interrupted build")
+                await self.execute(f"DROP INDEX {concurrently}IF EXISTS {name}")
+        method = f" USING {using}" if using and postgres else ""
+        await self.execute(
+            f"CREATE {'UNIQUE ' if unique else ''}INDEX {concurrently}IF NOT EXISTS {name} "
+            f"ON {table}{method} ({columns})"
+        )
+
+
+def load_migrations():
+    """Every migrations/vNNNN_*.py module, in version order."""
+    found = []
+    for module_info in pkgutil.iter_modules(migrations_package.__path__):
+        module = importlib.import_module(f"{migrations_package.__name__}.{module_info.name}")
+        found.append(Migration(
+            version=module.VERSION,
+            name=module_info.name.split("_", 1)[1],
+            upgrade=module.upgrade,
+            transactional=getattr(module, "TRANSACTIONAL", True),
+        ))
+    found.sort(key=lambda m: m.version)
+    versions = [m.version for m in found]
+    if versions != list(range(1, len(found) + 1)):
+        raise RuntimeError(f"Migration versions must run 1..N without gaps or repeats, got {versions}")
+    return found
+
+
+async def applied(engine):
+    """version -> applied_at for this database."""
+    async with engine.begin() as conn:
+        await conn.run_sync(SchemaMigration.__table__.create, checkfirst=True)
+        rows = await conn.execute(select(SchemaMigration.version, SchemaMigration.applied_at))
+        return dict(rows.all())
+
+
+async def _record(conn, migration):
+    await conn.execute(SchemaMigration.__table__.insert().values(
+        version=migration.version, name=migration.name, applied_at=datetime.utcnow()))
+
+
+async def upgrade(engine, target=None):
+    """
+    Apply pending migrations up to target (default: all), in order.
+    A transactional migration and its version row commit together.
+    Returns the migrations that ran.
+    """
+    done = await applied(engine)
+    pending = [m for m in load_migrations() if m.version not in done and (target is None or m.version <= target)]
+    for migration in pending:
+        print(f"Applying {migration.version:04d} {migration.name}")
+        if migration.transactional:
+            async with engine.begin() as conn:
+                await migration.upgrade(Operations(conn, transactional=True))
+                await _record(conn, migration)
+        else:
+            async with engine.connect() as conn:
+                conn = await conn.execution_options(isolation_level="AUTOCOMMIT")
+                await migration.upgrade(Operations(conn, transactional=False))
+                await _record(conn, migration)
+    return pending
+
+
+async def stamp(engine, target=None):
+    """Mark migrations as applied without running them: for a database just built by create_all."""
+    done = await applied(engine)
+    async with engine.begin() as conn:
+        for migration in load_migrations():
+            if migration.version not in done and (target is None or migration.version <= target):
+                await _record(conn, migration)
+
+
+def _index_names(conn, table):
+    """Index names on a table, expression indexes included (SQLAlchemy does not reflect those on SQLite)."""
+    if conn.dialect.name == "sqlite":
+        rows = conn.execute(text("SELECT name FROM sqlite_master WHERE type = 'index' AND tbl_name = :table"), {"table": table})
+        return {row[0] for row in rows}
+    return {ix["name"] for ix in inspect(conn).get_indexes(table)}
+
+
+def _drift(conn):
+    db = inspect(conn)
+    problems = []
+    for table in Base.metadata.sorted_tables:
+        if not db.has_table(table.name):
+            problems.append(f"missing table {table.name}")
+            continue
+        existing = {c["name"] for c in db.get_columns(table.name)}
+        problems += [f"missing column {table.name}.{c.name}" for c in table.columns if c.name not in existing]
+        problems += [f"unexpected column {table.name}.{name}" for name in sorted(existing - set(table.columns.keys()))]
+        indexes = _index_names(conn, table.name)
+        problems += [f"missing index {ix.name}" for ix in table.indexes if ix.name not in indexes]
+    return problems
+
+
+async def drift(engine):
+    """Differences between the database and models/models.py; empty when they agree."""
+    async with engine.connect() as conn:
+        return await conn.run_sync(_drift)
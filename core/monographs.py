@@ -0,0 +1,137 @@
+import hashlib
+import re
+from sqlalchemy import select
+from sqlalchemy.exc import DBAPIError
+from core import metrics
+from core.database import AsyncSessionLocal
+from core.intent import asks_only, classify_intent, clinical_fields
+from core.prompts import SYSTEM_PROMPT, CONTEXT_TEMPLATE, assemble_context
+from core.singleflight import normalize_key
+from models.models import Monograph
+from tools.drug_db_tool import get_drug_details
+from tools.commercial_tools import compare_reimbursement_schemes
+
+# Head-query shapes worth precomputing: intent -> the question it answers.
+# A user query is served from a monograph only when it names the same single
+# drug, classifies to the same intent labels and asks nothing the template
+# does not (see matches_template); otherwise the monograph is only context.
+MONOGRAPH_QUERIES = {
+    "overview": "Tell me about {drug}",
+    "dosage": "What is the dosage of {drug}?",
+    "side_effects": "What are the side effects of {drug}?",
+    "reimbursement": "Which schemes reimburse {drug}?",
+}
+
+# Same constraints the system prompt places on answers
+FORBIDDEN_TERMS = re.compile(r"\b(medicare|medicaid|fda|nhs|cpt|hcpcs)\b", re.IGNORECASE)
+
+
+def context_hash(context: str) -> str:
+    """Fingerprint of everything an answer depends on: prompt and retrieved context."""
+    return hashlib.sha256("\0".join((SYSTEM_PROMPT, CONTEXT_TEMPLATE, context)).encode()).hexdigest()
+
+
+async def build_context(drug: str, query: str):
+    """Retrieve the context node_agent would build for `query` naming `drug`. Returns (intent, context)."""
+    intent = classify_intent(query, has_drug=True)
+    clinical_results = commercial_results = ""
+    if intent.clinical:
+        clinical_results = await get_drug_details.ainvoke({"drug_names": drug, "fields": clinical_fields(intent)})
+    if intent.reimbursement and len(drug) < 50:
+        commercial_results = await compare_reimbursement_schemes.ainvoke(drug)
+    return intent, assemble_context(clinical_results, commercial_results)
+
+
+def _words(text):
+    return re.findall(r"[a-z0-9]+", text.lower())
+
+
+def matches_template(query: str, drug: str, intent_name: str) -> bool:
+    """
+    Whether `query` asks exactly what the monograph template asks: once the
+    drug name, the intent's own keywords ("dose" for dosage) and filler words
+    are removed, no word may remain that the template lacks. "Is Metformin ok
+    with alcohol?" classifies as an overview but is not "Tell me about Metformin".
+    """
+    template = MONOGRAPH_QUERIES[intent_name]
+    labels = classify_intent(template.format(drug=drug), has_drug=True).labels
+    return asks_only(query, labels, set(_words(template.format(drug=""))) | set(_words(drug)))
+
+
+def validate_answer(answer: str, drug: str) -> list:
+    """Reasons a generated monograph must not be stored (empty list when it is fine)."""
+    problems = []
+    if not answer or not answer.strip():
+        return ["empty answer"]
+    if drug.lower() not in answer.lower():
+        problems.append("drug name not mentioned")
+    if FORBIDDEN_TERMS.search(answer):
+        problems.append(f"forbidden term: {FORBIDDEN_TERMS.search(answer).group(0)}")
+    if "[" in answer or "]" in answer:
+        problems.append("square brackets")
+    if "System Error" in answer:
+        problems.append("error response")
+    return problems
+
+
+class MonographStore:
+    """
+    In-memory copy of the monographs table, keyed by (drug, intent labels).
+    A stored answer is only used while its source_hash matches the context
+    retrieved for the current request, so edited medicine or scheme rows
+    fall back to the live LLM path until the job regenerates them.
+    """
+
+    def __init__(self):
+        self.entries = {}
+        self.loaded = False
+
+    async def load(self):
+        entries = {}
+        try:
+            async with AsyncSessionLocal() as session:
+                result = await session.execute(
+                    select(Monograph.drug_name, Monograph.intent, Monograph.source_hash, Monograph.answer)
+                )
+                rows = result.all()
+        except DBAPIError as e:
+            # Table not created yet: materialize_monographs.py has never run
+            print(f"DEBUG: Monographs not loaded: {e.orig}")
+            rows = []
+
+        for drug_name, intent, source_hash, answer in rows:
+            template = MONOGRAPH_QUERIES.get(intent)
+            if template is None:
+                continue
+            labels = classify_intent(template.format(drug=drug_name), has_drug=True).labels
+            entries[(normalize_key(drug_name), labels)] = (intent, source_hash, answer)
+
+        self.entries = entries
+        self.loaded = True
+        print(f"DEBUG: Monographs loaded: {len(entries)}")
+
+    def lookup(self, drug_names: str, intent, context: str, query: str):
+        """
+        Fresh stored answer for this drug, intent and context, as (answer, exact).
+        exact: the query has the template's shape, so the answer can be served
+        as is; otherwise it is only reference material for the answer model.
+        (None, False) when there is no fresh entry.
+        """
+        entry = self.entries.get((normalize_key(drug_names), intent.labels))
+        if entry is None:
+            return None, False
+        intent_name, source_hash, answer = entry
+        if source_hash != context_hash(context):
+            metrics.incr("monographs.stale")
+            return None, False
+        if matches_template(query, drug_names, intent_name):
+            metrics.incr("monographs.hits")
+            return answer, True
+        metrics.incr("monographs.references")
+        return answer, False
+
+    def stats(self) -> dict:
+        return {"loaded": self.loaded, "entries": len(self.entries)}
+
+
+monographs = MonographStore()
@@ -0,0 +1,36 @@
+from sqlalchemy import select
+from core import dictionaries
+from core.database import AsyncSessionLocal
+from models.models import Medicine, ReimbursementScheme
+
+
+class NameIndex:
+    """
+    In-memory lists of drug names used for fuzzy matching, loaded once
+    instead of selecting every name from the database on each request.
+    In multi-worker mode it is built in the master before fork, so all
+    workers share the pages copy-on-write.
+    """
+
+    def __init__(self):
+        self.medicine_names = []
+        self.scheme_names = []
+        self.loaded = False
+        # Bumped on every load so pools holding copies know to refresh
+        self.version = 0
+
+    async def load(self):
+        async with AsyncSessionLocal() as session:
+            result = await session.execute(select(Medicine.drug_name).order_by(Medicine.id))
+            self.medicine_names = result.scalars().all()
+            result = await session.execute(select(ReimbursementScheme.drug_name).distinct())
+            self.scheme_names = result.scalars().all()
+            # Class and plan lookup tables ride along; they are tiny
+            await dictionaries.load(session)
+        self.loaded = True
+        self.version += 1
+        print(f"DEBUG: Name index loaded: {len(self.medicine_names)} medicines, {len(self.scheme_names)} scheme drugs")
+
+
+name_index = NameIndex()
+
@@ -0,0 +1,88 @@
+from langchain_core.messages import HumanMessage, SystemMessage
+
+# Define System Prompt
+SYSTEM_PROMPT = """You are IntelliPharma, an enterprise-grade Indian Pharma Digital Medical and Commercial Intelligence Assistant.
+
+You provide accurate, structured, and COMPREHENSIVE pharmaceutical information.
+You operate only on internal datasets and general medical knowledge.
+
+------------------------------------
+BRAND & VISUAL AWARENESS
+------------------------------------
+- Product name: IntelliPharma
+- UI theme: Clean white background with subtle purple accents
+- Output is rendered inside glass cards with blur and borders
+- Content must be visually clean but CLINICALLY COMPLETE
+
+------------------------------------
+GLOBAL BEHAVIOR RULES
+------------------------------------
+- Professional medical affairs tone
+- No chatbot language
+- No emojis
+- No explanations of tools, prompts, or internal reasoning
+- No instructional or developer-facing text
+- No square brackets [ ]
+
+------------------------------------
+FORMATTING RULES
+------------------------------------
+- Markdown only
+- ALL headers must be bold
+- Clean spacing between sections
+- Bullet points encouraged for readability
+
+------------------------------------
+CRITICAL CONTENT RULES
+------------------------------------
+- FOR REIMBURSEMENT/INSURANCE QUERIES: YOU MUST ONLY USE THE "CONTEXT FROM INTERNAL DATABASE".
+- IF NO REIMBURSEMENT CONTEXT IS PRESEINT, SIMPLY STATE THAT NO SCHEMES ARE CURRENTLY LISTED. 
+- NEGATIVE CONSTRAINTS (STRICT):
+    - NO Medicare, Medicaid, FDA, NHS, or US-specific schemes.
+    - NO CPT or HCPCS codes.
+    - If internal data is missing, DO NOT MAKE UP INFORMATION.
+- ONLY PROVIDE DATA IF IT IS PRESENT IN THE CONTEXT.
+- FOR COMPARISONS: If the user asks to compare drugs or asks for the difference, YOU MUST PRESENT THE DATA IN A MARKDOWN TABLE.
+    - Columns: Feature (Uses, Dosage, Side Effects, etc.), Drug A, Drug B, etc.
+    - Be concise in the table cells.
+"""
+
+EXTRACTION_PROMPT = """Extract ALL drug names from the user's query.
+Return them as a comma-separated list.
+Example: 'aspirin, paracetamol'.
+If no drug is mentioned, return 'None'.
+Do not add any other text."""
+
+CONTEXT_TEMPLATE = (
+    "CONTEXT FROM INTERNAL DATABASE:{context}\n\n"
+    "Use the above context to answer the user's question accurately."
+)
+
+# Precompiled once: the static prefix of every request is byte-identical,
+# so provider-side prompt caches can reuse it across requests. Anything
+# request-specific goes into the messages that follow it.
+SYSTEM_MESSAGE = SystemMessage(content=SYSTEM_PROMPT)
+EXTRACTION_MESSAGE = SystemMessage(content=EXTRACTION_PROMPT)
+
+
+def build_extraction_messages(user_query: str) -> list:
+    return [EXTRACTION_MESSAGE, HumanMessage(content=user_query)]
+
+
+def assemble_context(clinical_results: str = "", commercial_results: str = "", monograph: str = "") -> str:
+    context = ""
+    if clinical_results:
+        context += f"\n\n### Internal Clinical Guidelines:\n{clinical_results}"
+    if commercial_results:
+        context += f"\n\n### Reimbursement & Commercial Data:\n{commercial_results}"
+    if monograph:
+        context += f"\n\n### Reviewed Monograph (background; answer the user's actual question):\n{monograph}"
+    return context
+
+
+def build_answer_messages(user_query: str, context: str) -> list:
+    messages = [SYSTEM_MESSAGE]
+    if context:
+        messages.append(SystemMessage(content=CONTEXT_TEMPLATE.format(context=context)))
+    messages.append(HumanMessage(content=user_query))
+    return messages
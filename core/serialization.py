@@ -0,0 +1,41 @@
+import json
+from fastapi.responses import JSONResponse
+from core.config import settings
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+# JSON_SERIALIZER: auto (orjson when installed), orjson or json
+if settings.JSON_SERIALIZER == "orjson" and orjson is None:
+    raise RuntimeError("JSON_SERIALIZER=orjson but orjson is not installed (pip install orjson)")
+BACKEND = "orjson" if orjson is not None and settings.JSON_SERIALIZER in ("auto", "orjson") else "json"
+
+if BACKEND == "orjson":
+    # NumPy values (cost engine) and int keys serialize without conversion
+    _OPTIONS = orjson.OPT_SERIALIZE_NUMPY | orjson.OPT_NON_STR_KEYS
+
+    def dumps(obj) -> bytes:
+        """Compact UTF-8 JSON."""
+        return orjson.dumps(obj, option=_OPTIONS)
+
+    loads = orjson.loads
+else:
+    def dumps(obj) -> bytes:
+        """Compact UTF-8 JSON."""
+        return json.dumps(obj, separators=(",", ":"), ensure_ascii=False).encode()
+
+    loads = json.loads
+
+
+def dumps_line(obj) -> bytes:
+    """One NDJSON line."""
+    return dumps(obj) + b"\n"
+
+
+class FastJSONResponse(JSONResponse):
+    """JSONResponse rendered with the configured serializer; the app's default response class."""
+
+    def render(self, content) -> bytes:
+        return dumps(content)
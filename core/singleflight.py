@@ -0,0 +1,47 @@
+import asyncio
+from core import metrics
+
+
+def normalize_key(value: str) -> str:
+    """Case- and whitespace-insensitive key used to coalesce lookups."""
+    return " ".join(value.lower().split())
+
+
+class SingleFlight:
+    """
+    Coalesces concurrent calls sharing a key onto one in-flight task.
+    The first caller starts the work; callers arriving while it is still
+    running await the same result instead of repeating the DB/LLM work.
+    The work is cancelled once every caller waiting on it has been cancelled.
+    """
+
+    def __init__(self, name: str):
+        self.name = name
+        self._inflight = {}
+        # task -> number of callers currently awaiting it
+        self._waiters = {}
+
+    async def do(self, key: str, fn):
+        task = self._inflight.get(key)
+        if task is not None:
+            metrics.incr(f"singleflight.{self.name}.coalesced")
+        else:
+            metrics.incr(f"singleflight.{self.name}.executed")
+            task = asyncio.ensure_future(fn())
+            self._inflight[key] = task
+            task.add_done_callback(lambda _: self._inflight.pop(key, None))
+
+        self._waiters[task] = self._waiters.get(task, 0) + 1
+        try:
+            # Shield so a cancelled caller does not fail the others piggybacking on it
+            return await asyncio.shield(task)
+        except asyncio.CancelledError:
+            # The last interested caller left (e.g. client disconnected): stop the work
+            if self._waiters[task] == 1 and not task.done():
+                task.cancel()
+                metrics.incr(f"singleflight.{self.name}.cancelled")
+            raise
+        finally:
+            self._waiters[task] -= 1
+            if not self._waiters[task]:
+                del self._waiters[task]
@@ -0,0 +1,83 @@
+import asyncio
+from core import metrics
+from core.browse import DataVersion
+from core.catalogue import catalogue
+from core.config import settings
+from core.cost_engine import cost_table
+from core.monographs import monographs
+from core.name_index import name_index
+
+# Everything the in-memory stores are built from
+STORE_TABLES = ("medicines", "reimbursement_schemes", "drug_classes", "insurance_plans", "monographs")
+
+
+async def load_stores():
+    """Rebuild the in-memory stores this deployment serves from, as at startup."""
+    if settings.PRELOAD_NAME_INDEX:
+        await name_index.load()
+    if settings.PRELOAD_CATALOGUE:
+        await catalogue.load()
+        await cost_table.load()
+    if settings.MONOGRAPHS_ENABLED:
+        await monographs.load()
+
+
+class StoreRefresher:
+    """
+    Keeps this worker's name index, catalogue, cost table and monographs in
+    step with the database. Every worker polls the data version of the
+    store tables and reloads when it changes, so a data change reaches all
+    workers within `interval` seconds, not only the one that served
+    POST /api/catalogue/refresh. An interval of 0 turns polling off.
+    """
+
+    def __init__(self, interval: float):
+        self.interval = interval
+        self.version = None
+        self._data_version = DataVersion(STORE_TABLES, ttl=0)
+        self._lock = asyncio.Lock()
+        self._task = None
+
+    async def refresh(self, force=False) -> bool:
+        """Reload when the data changed since the last load (always with force); True if it reloaded."""
+        async with self._lock:
+            # Read before loading: a change made during the load shows up on the next check
+            version = await self._data_version.get()
+            if not force and version == self.version:
+                return False
+            await load_stores()
+            self.version = version
+            metrics.incr("stores.reloads")
+            print(f"DEBUG: Stores reloaded at data version {version}")
+            return True
+
+    async def _run(self):
+        while True:
+            await asyncio.sleep(self.interval)
+            try:
+                await self.refresh()
+            except Exception as e:
+                metrics.incr("stores.reload_errors")
+                print(f"DEBUG: Store refresh failed: {type(e).__name__}: {e}")
+
+    async def start(self):
+        # The stores were loaded at startup (or in the serve.py master) from this data
+        if self.version is None:
+            self.version = await self._data_version.get()
+        if self._task is None and self.interval > 0:
+            self._task = asyncio.get_running_loop().create_task(self._run())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    def stats(self) -> dict:
+        return {"interval": self.interval, "version": self.version}
+
+
+store_refresher = StoreRefresher(settings.STORE_REFRESH_INTERVAL)
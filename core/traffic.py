@@ -0,0 +1,172 @@
+import contextvars
+import hashlib
+import json
+import random
+import re
+import time
+from datetime import datetime, timezone
+from core import metrics
+from core.config import settings
+
+# Personal data masked out of recorded queries and LLM outputs, most specific first
+_SANITIZERS = [
+    (re.compile(r"[\w.+-]+@[\w-]+\.[\w.-]+"), "<email>"),
+    (re.compile(r"\b[A-Z]{5}\d{4}[A-Z]\b"), "<id>"),                      # PAN
+    (re.compile(r"\b\d{4}[\s-]?\d{4}[\s-]?\d{4}\b"), "<id>"),             # Aadhaar
+    (re.compile(r"(?:\+?91[\s-]?)?\b[6-9]\d{4}[\s-]?\d{5}\b"), "<phone>"),
+    (re.compile(r"\+?\d[\d\s-]{8,}\d"), "<number>"),
+]
+
+# Tokenizer for prompt token counts (tiktoken needs its BPE file once; see TIKTOKEN_CACHE_DIR)
+TOKEN_ENCODING = "cl100k_base"
+# Per-message overhead of the chat format, as in OpenAI's token counting guide
+_TOKENS_PER_MESSAGE = 3
+
+# The recording being filled by the current /api/chat request (or replay run)
+current = contextvars.ContextVar("traffic_recording", default=None)
+# The recorded case whose LLM outputs the replay provider answers with
+replaying = contextvars.ContextVar("traffic_replaying", default=None)
+
+
+def sanitize(text):
+    if not text:
+        return text
+    for pattern, replacement in _SANITIZERS:
+        text = pattern.sub(replacement, text)
+    return text
+
+
+def context_hash(context):
+    return hashlib.sha256((context or "").encode()).hexdigest()[:16]
+
+
+_encoding = None
+
+
+def token_counter() -> str:
+    """Name of the tokenizer in use: the tiktoken encoding, or "estimate" (4 characters per token) offline."""
+    global _encoding
+    if _encoding is None:
+        try:
+            import tiktoken
+            _encoding = tiktoken.get_encoding(TOKEN_ENCODING)
+        except Exception as e:
+            print(f"DEBUG: tiktoken unavailable ({type(e).__name__}), estimating prompt tokens")
+            _encoding = False
+    return TOKEN_ENCODING if _encoding else "estimate"
+
+
+def count_tokens(messages) -> int:
+    """Prompt tokens of a chat message list (messages or their texts)."""
+    counter = token_counter()
+    total = _TOKENS_PER_MESSAGE
+    for message in messages:
+        content = getattr(message, "content", message)
+        content = content if isinstance(content, str) else str(content)
+        total += _TOKENS_PER_MESSAGE + (len(_encoding.encode(content)) if counter != "estimate" else (len(content) + 3) // 4)
+    return total
+
+
+class Recording:
+    """
+    One /api/chat request: the sanitized query, what retrieval found, and
+    every LLM output, enough to rerun it offline with replay_traffic.py.
+    """
+
+    def __init__(self, request_id, query):
+        self.request_id = request_id
+        self.query = sanitize(query)
+        self.drugs = []
+        self.intent = []
+        self.context = None
+        self.llm = {}
+        self.answer = None
+        self.timings = {}
+
+    def event(self, event):
+        if event.get("type") == "extraction":
+            self.drugs, self.intent = event["drugs"], event["intent"]
+
+    def llm_call(self, stage, messages, content, ms, response=None):
+        # Counted on the sanitized prompt, as a replay will build it
+        prompt = [sanitize(getattr(m, "content", m)) for m in messages]
+        call = {"content": sanitize(content), "ms": round(ms, 1), "prompt_tokens": count_tokens(prompt)}
+        usage = getattr(response, "usage_metadata", None)
+        if usage:
+            call["reported_prompt_tokens"] = usage.get("input_tokens", 0)
+        self.llm.setdefault(stage, []).append(call)
+
+    def to_dict(self):
+        return {
+            "id": self.request_id,
+            "recorded_at": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+            "query": self.query,
+            "drugs": self.drugs,
+            "intent": self.intent,
+            "context": self.context,
+            "context_hash": context_hash(self.context) if self.context is not None else None,
+            "llm": self.llm,
+            "answer": sanitize(self.answer),
+            "timings": self.timings,
+        }
+
+
+def note_context(context):
+    recording = current.get()
+    if recording is not None:
+        recording.context = context
+
+
+def note_llm_call(stage, messages, content, started, response=None):
+    """Called after each LLM stage with its prompt and output; a no-op unless a recording is active."""
+    recording = current.get()
+    if recording is not None:
+        recording.llm_call(stage, messages, content, (time.perf_counter() - started) * 1000, response)
+
+
+class ReplayState:
+    """Hands out the recorded LLM outputs of one case, in call order per stage."""
+
+    def __init__(self, case):
+        self.llm = case.get("llm") or {}
+        self.used = {}
+
+    def next_output(self, stage):
+        index = self.used.get(stage, 0)
+        self.used[stage] = index + 1
+        calls = self.llm.get(stage, [])
+        if index >= len(calls):
+            metrics.incr(f"replay.{stage}.unrecorded")
+            return None
+        return calls[index]["content"]
+
+    def unrecorded(self):
+        """Calls made beyond what was recorded, per stage."""
+        return {stage: n - len(self.llm.get(stage, [])) for stage, n in self.used.items() if n > len(self.llm.get(stage, []))}
+
+
+def recorded_output(stage):
+    """Next recorded LLM output of a stage for the case being replayed, or None."""
+    state = replaying.get()
+    return state.next_output(stage) if state is not None else None
+
+
+class TrafficRecorder:
+    """Appends sampled /api/chat recordings as JSONL to TRAFFIC_RECORD_PATH (off when unset)."""
+
+    def __init__(self, path, sample):
+        self.path = path
+        self.sample = sample
+
+    def start(self, request_id, query):
+        if not self.path or random.random() >= self.sample:
+            return None
+        return Recording(request_id, query)
+
+    def write(self, recording):
+        with open(self.path, "a") as f:
+            f.write(json.dumps(recording.to_dict(), ensure_ascii=False) + "\n")
+        metrics.incr("traffic.recorded")
+
+
+recorder = TrafficRecorder(settings.TRAFFIC_RECORD_PATH, settings.TRAFFIC_RECORD_SAMPLE)
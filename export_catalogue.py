@@ -0,0 +1,176 @@
+import argparse
+import asyncio
+import os
+import time
+from sqlalchemy import select
+from core import dictionaries
+from core.columnar import CATALOGUE_DIR, DICTIONARY_COLUMNS, FORMATS, require_pyarrow, table_path
+from core.database import AsyncSessionLocal
+from models.models import Medicine, ReimbursementScheme
+
+try:
+    import pyarrow as pa
+    import pyarrow.ipc
+    import pyarrow.parquet as pq
+except ImportError:
+    pa = None
+
+TABLES = {
+    "medicines": Medicine,
+    "reimbursement_schemes": ReimbursementScheme,
+}
+
+# Rows pulled from the database per round trip while exporting
+EXPORT_BATCH_SIZE = 10000
+
+# Parquet row groups carry min/max statistics used to skip data on filtered reads
+ROW_GROUP_SIZE = 50000
+
+
+def _label_columns(model):
+    # id column -> (label name, dictionary) for interned class/plan columns
+    return {
+        id_attr: (attr, dictionary)
+        for attr, (id_attr, dictionary) in dictionaries.LABEL_COLUMNS[model].items()
+    }
+
+
+def _arrow_schema(name: str):
+    """Export schema; interned id columns are written back under their label names."""
+    model = TABLES[name]
+    labels = _label_columns(model)
+    fields = []
+    for column in model.__table__.columns:
+        if column.name in labels:
+            fields.append(pa.field(labels[column.name][0], pa.dictionary(pa.int32(), pa.string())))
+            continue
+        python_type = column.type.python_type
+        if python_type is int:
+            arrow_type = pa.int32()
+        elif python_type is float:
+            arrow_type = pa.float64()
+        elif python_type is bool:
+            arrow_type = pa.bool_()
+        else:
+            arrow_type = pa.string()
+        if column.name in DICTIONARY_COLUMNS[name]:
+            arrow_type = pa.dictionary(pa.int32(), pa.string())
+        fields.append(pa.field(column.name, arrow_type))
+    return pa.schema(fields)
+
+
+def _normalize(value):
+    # Enums (scheme_type) are stored by their value
+    return value.value if hasattr(value, "value") else value
+
+
+class _DictionaryEncoder:
+    """
+    Encodes one column batch by batch against a dictionary that only grows,
+    so every batch extends the previous one: Parquet gets one dictionary per
+    column and Arrow IPC files accept the additions as dictionary deltas.
+    """
+
+    def __init__(self):
+        self.codes = {}
+        self.values = []
+
+    def encode(self, values):
+        indices = []
+        for value in values:
+            if value is None:
+                indices.append(None)
+                continue
+            code = self.codes.get(value)
+            if code is None:
+                code = self.codes[value] = len(self.values)
+                self.values.append(value)
+            indices.append(code)
+        return pa.DictionaryArray.from_arrays(pa.array(indices, pa.int32()), pa.array(self.values, pa.string()))
+
+
+def _open_writer(path, schema, fmt, codec, name):
+    if fmt == "parquet":
+        return pq.ParquetWriter(path, schema, compression=codec or "none", use_dictionary=sorted(DICTIONARY_COLUMNS[name]))
+    # Arrow IPC file; uncompressed files can be memory-mapped with zero copies
+    options = pa.ipc.IpcWriteOptions(compression=codec, emit_dictionary_deltas=True)
+    return pa.ipc.new_file(path, schema, options=options)
+
+
+async def export_table(name: str, fmt: str = "parquet", compression: str = "zstd",
+                       directory: str = CATALOGUE_DIR) -> int:
+    """
+    Stream one table out of the database into a columnar file and return
+    the row count. Rows are fetched in batches, never as ORM objects, and
+    written out as they arrive: memory stays at about one row group
+    (ROW_GROUP_SIZE rows) whatever the size of the catalogue.
+    """
+    require_pyarrow()
+    model = TABLES[name]
+    schema = _arrow_schema(name)
+    id_columns = {attr: id_attr for id_attr, (attr, _) in _label_columns(model).items()}
+    labels = {attr: dictionary.labels for attr, dictionary in _label_columns(model).values()}
+    columns = [getattr(model, id_columns.get(field.name, field.name)) for field in schema]
+    encoders = {field.name: _DictionaryEncoder() for field in schema if pa.types.is_dictionary(field.type)}
+    codec = None if compression == "none" else compression
+    os.makedirs(directory, exist_ok=True)
+
+    rows_written = 0
+    pending = []
+    writer = _open_writer(table_path(name, fmt, directory), schema, fmt, codec, name)
+    try:
+        async with AsyncSessionLocal() as session:
+            await dictionaries.load(session)
+            result = await session.stream(select(*columns).order_by(model.id))
+            async for rows in result.partitions(EXPORT_BATCH_SIZE):
+                arrays = []
+                for i, field in enumerate(schema):
+                    if field.name in labels:
+                        lookup = labels[field.name]
+                        values = [lookup.get(row[i]) for row in rows]
+                    else:
+                        values = [_normalize(row[i]) for row in rows]
+                    if field.name in encoders:
+                        arrays.append(encoders[field.name].encode(values))
+                    else:
+                        arrays.append(pa.array(values, field.type))
+                pending.append(pa.RecordBatch.from_arrays(arrays, schema=schema))
+                rows_written += len(rows)
+                # Parquet row groups carry the min/max statistics filtered reads skip by
+                if sum(batch.num_rows for batch in pending) >= ROW_GROUP_SIZE:
+                    _write(writer, fmt, pending)
+                    pending = []
+        if pending:
+            _write(writer, fmt, pending)
+    finally:
+        writer.close()
+    return rows_written
+
+
+def _write(writer, fmt, batches):
+    if fmt == "parquet":
+        # One row group per flush; its batches share the encoders' latest (superset) dictionaries
+        table = pa.Table.from_batches(batches).unify_dictionaries()
+        writer.write_table(table, row_group_size=table.num_rows)
+    else:
+        for batch in batches:
+            writer.write_batch(batch)
+
+
+async def export_catalogue(fmt, compression, directory):
+    print(f"Exporting catalogue to {directory} ({fmt}, compression={compression})...")
+    for name in TABLES:
+        start = time.perf_counter()
+        rows = await export_table(name, fmt, compression, directory)
+        size_mb = os.path.getsize(table_path(name, fmt, directory)) / (1024 * 1024)
+        print(f"{name}: {rows} rows, {size_mb:.2f} MB in {time.perf_counter() - start:.1f}s")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Export medicines and reimbursement schemes to a columnar format")
+    parser.add_argument("--format", choices=sorted(FORMATS), default="parquet")
+    parser.add_argument("--compression", choices=["zstd", "lz4", "none"], default="zstd",
+                        help="use 'none' with --format arrow for zero-copy memory mapping")
+    parser.add_argument("--out", default=CATALOGUE_DIR)
+    args = parser.parse_args()
+    asyncio.run(export_catalogue(args.format, args.compression, args.out))
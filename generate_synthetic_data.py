@@ -0,0 +1,316 @@
+import argparse
+import asyncio
+import csv
+import os
+import time
+import numpy as np
+from sqlalchemy import insert
+from core import dictionaries, migrations
+from core.cost_engine import tier_for_price
+from core.database import AsyncSessionLocal, engine, Base
+from models.models import Medicine, ReimbursementScheme, SchemeType
+
+# Rows generated (and inserted) per step; fixed so a seed always yields the same data
+CHUNK_SIZE = 50_000
+
+# Therapeutic class -> (share of the catalogue, generic-name stems, action classes,
+# chemical classes, uses, share that is habit forming). Shares follow the skew of
+# the Indian retail catalogue: anti-infectives and pain relief dominate.
+CLASS_PROFILES = {
+    "Anti Infectives": (0.22, ["cillin", "mycin", "floxacin", "cef", "azole", "vir"],
+                        ["Penicillin", "Macrolide", "Fluoroquinolone", "Cephalosporin", "Azole antifungal"],
+                        ["Beta lactam", "Macrolides", "Quinolone", "Triazole derivative"],
+                        ["Bacterial infections", "Urinary tract infection", "Respiratory tract infection", "Fungal infections", "Skin infections"], 0.0),
+    "Pain Analgesics": (0.14, ["profen", "fenac", "coxib", "amol", "adol"],
+                        ["Nonsteroidal anti-inflammatory drugs (NSAIDs)", "Opioid analgesic", "Para-aminophenol derivative"],
+                        ["Propionic acid derivative", "Acetic acid derivative", "Anilide"],
+                        ["Pain relief", "Fever", "Rheumatoid arthritis", "Osteoarthritis", "Headache"], 0.05),
+    "Gastro Intestinal": (0.12, ["prazole", "tidine", "setron", "peride"],
+                          ["Proton pump inhibitor", "H2 receptor antagonist", "5HT3 antagonist", "Prokinetic"],
+                          ["Benzimidazole derivative", "Imidazole derivative", "Carbazole derivative"],
+                          ["Acidity", "Gastroesophageal reflux disease", "Peptic ulcer disease", "Nausea", "Vomiting"], 0.0),
+    "Cardiac": (0.11, ["pril", "sartan", "olol", "dipine", "statin"],
+                ["ACE inhibitor", "Angiotensin II receptor blocker (ARB)", "Beta blocker", "Calcium channel blocker", "HMG-CoA reductase inhibitor"],
+                ["Dicarboxylate", "Biphenyl tetrazole", "Aryloxypropanolamine", "Dihydropyridine"],
+                ["Hypertension", "Heart failure", "Angina", "High cholesterol", "Prevention of heart attack"], 0.0),
+    "Antidiabetic": (0.08, ["gliptin", "formin", "glizide", "gliflozin"],
+                     ["DPP-4 inhibitor", "Biguanide", "Sulfonylurea", "SGLT2 inhibitor"],
+                     ["Cyanopyrrolidine", "Biguanide", "Sulfonylurea", "Glucoside"],
+                     ["Type 2 diabetes mellitus"], 0.0),
+    "Respiratory": (0.08, ["terol", "lukast", "tropium", "sonide"],
+                    ["Beta2 agonist", "Leukotriene antagonist", "Anticholinergic", "Corticosteroid"],
+                    ["Phenylethanolamine", "Quinoline", "Quaternary ammonium"],
+                    ["Asthma", "Chronic obstructive pulmonary disease", "Allergic rhinitis", "Cough"], 0.02),
+    "Derma": (0.07, ["sone", "nazole", "retin", "mupirocin"],
+              ["Topical corticosteroid", "Antifungal", "Retinoid"],
+              ["Glucocorticoid", "Imidazole", "Retinoid"],
+              ["Eczema", "Psoriasis", "Acne", "Fungal skin infections"], 0.0),
+    "Neuro CNS": (0.06, ["azepam", "pramine", "oxetine", "tiracetam", "pine"],
+                  ["Benzodiazepine", "Tricyclic antidepressant", "SSRI", "Anticonvulsant"],
+                  ["Benzodiazepine", "Dibenzazepine", "Phenylpropylamine"],
+                  ["Anxiety", "Depression", "Epilepsy", "Insomnia", "Panic disorder"], 0.45),
+    "Vitamins Minerals Nutrients": (0.05, ["vit", "cal", "ferro", "zinc"],
+                                    ["Vitamin", "Mineral supplement"],
+                                    ["Vitamin", "Mineral"],
+                                    ["Nutritional deficiency", "Anemia", "Vitamin D deficiency"], 0.0),
+    "Antihistamines": (0.04, ["tirizine", "tadine", "fenadine"],
+                       ["H1 receptor antagonist"],
+                       ["Diphenylmethylpiperazine", "Piperidine"],
+                       ["Allergies", "Hay fever", "Urticaria", "Itching"], 0.01),
+    "Hormones": (0.02, ["thyrox", "gestrel", "trol"],
+                 ["Thyroid hormone", "Progestin", "Estrogen"],
+                 ["Levothyroxine", "Steroid"],
+                 ["Hypothyroidism", "Contraception", "Menopausal symptoms"], 0.0),
+    "Ophthal Otologicals": (0.01, ["oprost", "timolol", "olopatadine"],
+                            ["Prostaglandin analogue", "Beta blocker"],
+                            ["Prostaglandin", "Aryloxypropanolamine"],
+                            ["Glaucoma", "Allergic conjunctivitis", "Ear infection"], 0.0),
+}
+
+# Brand-like syllables; generic names are syllable + syllable + class stem
+SYLLABLES = ["al", "am", "ben", "ca", "ce", "clo", "da", "dex", "do", "e", "fa", "flu", "ga", "hy",
+             "in", "ke", "la", "le", "lo", "ma", "me", "mo", "na", "ni", "o", "pa", "pe", "pro",
+             "ra", "ri", "ro", "sa", "se", "ta", "te", "to", "va", "vi", "xa", "za", "zo"]
+STRENGTHS = ["5", "10", "20", "25", "40", "50", "100", "150", "250", "400", "500", "625", "650", "1000"]
+FORMS = ["Tablet", "Capsule", "Syrup", "Injection", "Suspension", "Cream", "Drops", "Gel"]
+FORM_WEIGHTS = [0.52, 0.16, 0.08, 0.09, 0.05, 0.05, 0.03, 0.02]
+VARIANTS = ["", "", "", " SR", " DSR", " Plus", " Forte", " Duo", " MR", " XL"]
+SIDE_EFFECTS = ["Nausea", "Headache", "Dizziness", "Diarrhea", "Vomiting", "Drowsiness", "Rash",
+                "Abdominal pain", "Dry mouth", "Constipation", "Fatigue", "Insomnia", "Itching",
+                "Loss of appetite", "Muscle pain", "Indigestion", "Flatulence", "Weakness"]
+FREQUENCIES = ["once daily", "twice daily", "three times daily", "at bedtime", "as directed by physician"]
+CONTRAINDICATIONS = ["Hypersensitivity to any component", "Severe liver impairment", "Severe kidney impairment",
+                     "Pregnancy", "Breastfeeding", "Children under 12 years", "History of peptic ulcer",
+                     "Heart failure", "Alcohol use"]
+# (plan name, scheme type); government plans cover 100%, private ones PRIVATE_COVERAGE
+PLANS = [
+    ("CGHS (Central Government Health Scheme)", SchemeType.GOVT),
+    ("ESI (Employees' State Insurance) Scheme", SchemeType.GOVT),
+    ("Ayushman Bharat (PMJAY)", SchemeType.GOVT),
+    ("ECHS", SchemeType.GOVT),
+    ("Star Health", SchemeType.PRIVATE),
+    ("Max Bupa", SchemeType.PRIVATE),
+    ("Apollo Munich", SchemeType.PRIVATE),
+    ("HDFC Ergo Health Suraksha", SchemeType.PRIVATE),
+    ("ICICI Lombard", SchemeType.PRIVATE),
+    ("Tata AIG Medicare", SchemeType.PRIVATE),
+]
+PRIVATE_COVERAGE = [70.0, 75.0, 80.0, 85.0, 90.0]
+
+CSV_LIST_COLUMNS = {"substitute": 5, "sideEffect": 6, "use": 5}
+
+
+def add_typos(names, rng):
+    """Misspelled copies (swap, drop, double or replace one letter), like real near-duplicates."""
+    ops = rng.integers(0, 4, size=len(names))
+    # Never touch the first letter: real typos rarely do, and fuzzy cutoffs assume it
+    positions = rng.random(len(names))
+    letters = rng.choice(list("aeiourlnst"), size=len(names))
+    typos = []
+    for name, op, pos, letter in zip(names, ops, positions, letters):
+        i = 1 + int(pos * max(1, len(name) - 2))
+        if op == 0 and i + 1 < len(name):
+            name = name[:i] + name[i + 1] + name[i] + name[i + 2:]
+        elif op == 1:
+            name = name[:i] + name[i + 1:]
+        elif op == 2:
+            name = name[:i] + name[i] + name[i:]
+        else:
+            name = name[:i] + letter + name[i + 1:]
+        typos.append(name)
+    return typos
+
+
+def pick_lists(rng, pool, n, low, high):
+    """n comma-joined lists of low..high distinct items from pool."""
+    pool = np.array(pool, dtype=object)
+    counts = rng.integers(low, high + 1, size=n)
+    # Per-row random permutation of the pool, vectorized via argsort
+    order = np.argsort(rng.random((n, len(pool))), axis=1)
+    return [", ".join(pool[row[:count]]) for row, count in zip(order, counts)]
+
+
+def generate_chunk(seed, chunk_no, n, typo_rate, mean_schemes):
+    """Medicine and scheme column dicts for one chunk; depends only on (seed, chunk_no, n, ...)."""
+    rng = np.random.default_rng([seed, chunk_no])
+    class_names = list(CLASS_PROFILES)
+    weights = np.array([profile[0] for profile in CLASS_PROFILES.values()])
+    class_idx = rng.choice(len(class_names), size=n, p=weights / weights.sum())
+
+    # Names: 35% generic ("Dexaprazole"), the rest brand-style ("Lomacef 500 DSR Tablet")
+    syllables = np.array(SYLLABLES)
+    # Class-specific stems from one flat table: offset of the class + random index within it
+    stem_lists = [profile[1] for profile in CLASS_PROFILES.values()]
+    stem_table = np.array([stem for stems in stem_lists for stem in stems])
+    stem_counts = np.array([len(stems) for stems in stem_lists])
+    stem_offsets = np.concatenate(([0], np.cumsum(stem_counts)[:-1]))
+    stem = stem_table[stem_offsets[class_idx] + rng.integers(0, 1000, size=n) % stem_counts[class_idx]]
+    root = np.char.add(syllables[rng.integers(0, len(syllables), size=n)],
+                       syllables[rng.integers(0, len(syllables), size=n)])
+    generic = np.char.capitalize(np.char.add(root, stem))
+    brand_root = np.char.capitalize(np.char.add(root, syllables[rng.integers(0, len(syllables), size=n)]))
+    brand = np.char.add(np.char.add(np.char.add(brand_root, " "), np.array(STRENGTHS)[rng.integers(0, len(STRENGTHS), size=n)]),
+                        np.array(VARIANTS)[rng.integers(0, len(VARIANTS), size=n)])
+    brand = np.char.add(np.char.add(brand, " "), np.array(FORMS)[rng.choice(len(FORMS), size=n, p=FORM_WEIGHTS)])
+    names = np.where(rng.random(n) < 0.35, generic, brand).tolist()
+
+    # Near-duplicates: some rows are a misspelled copy of another row's name
+    typo_rows = np.flatnonzero(rng.random(n) < typo_rate)
+    if len(typo_rows):
+        sources = rng.integers(0, n, size=len(typo_rows))
+        for row, typo in zip(typo_rows, add_typos([names[s] for s in sources], rng)):
+            names[row] = typo
+
+    medicines = []
+    generic_names = generic.tolist()
+    side_effects = pick_lists(rng, SIDE_EFFECTS, n, 2, 5)
+    contraindications = pick_lists(rng, CONTRAINDICATIONS, n, 1, 3)
+    strengths = np.array(STRENGTHS)[rng.integers(0, len(STRENGTHS), size=n)]
+    frequencies = np.array(FREQUENCIES)[rng.integers(0, len(FREQUENCIES), size=n)]
+    picks = rng.integers(0, 1000, size=(n, 4))
+    habit_draw = rng.random(n)
+    uses_count = rng.integers(1, 4, size=n)
+    for i in range(n):
+        therapeutic_class = class_names[class_idx[i]]
+        _, _, actions, chemicals, uses, habit_share = CLASS_PROFILES[therapeutic_class]
+        medicines.append({
+            "drug_name": names[i],
+            "therapeutic_class": therapeutic_class,
+            "action_class": actions[picks[i, 0] % len(actions)],
+            "chemical_class": chemicals[picks[i, 1] % len(chemicals)],
+            "habit_forming": "Yes" if habit_draw[i] < habit_share else "No",
+            "uses": ", ".join(uses[(picks[i, 2] + k) % len(uses)] for k in range(min(uses_count[i], len(uses)))),
+            "side_effects": side_effects[i],
+            "substitutes": None,
+            "dosage": f"{strengths[i]} mg {frequencies[i]}",
+            "contraindications": contraindications[i],
+        })
+
+    # Substitutes: generic names of 1-3 other drugs in the same class
+    for c in range(len(class_names)):
+        rows = np.flatnonzero(class_idx == c)
+        if len(rows) < 2:
+            continue
+        others = rows[rng.integers(0, len(rows), size=(len(rows), 3))]
+        counts = rng.integers(1, 4, size=len(rows))
+        for row, choice, count in zip(rows, others, counts):
+            medicines[row]["substitutes"] = ", ".join(generic_names[j] for j in choice[:count] if j != row) or None
+
+    # Schemes: Poisson count per drug, distinct plans per drug
+    counts = np.minimum(rng.poisson(mean_schemes, size=n), len(PLANS))
+    plan_order = np.argsort(rng.random((n, len(PLANS))), axis=1)
+    coverage = np.array(PRIVATE_COVERAGE)[rng.integers(0, len(PRIVATE_COVERAGE), size=(n, len(PLANS)))]
+    prior_auth = rng.random((n, len(PLANS))) < 0.1
+    # Prices: log-normal around Rs 120 a pack; a fifth of listings sit one formulary tier higher
+    mrp = np.round(rng.lognormal(np.log(120), 0.9, size=n), 2)
+    tiers = np.minimum(tier_for_price(mrp)[:, None] + (rng.random((n, len(PLANS))) < 0.2), 4)
+    for medicine, price in zip(medicines, mrp.tolist()):
+        medicine["mrp"] = price
+    schemes = []
+    for i in np.flatnonzero(counts):
+        for k in plan_order[i, :counts[i]]:
+            plan_name, scheme_type = PLANS[k]
+            schemes.append({
+                "drug_name": names[i],
+                "scheme_type": scheme_type,
+                "plan_name": plan_name,
+                "coverage_percent": 100.0 if scheme_type == SchemeType.GOVT else float(coverage[i, k]),
+                "copay_amount": 0.0,
+                "prior_authorization": bool(prior_auth[i, k]),
+                "tier": int(tiers[i, k]),
+            })
+    return medicines, schemes
+
+
+def to_csv_row(medicine):
+    """One row in the layout of data/medicine_dataset.csv, as read by ingest_data.py."""
+    row = {"name": medicine["drug_name"]}
+    for prefix, field in (("substitute", "substitutes"), ("sideEffect", "side_effects"), ("use", "uses")):
+        values = (medicine[field] or "").split(", ")
+        for k in range(CSV_LIST_COLUMNS[prefix]):
+            row[f"{prefix}{k}"] = values[k] if k < len(values) else ""
+    row["Chemical Class"] = medicine["chemical_class"]
+    row["Habit Forming"] = medicine["habit_forming"]
+    row["Therapeutic Class"] = medicine["therapeutic_class"]
+    row["Action Class"] = medicine["action_class"]
+    return row
+
+
+async def insert_chunk(medicines, schemes):
+    """Bulk insert with label strings already mapped to dictionary ids."""
+    class_ids, plan_ids = dictionaries.classes.ids, dictionaries.plans.ids
+    for medicine in medicines:
+        for attr, (id_attr, _) in dictionaries.LABEL_COLUMNS[Medicine].items():
+            medicine[id_attr] = class_ids[medicine.pop(attr)]
+    for scheme in schemes:
+        scheme["plan_id"] = plan_ids[scheme.pop("plan_name")]
+    async with AsyncSessionLocal() as session:
+        await session.execute(insert(Medicine.__table__), medicines)
+        if schemes:
+            await session.execute(insert(ReimbursementScheme.__table__), schemes)
+        await session.commit()
+
+
+async def intern_vocabulary():
+    """Every class and plan name up front, in sorted order, so ids are the same on every run."""
+    class_names = set(CLASS_PROFILES) | {"Yes", "No"}
+    for _, _, actions, chemicals, _, _ in CLASS_PROFILES.values():
+        class_names |= set(actions) | set(chemicals)
+    async with AsyncSessionLocal() as session:
+        await dictionaries.load(session)
+        await session.run_sync(lambda s: dictionaries.classes.intern(s, sorted(class_names)))
+        await session.run_sync(lambda s: dictionaries.plans.intern(s, sorted(name for name, _ in PLANS)))
+        await session.commit()
+
+
+async def main(args):
+    start = time.perf_counter()
+    writer = None
+    if args.csv:
+        os.makedirs(os.path.dirname(args.csv) or ".", exist_ok=True)
+        out = open(args.csv, "w", newline="", encoding="utf-8")
+        fields = ["name"] + [f"{p}{k}" for p, n in CSV_LIST_COLUMNS.items() for k in range(n)]
+        writer = csv.DictWriter(out, fieldnames=fields + ["Chemical Class", "Habit Forming", "Therapeutic Class", "Action Class"])
+        writer.writeheader()
+    else:
+        if args.reset:
+            async with engine.begin() as conn:
+                await conn.run_sync(Base.metadata.drop_all)
+                await conn.run_sync(Base.metadata.create_all)
+            await migrations.stamp(engine)
+        else:
+            # Appending: bring an existing database up to the current schema first
+            await migrations.upgrade(engine)
+        await intern_vocabulary()
+
+    total_medicines = total_schemes = 0
+    for chunk_no, offset in enumerate(range(0, args.medicines, CHUNK_SIZE)):
+        n = min(CHUNK_SIZE, args.medicines - offset)
+        medicines, schemes = generate_chunk(args.seed, chunk_no, n, args.typo_rate, args.schemes_per_drug)
+        if writer:
+            writer.writerows(to_csv_row(m) for m in medicines)
+        else:
+            await insert_chunk(medicines, schemes)
+        total_medicines += len(medicines)
+        total_schemes += len(schemes)
+        elapsed = time.perf_counter() - start
+        print(f"{total_medicines} medicines, {total_schemes} schemes ({total_medicines / elapsed:,.0f} medicines/s)")
+
+    if writer:
+        out.close()
+        print(f"Wrote {args.csv}; ingest it with: python3 ingest_data.py")
+    else:
+        await engine.dispose()
+        print("Done. Running servers pick up the new rows within STORE_REFRESH_INTERVAL seconds.")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Generate a large, deterministic synthetic medicine catalogue")
+    parser.add_argument("--medicines", type=int, default=200_000, help="medicine rows to generate")
+    parser.add_argument("--schemes-per-drug", type=float, default=2.0, help="mean reimbursement schemes per drug (Poisson)")
+    parser.add_argument("--typo-rate", type=float, default=0.03, help="share of names that are misspelled near-duplicates")
+    parser.add_argument("--seed", type=int, default=42, help="same seed and sizes give the same data")
+    parser.add_argument("--reset", action="store_true", help="drop and recreate all tables first (like seed_db.py)")
+    parser.add_argument("--csv", help="write data/medicine_dataset.csv-style output instead of inserting")
+    args = parser.parse_args()
+    asyncio.run(main(args))
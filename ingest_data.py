@@ -1,9 +1,11 @@
 import asyncio
 import csv
+import json
 import sys
 from sqlalchemy import select
 from core.database import AsyncSessionLocal
 from models.models import Medicine
+from check_data_quality import run_checks, print_summary
 
 # Increase CSV field size limit just in case
 csv.field_size_limit(sys.maxsize)
@@ -11,6 +13,9 @@ csv.field_size_limit(sys.maxsize)
 # Chunk size for database insertion
 BATCH_SIZE = 1000
 
+# Data-quality report written after every ingestion run
+QUALITY_REPORT_PATH = 'data/quality_report.json'
+
 async def ingest_data():
     print("Starting data ingestion...")
     
@@ -101,8 +106,19 @@ async def ingest_data():
             
     except FileNotFoundError:
         print(f"File not found: {file_path}")
+        return False
     except Exception as e:
         print(f"An error occurred: {e}")
+        return False
+
+    # Gate on data quality
+    report = await run_checks()
+    with open(QUALITY_REPORT_PATH, 'w') as f:
+        json.dump(report, f, indent=2)
+    print_summary(report)
+    print(f"Quality report written to {QUALITY_REPORT_PATH}")
+    return report["passed"]
 
 if __name__ == "__main__":
-    asyncio.run(ingest_data())
+    passed = asyncio.run(ingest_data())
+    sys.exit(0 if passed else 1)
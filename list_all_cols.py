@@ -1,10 +1,18 @@
-import pandas as pd
 import sys
+from core.columnar import export_available, open_dataset
 
-pd.set_option('display.max_columns', None)
-pd.set_option('display.max_rows', None)
+# Schema of the columnar export comes from file metadata, no rows are read
+if export_available('medicines'):
+    print("ALL COLUMNS:")
+    for field in open_dataset('medicines').schema:
+        print(f"{field.name} ({field.type})")
+    raise SystemExit(0)
 
 try:
+    import pandas as pd
+    pd.set_option('display.max_columns', None)
+    pd.set_option('display.max_rows', None)
+
     df = pd.read_csv('data/medicine_dataset.csv', nrows=0) # Just read header
     cols = df.columns.tolist()
     print("ALL COLUMNS:")
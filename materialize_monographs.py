@@ -0,0 +1,109 @@
+import argparse
+import asyncio
+from datetime import datetime, timezone
+from sqlalchemy import select, delete
+from core.catalogue import catalogue
+from core.database import AsyncSessionLocal, engine
+from core.http_client import create_http_client
+from core.llm_providers import answer_llm, configure_http_client
+from core.monographs import MONOGRAPH_QUERIES, build_context, context_hash, validate_answer
+from core.prompts import build_answer_messages
+from core.singleflight import normalize_key
+from enrich_data import CURATED_DATA
+from models.models import Monograph, ReimbursementScheme
+
+
+async def head_drugs():
+    """Curated drugs (enrich_data.py) plus the seeded reimbursement drugs (seed_db.py)."""
+    names = {normalize_key(d["drug_name"]): d["drug_name"] for d in CURATED_DATA}
+    async with AsyncSessionLocal() as session:
+        result = await session.execute(select(ReimbursementScheme.drug_name).distinct())
+        for drug_name in result.scalars():
+            names.setdefault(normalize_key(drug_name), drug_name)
+    return sorted(names.values())
+
+
+async def materialize(drug, intent, existing, gate, force):
+    """Returns (status, Monograph or None); status is fresh, generated, rejected or empty."""
+    query = MONOGRAPH_QUERIES[intent].format(drug=drug)
+    _, context = await build_context(drug, query)
+    if not context:
+        return "empty", None
+    source_hash = context_hash(context)
+    if existing is not None and existing.source_hash == source_hash and not force:
+        return "fresh", None
+
+    async with gate:
+        response = await answer_llm.ainvoke(build_answer_messages(query, context))
+    problems = validate_answer(response.content, drug)
+    if problems:
+        print(f"Rejected {drug} / {intent}: {', '.join(problems)}")
+        return "rejected", None
+
+    return "generated", Monograph(
+        drug_key=normalize_key(drug),
+        drug_name=drug,
+        intent=intent,
+        context=context,
+        answer=response.content,
+        source_hash=source_hash,
+        model=f"{answer_llm.provider}:{answer_llm.model_name}",
+        generated_at=datetime.now(timezone.utc).replace(tzinfo=None),
+    )
+
+
+async def main(args):
+    async with engine.begin() as conn:
+        await conn.run_sync(Monograph.__table__.create, checkfirst=True)
+    await catalogue.load()
+    http_client = create_http_client()
+    configure_http_client(http_client)
+
+    drugs = args.drugs.split(",") if args.drugs else await head_drugs()
+    drugs = [d.strip() for d in drugs if d.strip()][:args.limit]
+    intents = args.intents.split(",") if args.intents else list(MONOGRAPH_QUERIES)
+    unknown = set(intents) - set(MONOGRAPH_QUERIES)
+    if unknown:
+        raise SystemExit(f"Unknown intents: {', '.join(sorted(unknown))} (choose from {', '.join(MONOGRAPH_QUERIES)})")
+
+    try:
+        async with AsyncSessionLocal() as session:
+            result = await session.execute(select(Monograph))
+            existing = {(row.drug_key, row.intent): row for row in result.scalars()}
+
+        gate = asyncio.Semaphore(args.concurrency)
+        jobs = [(drug, intent) for drug in drugs for intent in intents]
+        outcomes = await asyncio.gather(*(
+            materialize(drug, intent, existing.get((normalize_key(drug), intent)), gate, args.force)
+            for drug, intent in jobs
+        ))
+
+        counts = {}
+        async with AsyncSessionLocal() as session:
+            for (drug, intent), (status, monograph) in zip(jobs, outcomes):
+                counts[status] = counts.get(status, 0) + 1
+                key = (normalize_key(drug), intent)
+                # Stale or no longer backed by data: drop the old answer
+                if key in existing and status != "fresh":
+                    await session.execute(delete(Monograph).where(Monograph.id == existing[key].id))
+                if monograph is not None:
+                    session.add(monograph)
+            await session.commit()
+    finally:
+        await http_client.aclose()
+        await engine.dispose()
+
+    print(f"Drugs: {len(drugs)}, intents: {len(intents)}")
+    print(", ".join(f"{status}: {count}" for status, count in sorted(counts.items())))
+    print("Running servers serve the new monographs within STORE_REFRESH_INTERVAL seconds.")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Precompute answers for the most-asked drugs and intents")
+    parser.add_argument("--drugs", help="comma-separated drug names (default: curated and seeded drugs)")
+    parser.add_argument("--intents", help=f"comma-separated subset of: {', '.join(MONOGRAPH_QUERIES)}")
+    parser.add_argument("--limit", type=int, default=None, help="materialize only the first N drugs")
+    parser.add_argument("--concurrency", type=int, default=4, help="answer LLM calls in flight")
+    parser.add_argument("--force", action="store_true", help="regenerate even when the source data is unchanged")
+    args = parser.parse_args()
+    asyncio.run(main(args))
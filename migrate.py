@@ -0,0 +1,40 @@
+import argparse
+import asyncio
+from core.database import engine
+from core import migrations
+
+
+async def main(args):
+    try:
+        if args.stamp:
+            await migrations.stamp(engine, args.target)
+            print("Stamped: migrations marked as applied without running them")
+        elif not args.status and not args.check:
+            ran = await migrations.upgrade(engine, args.target)
+            print(f"Applied {len(ran)} migration(s)" if ran else "Database is up to date")
+
+        done = await migrations.applied(engine)
+        if args.status:
+            for migration in migrations.load_migrations():
+                applied_at = done.get(migration.version)
+                state = f"applied {applied_at:%Y-%m-%d %H:%M:%S}" if applied_at else "pending"
+                print(f"{migration.version:04d} {migration.name:<28} {state}")
+
+        if args.check:
+            problems = await migrations.drift(engine)
+            for problem in problems:
+                print(f"DRIFT: {problem}")
+            if problems:
+                raise SystemExit(f"{len(problems)} difference(s) between the database and models/models.py")
+            print("Schema matches models/models.py")
+    finally:
+        await engine.dispose()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Apply schema migrations (migrations/) to DATABASE_URL")
+    parser.add_argument("--status", action="store_true", help="List applied and pending migrations without applying")
+    parser.add_argument("--check", action="store_true", help="Compare the database with models/models.py; exit 1 on drift")
+    parser.add_argument("--target", type=int, help="Stop after this version (default: latest)")
+    parser.add_argument("--stamp", action="store_true", help="Record migrations as applied without running them")
+    asyncio.run(main(parser.parse_args()))
@@ -0,0 +1,2 @@
+# Versioned schema migrations, applied by migrate.py (see core/migrations.py).
+# Each vNNNN_<name>.py module defines VERSION and an async upgrade(op).
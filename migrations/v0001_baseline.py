@@ -0,0 +1,11 @@
+"""
+Tables declared in models/models.py. Creates whatever is missing, so a database
+from before migrations keeps its data and gains the newer tables (monographs,
+the class and plan lookup tables).
+"""
+
+VERSION = 1
+
+
+async def upgrade(op):
+    await op.create_tables()
@@ -0,0 +1,49 @@
+"""
+Convert a database created before class/plan interning: move the repeated
+strings into the drug_classes and insurance_plans lookup tables and replace
+them with integer ids. Tables already converted are skipped.
+"""
+
+VERSION = 2
+# Runs step by step so SQLite can VACUUM afterwards; every step is re-runnable
+TRANSACTIONAL = False
+
+# Old string column -> new id column, per table and lookup table
+CONVERSIONS = [
+    ("medicines", "drug_classes", [
+        ("chemical_class", "chemical_class_id"),
+        ("habit_forming", "habit_forming_id"),
+        ("therapeutic_class", "therapeutic_class_id"),
+        ("action_class", "action_class_id"),
+    ]),
+    ("reimbursement_schemes", "insurance_plans", [
+        ("plan_name", "plan_id"),
+    ]),
+]
+
+# habit_forming is a Yes/No flag and is never filtered on, so it stays unindexed
+INDEXED = {"chemical_class_id", "therapeutic_class_id", "action_class_id", "plan_id"}
+
+
+async def upgrade(op):
+    converted = False
+    for table, lookup, pairs in CONVERSIONS:
+        existing = await op.columns(table)
+        pairs = [(old, new) for old, new in pairs if old in existing]
+        for old, new in pairs:
+            await op.add_column(table, new, f"INTEGER REFERENCES {lookup}(id)")
+            await op.execute(
+                f"INSERT INTO {lookup} (name) SELECT DISTINCT {old} FROM {table} "
+                f"WHERE {old} IS NOT NULL AND {old} NOT IN (SELECT name FROM {lookup})"
+            )
+            await op.execute(f"UPDATE {table} SET {new} = (SELECT id FROM {lookup} WHERE name = {table}.{old})")
+            await op.execute(f"ALTER TABLE {table} DROP COLUMN {old}")
+            if new in INDEXED:
+                await op.create_index(f"ix_{table}_{new}", table, new)
+        if pairs:
+            converted = True
+            print(f"{table}: encoded {', '.join(old for old, _ in pairs)} into {lookup}")
+
+    # Reclaim the space freed by the dropped string columns
+    if converted and op.dialect == "sqlite":
+        await op.execute("VACUUM")
@@ -0,0 +1,19 @@
+"""
+Postgres only: the pg_trgm extension and the drug-name trigram GIN indexes
+behind core.fuzzy.trigram_match. Built CONCURRENTLY, so the tables stay
+writable. SQLite keeps in-process fuzzy matching and skips this.
+"""
+from models.models import TRIGRAM_TABLES
+
+VERSION = 3
+# CREATE INDEX CONCURRENTLY cannot run inside a transaction
+TRANSACTIONAL = False
+
+
+async def upgrade(op):
+    if op.dialect != "postgresql":
+        return
+    await op.execute("CREATE EXTENSION IF NOT EXISTS pg_trgm")
+    for table in TRIGRAM_TABLES:
+        await op.create_index(f"ix_{table}_drug_name_trgm", table, "drug_name gin_trgm_ops", using="gin")
+        await op.execute(f"ANALYZE {table}")
@@ -0,0 +1,12 @@
+"""
+Drug prices and formulary tiers for out-of-pocket comparisons
+(core.cost_engine): medicines.mrp and reimbursement_schemes.tier.
+Both are nullable, so the columns are added without rewriting either table.
+"""
+
+VERSION = 4
+
+
+async def upgrade(op):
+    await op.add_column("medicines", "mrp", "FLOAT")
+    await op.add_column("reimbursement_schemes", "tier", "INTEGER")
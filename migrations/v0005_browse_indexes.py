@@ -0,0 +1,21 @@
+"""
+Composite (filter, drug_name, id) indexes behind the catalogue browsing
+endpoints (core.browse): class listings and a plan's covered drugs page by
+keyset without sorting. Built CONCURRENTLY on Postgres.
+"""
+
+VERSION = 5
+# CREATE INDEX CONCURRENTLY cannot run inside a transaction
+TRANSACTIONAL = False
+
+INDEXES = [
+    ("ix_medicines_therapeutic_class_id_drug_name", "medicines", "therapeutic_class_id, drug_name, id"),
+    ("ix_medicines_action_class_id_drug_name", "medicines", "action_class_id, drug_name, id"),
+    ("ix_medicines_chemical_class_id_drug_name", "medicines", "chemical_class_id, drug_name, id"),
+    ("ix_reimbursement_schemes_plan_id_drug_name", "reimbursement_schemes", "plan_id, drug_name, id"),
+]
+
+
+async def upgrade(op):
+    for name, table, columns in INDEXES:
+        await op.create_index(name, table, columns)
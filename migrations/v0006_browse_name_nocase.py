@@ -0,0 +1,19 @@
+"""
+lower(drug_name) expression indexes for the case-insensitive name prefix
+filter of the catalogue browsing endpoints (core.browse): "?prefix=met"
+seeks a range on the lower-cased name. Built CONCURRENTLY on Postgres.
+"""
+
+VERSION = 6
+# CREATE INDEX CONCURRENTLY cannot run inside a transaction
+TRANSACTIONAL = False
+
+INDEXES = [
+    ("ix_medicines_lower_drug_name", "medicines", "lower(drug_name)"),
+    ("ix_reimbursement_schemes_plan_id_lower_drug_name", "reimbursement_schemes", "plan_id, lower(drug_name)"),
+]
+
+
+async def upgrade(op):
+    for name, table, columns in INDEXES:
+        await op.create_index(name, table, columns)
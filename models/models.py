@@ -1,33 +1,140 @@
-from sqlalchemy import Column, Integer, String, Float, Boolean, Enum, Text
+from sqlalchemy import Column, Integer, String, Float, Boolean, Enum, Text, ForeignKey, DateTime, UniqueConstraint, Index, DDL, event, func, text
 from core.database import Base
+from sqlalchemy.orm.attributes import flag_dirty
 import enum
 
 class SchemeType(str, enum.Enum):
     GOVT = "GOVT"
     PRIVATE = "PRIVATE"
 
+# In-process id -> name caches for the lookup tables below.
+# Filled and kept current by core.dictionaries; both tables are tiny.
+class_labels = {}
+plan_labels = {}
+
+def _label(attr, id_attr, labels):
+    """
+    Read/write the string behind an integer foreign key. Reads go through
+    the cached dictionary; writes are held on the instance until
+    the flush hook in core.dictionaries resolves them to ids.
+    """
+    def getter(self):
+        pending = self.__dict__.get("_pending_labels")
+        if pending and attr in pending:
+            return pending[attr]
+        return labels.get(getattr(self, id_attr))
+
+    def setter(self, value):
+        self.__dict__.setdefault("_pending_labels", {})[attr] = value
+        # Not a mapped column, so flag the row for the flush hook explicitly
+        flag_dirty(self)
+
+    return property(getter, setter)
+
+class DrugClass(Base):
+    """Interned class strings (therapeutic, chemical, action, habit forming)."""
+    __tablename__ = "drug_classes"
+
+    id = Column(Integer, primary_key=True)
+    name = Column(String, unique=True, nullable=False)
+
+class InsurancePlan(Base):
+    __tablename__ = "insurance_plans"
+
+    id = Column(Integer, primary_key=True)
+    name = Column(String, unique=True, nullable=False)
+
 class ReimbursementScheme(Base):
     __tablename__ = "reimbursement_schemes"
+    # Keyset pagination of a plan's drugs (core.browse)
+    __table_args__ = (
+        Index("ix_reimbursement_schemes_plan_id_drug_name", "plan_id", "drug_name", "id"),
+        Index("ix_reimbursement_schemes_plan_id_lower_drug_name", "plan_id", func.lower(text("drug_name"))),
+    )
 
     id = Column(Integer, primary_key=True, index=True)
     drug_name = Column(String, index=True)
     scheme_type = Column(Enum(SchemeType))
-    plan_name = Column(String)
+    plan_id = Column(Integer, ForeignKey("insurance_plans.id"), index=True)
     coverage_percent = Column(Float)
     copay_amount = Column(Float)
     prior_authorization = Column(Boolean, default=False)
+    # Formulary tier: 1 (low-cost generic) to 4 (specialty); see core.cost_engine
+    tier = Column(Integer)
+
+    plan_name = _label("plan_name", "plan_id", plan_labels)
 
 class Medicine(Base):
     __tablename__ = "medicines"
+    # Keyset pagination of class listings (core.browse)
+    __table_args__ = (
+        Index("ix_medicines_therapeutic_class_id_drug_name", "therapeutic_class_id", "drug_name", "id"),
+        Index("ix_medicines_action_class_id_drug_name", "action_class_id", "drug_name", "id"),
+        Index("ix_medicines_chemical_class_id_drug_name", "chemical_class_id", "drug_name", "id"),
+        # Case-insensitive name prefix (core.browse)
+        Index("ix_medicines_lower_drug_name", func.lower(text("drug_name"))),
+    )
 
     id = Column(Integer, primary_key=True)
     drug_name = Column(String, index=True)
     substitutes = Column(Text)
     side_effects = Column(Text)
     uses = Column(Text)
-    chemical_class = Column(String)
-    habit_forming = Column(String)
-    therapeutic_class = Column(String)
-    action_class = Column(String)
+    chemical_class_id = Column(Integer, ForeignKey("drug_classes.id"), index=True)
+    habit_forming_id = Column(Integer, ForeignKey("drug_classes.id"))
+    therapeutic_class_id = Column(Integer, ForeignKey("drug_classes.id"), index=True)
+    action_class_id = Column(Integer, ForeignKey("drug_classes.id"), index=True)
     dosage = Column(Text)
     contraindications = Column(Text)
+    # Maximum retail price of one pack, INR
+    mrp = Column(Float)
+
+    chemical_class = _label("chemical_class", "chemical_class_id", class_labels)
+    habit_forming = _label("habit_forming", "habit_forming_id", class_labels)
+    therapeutic_class = _label("therapeutic_class", "therapeutic_class_id", class_labels)
+    action_class = _label("action_class", "action_class_id", class_labels)
+
+class Monograph(Base):
+    """
+    Precomputed answer for a head drug and intent, written offline by
+    materialize_monographs.py. source_hash covers the prompt and the
+    retrieved context, so a change to the source rows makes it stale.
+    """
+    __tablename__ = "monographs"
+    __table_args__ = (UniqueConstraint("drug_key", "intent"),)
+
+    id = Column(Integer, primary_key=True)
+    drug_key = Column(String, nullable=False)
+    drug_name = Column(String)
+    intent = Column(String, nullable=False)
+    context = Column(Text)
+    answer = Column(Text)
+    source_hash = Column(String(64), nullable=False)
+    model = Column(String)
+    generated_at = Column(DateTime)
+
+class SchemaMigration(Base):
+    """One row per migration in migrations/ applied to this database (core.migrations)."""
+    __tablename__ = "schema_migrations"
+
+    version = Column(Integer, primary_key=True, autoincrement=False)
+    name = Column(String, nullable=False)
+    applied_at = Column(DateTime, nullable=False)
+
+# Postgres only: trigram GIN indexes so fuzzy and ILIKE '%x%' matching on drug
+# names run inside the database (core.fuzzy.trigram_match). Created with the
+# tables; existing databases get them from migrations/v0003_trigram_indexes.py.
+TRIGRAM_TABLES = ("medicines", "reimbursement_schemes")
+
+def trigram_index_ddl(table_name: str) -> str:
+    return (
+        f"CREATE INDEX IF NOT EXISTS ix_{table_name}_drug_name_trgm "
+        f"ON {table_name} USING gin (drug_name gin_trgm_ops)"
+    )
+
+for _table in (Medicine.__table__, ReimbursementScheme.__table__):
+    event.listen(_table, "after_create", DDL("CREATE EXTENSION IF NOT EXISTS pg_trgm").execute_if(dialect="postgresql"))
+    event.listen(_table, "after_create", DDL(trigram_index_ddl(_table.name)).execute_if(dialect="postgresql"))
+
+# Registers the flush hook that interns label strings
+from core import dictionaries  # noqa: E402,F401
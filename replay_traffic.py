@@ -0,0 +1,198 @@
+import argparse
+import asyncio
+import json
+import time
+import numpy as np
+from langchain_core.messages import HumanMessage
+from core import fuzzy, metrics, traffic
+from core.agent_graph import app as agent_app
+from core.catalogue import catalogue
+from core.config import settings
+from core.cost_engine import cost_table
+from core.database import engine
+from core.llm_providers import use_provider
+from core.monographs import monographs
+from core.name_index import name_index
+
+
+def load_cases(path):
+    with open(path) as f:
+        return [json.loads(line) for line in f if line.strip()]
+
+
+async def prepare():
+    """Recorded LLM outputs instead of live models, and the in-memory stores loaded as at server startup."""
+    use_provider("replay")
+    if settings.PRELOAD_NAME_INDEX:
+        await name_index.load()
+    if settings.PRELOAD_CATALOGUE:
+        await catalogue.load()
+        await cost_table.load()
+    if settings.MONOGRAPHS_ENABLED:
+        await monographs.load()
+    await fuzzy.prewarm()
+
+
+async def replay_case(case):
+    """
+    Run one recorded query through the current graph, answering LLM calls
+    with the recorded outputs. Returns per-stage timings, DB statements,
+    prompt tokens per stage and whether retrieval or the answer changed.
+    """
+    recording = traffic.Recording(case["id"], case["query"])
+    state = traffic.ReplayState(case)
+
+    async def run():
+        # Own task, so the context variables stay with this case
+        traffic.current.set(recording)
+        traffic.replaying.set(state)
+        inputs = {"messages": [HumanMessage(content=case["query"])]}
+        async for mode, chunk in agent_app.astream(inputs, stream_mode=["custom", "updates"]):
+            if mode == "custom":
+                recording.event(chunk)
+            elif chunk.get("agent"):
+                update = chunk["agent"]
+                recording.timings = update.get("timings", {})
+                if update.get("messages"):
+                    recording.answer = update["messages"][-1].content
+
+    queries = metrics.get("db.queries")
+    start = time.perf_counter()
+    await asyncio.create_task(run())
+    wall = (time.perf_counter() - start) * 1000
+    replayed_hash = traffic.context_hash(recording.context) if recording.context is not None else None
+    return {
+        "id": case["id"],
+        "timings": {**recording.timings, "wall": round(wall, 2)},
+        "db_queries": metrics.get("db.queries") - queries,
+        "prompt_tokens": {stage: sum(c["prompt_tokens"] for c in calls) for stage, calls in recording.llm.items()},
+        "llm_calls": {stage: len(calls) for stage, calls in recording.llm.items()},
+        "unrecorded": state.unrecorded(),
+        "context_changed": replayed_hash != case.get("context_hash"),
+        "answer_changed": recording.answer != case.get("answer"),
+    }
+
+
+async def replay(cases, repeat=3, warmup=1):
+    """Every case `repeat` times after `warmup` untimed passes; per case, the median timing of each stage."""
+    for _ in range(warmup):
+        for case in cases:
+            await replay_case(case)
+    results = []
+    for case in cases:
+        runs = [await replay_case(case) for _ in range(repeat)]
+        result = runs[-1]
+        result["timings"] = {
+            stage: round(float(np.median([r["timings"][stage] for r in runs if stage in r["timings"]])), 2)
+            for stage in result["timings"]
+        }
+        results.append(result)
+    return results
+
+
+def summarize(cases, results):
+    stages = {}
+    for result in results:
+        for stage, ms in result["timings"].items():
+            stages.setdefault(stage, []).append(ms)
+    recorded_tokens = {}
+    for case in cases:
+        for stage, calls in (case.get("llm") or {}).items():
+            recorded_tokens[stage] = recorded_tokens.get(stage, 0) + sum(c.get("prompt_tokens", 0) for c in calls)
+    prompt_tokens = {}
+    for result in results:
+        for stage, tokens in result["prompt_tokens"].items():
+            prompt_tokens[stage] = prompt_tokens.get(stage, 0) + tokens
+    return {
+        "cases": len(results),
+        "token_counter": traffic.token_counter(),
+        "stages": {
+            stage: {"n": len(ms), "p50": round(float(np.percentile(ms, 50)), 2), "p95": round(float(np.percentile(ms, 95)), 2)}
+            for stage, ms in sorted(stages.items())
+        },
+        "db_queries": sum(r["db_queries"] for r in results),
+        "prompt_tokens": prompt_tokens,
+        "recorded_prompt_tokens": recorded_tokens,
+        "context_changed": [r["id"] for r in results if r["context_changed"]],
+        "answer_changed": [r["id"] for r in results if r["answer_changed"]],
+        "unrecorded_llm_calls": {r["id"]: r["unrecorded"] for r in results if r["unrecorded"]},
+    }
+
+
+def print_summary(summary):
+    print(f"\nReplayed {summary['cases']} cases (prompt tokens: {summary['token_counter']})")
+    print(f"{'stage':<14} {'n':>5} {'p50 ms':>9} {'p95 ms':>9}")
+    for stage, row in summary["stages"].items():
+        print(f"{stage:<14} {row['n']:>5} {row['p50']:>9.2f} {row['p95']:>9.2f}")
+    print(f"DB queries: {summary['db_queries']} ({summary['db_queries'] / max(summary['cases'], 1):.1f} per case)")
+    for stage, tokens in summary["prompt_tokens"].items():
+        print(f"Prompt tokens, {stage}: {tokens} (recorded: {summary['recorded_prompt_tokens'].get(stage, 0)})")
+    for key in ("context_changed", "answer_changed", "unrecorded_llm_calls"):
+        if summary[key]:
+            print(f"{key}: {summary[key]}")
+
+
+def compare(baseline, summary, max_slowdown, min_ms, max_token_growth):
+    """Regressions of `summary` against a saved baseline summary, as messages."""
+    problems = []
+    print(f"\n{'stage':<14} {'base p50':>9} {'p50':>9} {'ratio':>7}")
+    for stage, row in summary["stages"].items():
+        base = baseline["stages"].get(stage)
+        if base is None:
+            continue
+        if base["p50"]:
+            ratio = row["p50"] / base["p50"]
+        else:
+            ratio = 1.0 if not row["p50"] else float("inf")
+        print(f"{stage:<14} {base['p50']:>9.2f} {row['p50']:>9.2f} {ratio:>7.2f}")
+        if ratio > max_slowdown and row["p50"] - base["p50"] >= min_ms:
+            problems.append(f"{stage} p50 {base['p50']:.2f} -> {row['p50']:.2f} ms")
+    if summary["db_queries"] > baseline["db_queries"]:
+        problems.append(f"DB queries {baseline['db_queries']} -> {summary['db_queries']}")
+    for stage, tokens in summary["prompt_tokens"].items():
+        base = baseline["prompt_tokens"].get(stage, 0)
+        if base and tokens > base * (1 + max_token_growth):
+            problems.append(f"{stage} prompt tokens {base} -> {tokens}")
+    return problems
+
+
+async def main(args):
+    cases = load_cases(args.traffic)[:args.limit]
+    await prepare()
+    try:
+        results = await replay(cases, args.repeat, args.warmup)
+    finally:
+        fuzzy.shutdown()
+        await engine.dispose()
+    summary = summarize(cases, results)
+    if args.verbose:
+        for result in results:
+            print(json.dumps(result))
+    print_summary(summary)
+    if args.save:
+        with open(args.save, "w") as f:
+            json.dump({"summary": summary, "cases": results}, f, indent=2)
+        print(f"Saved to {args.save}")
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)["summary"]
+        problems = compare(baseline, summary, args.max_slowdown, args.min_ms, args.max_token_growth)
+        if problems:
+            print("\nREGRESSIONS:\n" + "\n".join(f"  {p}" for p in problems))
+            raise SystemExit(1)
+        print("\nNo regressions against the baseline")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Replay recorded /api/chat traffic offline with the recorded LLM outputs")
+    parser.add_argument("traffic", help="JSONL recorded with TRAFFIC_RECORD_PATH")
+    parser.add_argument("--limit", type=int, default=None, help="Replay only the first N cases")
+    parser.add_argument("--repeat", type=int, default=3, help="Timed runs per case (median reported)")
+    parser.add_argument("--warmup", type=int, default=1, help="Untimed passes over all cases first")
+    parser.add_argument("--save", help="Write the report (summary and per-case results) to this JSON file")
+    parser.add_argument("--compare", help="Baseline report from --save; exit 1 on regressions")
+    parser.add_argument("--max-slowdown", type=float, default=1.25, help="Allowed p50 ratio per stage")
+    parser.add_argument("--min-ms", type=float, default=1.0, help="Ignore slowdowns smaller than this (noise)")
+    parser.add_argument("--max-token-growth", type=float, default=0.02, help="Allowed prompt-token growth per stage")
+    parser.add_argument("-v", "--verbose", action="store_true", help="Print every case's result")
+    asyncio.run(main(parser.parse_args()))
@@ -2,6 +2,8 @@ import asyncio
 from sqlalchemy.ext.asyncio import create_async_engine, AsyncSession
 from sqlalchemy.orm import sessionmaker
 from core.config import settings
+from core import migrations
+from core.cost_engine import tier_for_price
 from models.models import ReimbursementScheme, SchemeType, Medicine, Base
 
 DATABASE_URL = settings.DATABASE_URL
@@ -15,12 +17,15 @@ async def seed_data():
     async with engine.begin() as conn:
         await conn.run_sync(Base.metadata.drop_all)
         await conn.run_sync(Base.metadata.create_all)
+    # Built from models/models.py, so already at the latest schema version
+    await migrations.stamp(engine)
 
     async with AsyncSessionLocal() as session:
         # Seed Medicines (to ensure categories are available)
         medicines_data = [
             Medicine(
                 drug_name="Cetirizine",
+                mrp=18.5,
                 therapeutic_class="Allergy Medicines", 
                 uses="Allergies, Hay fever, Urticaria",
                 side_effects="Drowsiness, Dry mouth",
@@ -33,6 +38,7 @@ async def seed_data():
             ),
              Medicine(
                 drug_name="Paracetamol",
+                mrp=30.0,
                 therapeutic_class="Analgesics/Antipyretics",
                 uses="Fever, Pain",
                 side_effects="Nausea, Liver damage (high dose)",
@@ -45,6 +51,7 @@ async def seed_data():
             ),
             Medicine(
                 drug_name="Ibuprofen",
+                mrp=35.0,
                 therapeutic_class="NSAID",
                 uses="Pain, Inflammation, Fever",
                 side_effects="Stomach pain, Heartburn",
@@ -57,6 +64,7 @@ async def seed_data():
             ),
             Medicine(
                 drug_name="Metformin",
+                mrp=45.0,
                 therapeutic_class="Antidiabetics",
                 uses="Type 2 Diabetes",
                 side_effects="Nausea, Stomach upset",
@@ -69,6 +77,7 @@ async def seed_data():
             ),
             Medicine(
                 drug_name="Atorvastatin",
+                mrp=110.0,
                 therapeutic_class="Statins",
                 uses="High Cholesterol, Heart Disease Prevention",
                 side_effects="Muscle pain, Liver damage",
@@ -81,6 +90,7 @@ async def seed_data():
             ),
             Medicine(
                 drug_name="Amoxicillin",
+                mrp=90.0,
                 therapeutic_class="Antibiotics",
                 uses="Bacterial Infections",
                 side_effects="Diarrhea, Rash",
@@ -93,6 +103,7 @@ async def seed_data():
             ),
             Medicine(
                 drug_name="Pantoprazole",
+                mrp=120.0,
                 therapeutic_class="Proton Pump Inhibitors",
                 uses="GERD, Acid Reflux",
                 side_effects="Headache, Diarrhea",
@@ -105,6 +116,7 @@ async def seed_data():
             ),
             Medicine(
                 drug_name="Telmisartan",
+                mrp=140.0,
                 therapeutic_class="Antihypertensives",
                 uses="High Blood Pressure",
                 side_effects="Dizziness, Back pain",
@@ -362,7 +374,8 @@ async def seed_data():
                 habit_forming="No",
                 action_class="Therapeutic agent",
                 dosage="Standard adult dosage. Consult physician for specifics.",
-                contraindications="Hypersensitivity, specific conditions apply."
+                contraindications="Hypersensitivity, specific conditions apply.",
+                mrp=round(random.uniform(20, 600), 2)
             ))
             existing_drug_names.add(drug)
 
@@ -400,6 +413,12 @@ async def seed_data():
                     prior_authorization=True
                 ))
 
+        # Formulary tier from the drug's price band
+        mrp_by_drug = {m.drug_name: m.mrp for m in medicines_data}
+        for scheme in schemes:
+            if mrp_by_drug.get(scheme.drug_name) is not None:
+                scheme.tier = int(tier_for_price(mrp_by_drug[scheme.drug_name]))
+
         session.add_all(medicines_data)
         session.add_all(schemes)
         await session.commit()
@@ -0,0 +1,71 @@
+import argparse
+import asyncio
+import gc
+from gunicorn.app.base import BaseApplication
+from core.config import settings
+
+
+async def _build_shared_state():
+    # Imported here so the master only pays for it when preloading
+    from core.database import engine
+    from core.catalogue import catalogue
+    from core.name_index import name_index
+    from core.monographs import monographs
+    from core.cost_engine import cost_table
+    from core import migrations
+
+    # Once, in the master, so workers never race each other on the schema
+    if settings.MIGRATE_ON_STARTUP:
+        await migrations.upgrade(engine)
+    if settings.PRELOAD_NAME_INDEX:
+        await name_index.load()
+    if settings.PRELOAD_CATALOGUE:
+        await catalogue.load()
+        await cost_table.load()
+    if settings.MONOGRAPHS_ENABLED:
+        await monographs.load()
+    # No open DB connections may cross the fork
+    await engine.dispose()
+
+
+class PreloadedApplication(BaseApplication):
+    """
+    Production launcher: gunicorn master with uvicorn workers.
+    The app, the fuzzy-match name index and the medicine catalogue are loaded once in the master
+    before forking, so every worker shares those pages copy-on-write.
+    """
+
+    def __init__(self, options):
+        self.options = options
+        super().__init__()
+
+    def load_config(self):
+        for key, value in self.options.items():
+            self.cfg.set(key, value)
+
+    def load(self):
+        from api.index import app
+
+        asyncio.run(_build_shared_state())
+        # Move everything loaded so far out of the GC's tracked generations,
+        # so collections in the workers do not touch (and copy) shared pages
+        gc.freeze()
+        return app
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Run IntelliPharma with multiple preloaded workers")
+    parser.add_argument("--host", default="0.0.0.0")
+    parser.add_argument("--port", type=int, default=8000)
+    parser.add_argument("--workers", type=int, default=settings.WEB_CONCURRENCY)
+    parser.add_argument("--timeout", type=int, default=120)
+    args = parser.parse_args()
+
+    PreloadedApplication({
+        "bind": f"{args.host}:{args.port}",
+        "workers": args.workers,
+        "worker_class": "uvicorn.workers.UvicornWorker",
+        "preload_app": True,
+        "timeout": args.timeout,
+        "keepalive": 5,
+    }).run()
@@ -0,0 +1,82 @@
+import asyncio
+import os
+
+# In-process run against the stub models; set before core.config is imported
+os.environ.setdefault("EXTRACTION_PROVIDER", "stub")
+os.environ.setdefault("ANSWER_PROVIDER", "stub")
+# Exercise the LLM pipeline; the fast path would answer these queries locally
+os.environ.setdefault("FASTPATH_ENABLED", "false")
+
+from core import metrics
+from core.batch import BatchRunner, parse_batch
+from core.catalogue import catalogue
+from core.llm_providers import extraction_llm
+from core.name_index import name_index
+
+
+def test_parse_batch():
+    print("\n--- Parsing JSONL queries ---")
+    queries = parse_batch(['{"id": "a", "message": "Uses of Paracetamol"}', "", '{"query": "Dosage of Ibuprofen"}'])
+    assert [q.id for q in queries] == ["a", "3"], queries
+    for bad in ['{"id": 1}', "not json", '["Paracetamol"]', '{"id": 1, "message": "x"}\n{"id": 1, "message": "y"}']:
+        try:
+            parse_batch(bad.splitlines())
+        except ValueError as e:
+            print(f"Rejected: {e}")
+        else:
+            raise AssertionError(f"accepted {bad!r}")
+    print("OK")
+
+
+async def test_batch_shares_work():
+    print("\n--- Batch: each distinct query and drug handled once ---")
+    await name_index.load()
+    await catalogue.load()
+    messages = ["Side effects of Cetirizine", "Dosage of Cetirizine", "Which schemes reimburse Paracetamol"]
+    queries = parse_batch(f'{{"id": "q{i}", "message": "{messages[i % 3]}"}}' for i in range(30))
+
+    before = metrics.get("llm.extraction.calls")
+    runner = BatchRunner(concurrency=4, chunk_size=10)
+    results = [result async for result in runner.run(queries)]
+
+    assert sorted(r["id"] for r in results) == sorted(q.id for q in queries)
+    assert all("answer" in r for r in results), [r for r in results if "answer" not in r]
+    assert metrics.get("llm.extraction.calls") - before == len(messages)
+    print(f"Extractions: {len(runner.extractions)}, drugs resolved: {len(runner.resolutions)}, scheme lookups: {len(runner.schemes)}")
+    print(results[0])
+    print("OK")
+
+
+class UnreachableModel:
+    """Extraction model whose provider is down."""
+
+    async def ainvoke(self, messages):
+        raise ConnectionError("provider unreachable")
+
+
+async def test_extraction_failure_is_an_error():
+    print("\n--- Batch: a failed extraction is an error row, not a drug-less answer ---")
+    queries = parse_batch(['{"id": "a", "message": "Side effects of Cetirizine"}', '{"id": "b", "message": "Side effects of Cetirizine"}'])
+    model, extraction_llm.model = extraction_llm.model, UnreachableModel()
+    try:
+        results = [result async for result in BatchRunner(concurrency=2).run(queries)]
+    finally:
+        extraction_llm.model = model
+    print(results[0])
+    assert sorted(r["id"] for r in results) == ["a", "b"]
+    assert all("error" in r and "answer" not in r for r in results), results
+
+    # Resuming (as batch_chat.py does for ids without an answer) now answers them
+    results = [result async for result in BatchRunner(concurrency=2).run(queries)]
+    assert all("answer" in r and "Cetirizine" in r["drugs"] for r in results), results
+    print("OK")
+
+
+async def test():
+    test_parse_batch()
+    await test_batch_shares_work()
+    await test_extraction_failure_is_an_error()
+
+
+if __name__ == "__main__":
+    asyncio.run(test())
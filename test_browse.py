@@ -0,0 +1,79 @@
+import asyncio
+import httpx
+from sqlalchemy import select
+from api.index import app
+from core.database import AsyncSessionLocal
+from models.models import Medicine
+
+
+async def walk(client, url, limit, **filters):
+    """Every item of a listing, following next cursors page by page."""
+    items, cursor, pages = [], None, 0
+    while True:
+        params = {**filters, "limit": limit, **({"cursor": cursor} if cursor else {})}
+        response = await client.get(url, params=params)
+        assert response.status_code == 200, response.text
+        body = response.json()
+        items += body["items"]
+        pages += 1
+        cursor = body["next"]
+        if cursor is None:
+            return items, pages
+
+
+async def test():
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+        print("\n--- Keyset pages cover a class exactly once, in name order ---")
+        classes = (await client.get("/api/catalogue/classes", params={"kind": "therapeutic"})).json()
+        name, count = max(classes["items"], key=lambda item: item[1])
+        items, pages = await walk(client, "/api/catalogue/medicines", limit=3, therapeutic_class=name.lower())
+        print(f"{name}: {count} medicines in {pages} pages")
+        async with AsyncSessionLocal() as session:
+            medicines = (await session.execute(select(Medicine).order_by(Medicine.drug_name, Medicine.id))).scalars().all()
+            expected = [m.id for m in medicines if m.therapeutic_class == name]
+        assert [item[0] for item in items] == expected and len(items) == count
+        print("OK")
+
+        print("\n--- Prefix and plan listings ---")
+        response = await client.get("/api/catalogue/medicines", params={"prefix": "Met"})
+        names = [item[1] for item in response.json()["items"]]
+        print(names)
+        assert names and all(n.startswith("Met") for n in names) and names == sorted(names)
+        for spelling in ("met", "MET"):
+            response = await client.get("/api/catalogue/medicines", params={"prefix": spelling})
+            assert [item[1] for item in response.json()["items"]] == names, spelling
+        plans = (await client.get("/api/catalogue/plans")).json()["items"]
+        plan_id, plan_name, schemes = max(plans, key=lambda item: item[2])
+        items, pages = await walk(client, f"/api/catalogue/plans/{plan_id}/medicines", limit=7)
+        print(f"{plan_name}: {schemes} schemes in {pages} pages")
+        assert len(items) == schemes
+        print("OK")
+
+        print("\n--- ETag: unchanged data answers 304 ---")
+        url = f"/api/catalogue/medicines?therapeutic_class={name}&limit=5"
+        first = await client.get(url)
+        etag = first.headers["etag"]
+        again = await client.get(url, headers={"If-None-Match": etag})
+        assert again.status_code == 304 and again.headers["etag"] == etag and not again.content
+        other = await client.get(url.replace("limit=5", "limit=6"))
+        assert other.headers["etag"] != etag
+        print(f"ETag {etag}, {len(first.content)} bytes, then 304")
+        print("OK")
+
+        print("\n--- Bad requests ---")
+        for bad_url, status in [
+            ("/api/catalogue/medicines?cursor=not-a-cursor", 400),
+            ("/api/catalogue/medicines?therapeutic_class=No Such Class", 404),
+            ("/api/catalogue/plans/999999/medicines", 404),
+            ("/api/catalogue/classes?kind=colour", 400),
+            ("/api/catalogue/medicines?limit=100000", 422),
+        ]:
+            response = await client.get(bad_url)
+            print(f"{bad_url} -> {response.status_code}")
+            assert response.status_code == status, response.text
+        print("OK")
+
+
+if __name__ == "__main__":
+    asyncio.run(test())
@@ -0,0 +1,109 @@
+import asyncio
+import os
+import subprocess
+import sys
+import time
+import httpx
+from core.singleflight import SingleFlight
+
+PORT = 8766
+BASE_URL = f"http://127.0.0.1:{PORT}"
+
+
+async def wait_until_ready(base_url, timeout=60):
+    deadline = time.monotonic() + timeout
+    async with httpx.AsyncClient() as client:
+        while time.monotonic() < deadline:
+            try:
+                if (await client.get(f"{base_url}/api/health")).status_code == 200:
+                    return
+            except httpx.TransportError:
+                pass
+            await asyncio.sleep(0.5)
+    raise RuntimeError("Server did not become ready")
+
+
+async def test_singleflight_refcount():
+    print("\n--- SingleFlight: work survives until the last caller leaves ---")
+    flight = SingleFlight("test")
+    started = asyncio.Event()
+
+    async def slow():
+        started.set()
+        await asyncio.sleep(10)
+
+    first = asyncio.create_task(flight.do("key", slow))
+    second = asyncio.create_task(flight.do("key", slow))
+    await started.wait()
+    work = flight._inflight["key"]
+
+    first.cancel()
+    await asyncio.sleep(0)
+    assert not work.cancelled(), "work cancelled while a caller was still waiting"
+
+    second.cancel()
+    await asyncio.wait([work], timeout=1)
+    assert work.cancelled(), "work kept running with no callers left"
+    print("OK")
+
+
+async def wait_for_counter(client, name, value, timeout=10):
+    for _ in range(int(timeout / 0.05)):
+        counters = (await client.get(f"{BASE_URL}/api/metrics")).json()["counters"]
+        if counters.get(name, 0) >= value:
+            return
+        await asyncio.sleep(0.05)
+    raise AssertionError(f"{name} never reached {value}")
+
+
+async def test_disconnect_cancels_work():
+    print("\n--- Client disconnect cancels the LLM and DB work ---")
+    env = dict(os.environ)
+    env.update({
+        "EXTRACTION_PROVIDER": "stub",
+        "ANSWER_PROVIDER": "stub",
+        # Long enough that the client is gone while extraction is still running
+        "STUB_LLM_LATENCY": "2",
+        # Keep the query on the LLM path
+        "FASTPATH_ENABLED": "false",
+        "MONOGRAPHS_ENABLED": "false",
+    })
+    server = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "api.index:app", "--port", str(PORT)],
+        env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+    )
+    try:
+        await wait_until_ready(BASE_URL)
+        async with httpx.AsyncClient(timeout=30) as client:
+            # Warm-up run to completion, so the cancelled run does not include cold-start time
+            await client.post(f"{BASE_URL}/api/chat", json={"message": "Uses of Paracetamol"})
+            before = (await client.get(f"{BASE_URL}/api/metrics")).json()["counters"]
+
+            async with client.stream("POST", f"{BASE_URL}/api/chat", json={"message": "Side effects of Cetirizine"}) as response:
+                async for line in response.aiter_lines():
+                    print(f"Received: {line}")
+                    break
+                # Wait until extraction is in flight, then close the stream: the browser tab went away
+                await wait_for_counter(client, "llm.extraction.calls", before.get("llm.extraction.calls", 0) + 1)
+
+            # Past the point where extraction would have finished and the answer started
+            await asyncio.sleep(5)
+            after = (await client.get(f"{BASE_URL}/api/metrics")).json()["counters"]
+            delta = {name: value - before.get(name, 0) for name, value in after.items() if value != before.get(name, 0)}
+            print(f"Counters for the cancelled request: {delta}")
+            assert delta.get("chat.requests_cancelled") == 1
+            assert delta.get("llm.extraction.cancelled") == 1
+            assert "llm.answer.calls" not in delta, "answer stage ran for a disconnected client"
+    finally:
+        server.terminate()
+        server.wait()
+    print("OK")
+
+
+async def test():
+    await test_singleflight_refcount()
+    await test_disconnect_cancels_work()
+
+
+if __name__ == "__main__":
+    asyncio.run(test())
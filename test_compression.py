@@ -0,0 +1,93 @@
+import asyncio
+import json
+import zlib
+import httpx
+from starlette.responses import StreamingResponse
+from api.index import app
+from core import serialization
+from core.compression import CompressionMiddleware, negotiate
+
+LINES = [serialization.dumps_line({"type": "delta", "content": f"token {i} "}) for i in range(20)]
+
+
+def test_negotiate():
+    print("\n--- Accept-Encoding negotiation ---")
+    assert negotiate("gzip, deflate") == "gzip"
+    assert negotiate("gzip;q=0") is None
+    assert negotiate("*") == "gzip"
+    assert negotiate("identity") is None and negotiate("") is None
+    assert negotiate("br;q=1.0, gzip;q=0.8") in ("br", "gzip")
+    print("OK")
+
+
+async def test_stream_flushes_each_line():
+    print("\n--- A compressed NDJSON stream still delivers every line as it is sent ---")
+
+    async def lines():
+        for line in LINES:
+            yield line
+            await asyncio.sleep(0)
+
+    async def stream_app(scope, receive, send):
+        await StreamingResponse(lines(), media_type="application/x-ndjson")(scope, receive, send)
+
+    middleware = CompressionMiddleware(stream_app, minimum_size=0)
+    scope = {"type": "http", "method": "GET", "path": "/", "headers": [(b"accept-encoding", b"gzip")]}
+    decoder = zlib.decompressobj(16 + zlib.MAX_WBITS)
+    received = []
+
+    async def receive():
+        await asyncio.Event().wait()
+
+    async def send(message):
+        if message["type"] == "http.response.start":
+            headers = dict(message["headers"])
+            assert headers[b"content-encoding"] == b"gzip" and b"content-length" not in headers
+            return
+        # Every chunk decodes on its own to whole lines: nothing is held back in the compressor
+        text = decoder.decompress(message["body"])
+        if message.get("more_body"):
+            received.append(text)
+
+    await middleware(scope, receive, send)
+    assert received == LINES, received[:3]
+    print(f"{len(LINES)} lines, each decoded as soon as its chunk arrived")
+    print("OK")
+
+
+async def test_endpoints():
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+        print(f"\n--- Endpoints ({serialization.BACKEND} serializer) ---")
+        health = await client.get("/api/health", headers={"Accept-Encoding": "gzip"})
+        assert "content-encoding" not in health.headers and health.json() == {"status": "ok"}
+
+        url, params = "/api/catalogue/medicines", {"limit": 500}
+        plain = await client.get(url, params=params, headers={"Accept-Encoding": "identity"})
+        gzipped = await client.get(url, params=params, headers={"Accept-Encoding": "gzip"})
+        assert "content-encoding" not in plain.headers
+        assert gzipped.headers["content-encoding"] == "gzip" and "Accept-Encoding" in gzipped.headers["vary"]
+        wire = int(gzipped.headers["content-length"])
+        assert gzipped.json() == plain.json() and wire < len(plain.content)
+        print(f"browse page: {len(plain.content)} bytes, {wire} gzipped")
+
+        small = await client.post("/api/costs", json={"drugs": ["Cetirizine"]}, headers={"Accept-Encoding": "gzip"})
+        assert "content-encoding" not in small.headers, "below COMPRESSION_MIN_SIZE"
+
+        async with client.stream("POST", "/api/chat", json={"message": "What is the dosage of Metformin?"},
+                                 headers={"Accept-Encoding": "gzip"}) as response:
+            assert response.headers["content-encoding"] == "gzip"
+            events = [json.loads(line) async for line in response.aiter_lines() if line]
+        print([event["type"] for event in events])
+        assert events[0]["type"] == "accepted" and events[-1]["type"] == "summary"
+        print("OK")
+
+
+async def test():
+    test_negotiate()
+    await test_stream_flushes_each_line()
+    await test_endpoints()
+
+
+if __name__ == "__main__":
+    asyncio.run(test())
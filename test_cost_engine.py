@@ -0,0 +1,95 @@
+import asyncio
+import time
+import httpx
+import numpy as np
+from api.index import app
+from core import metrics
+from core.catalogue import catalogue
+from core.cost_engine import cost_table, patient_cost, rank, tier_for_price
+from tools.commercial_tools import compare_reimbursement_schemes
+
+
+def test_formulas():
+    print("\n--- Patient cost, tiers and ranking ---")
+    cost = patient_cost(200.0, np.array([100.0, 80.0, 90.0, 60.0, 0.0]), np.array([0.0, 0.0, 50.0, 200.0, 0.0]))
+    print(cost)
+    # Full cover, 20% share, 10% share + flat co-pay, co-pay capped at the MRP, no cover
+    assert np.allclose(cost, [0.0, 40.0, 70.0, 200.0, 200.0]), cost
+    assert np.isnan(patient_cost(None, 80.0, 0.0))
+    assert tier_for_price(np.array([10.0, 50.0, 120.0, 999.0, 5000.0])).tolist() == [1, 1, 2, 3, 4]
+    # Equal costs: no prior authorization first, then the lower tier; unknown costs last
+    order = rank(np.array([40.0, np.nan, 40.0, 40.0, 0.0]), np.array([True, False, False, False, False]),
+                 np.array([1.0, 1.0, 3.0, 2.0, np.nan]))
+    assert order.tolist() == [4, 3, 2, 0, 1], order
+    print("OK")
+
+
+async def test_cost_table():
+    print("\n--- Cost table over the seeded formulary ---")
+    await cost_table.load()
+    print(cost_table.stats())
+    plans = cost_table.cheapest_plans("cetirizine", limit=10)
+    for plan in plans:
+        print(plan)
+    assert plans and plans[0]["patient_cost"] == 0.0
+    costs = [p["patient_cost"] for p in plans]
+    assert costs == sorted(costs), costs
+    no_prior_auth = cost_table.cheapest_plans("Telmisartan", allow_prior_auth=False)
+    assert all(not p["prior_authorization"] for p in no_prior_auth)
+
+    basket = cost_table.compare_plans(["Cetirizine", "Paracetamol", "Metformin", "Nosuchdrug"], quantities=[2, 1, 3, 1])
+    print(basket)
+    assert basket["not_found"] == ["Nosuchdrug"] and basket["drugs"] == 3
+    totals = [p["patient_cost"] for p in basket["plans"]]
+    assert totals == sorted(totals) and all(t <= basket["full_price"] for t in totals)
+
+    start = time.perf_counter()
+    formulary = cost_table.compare_plans()
+    ms = (time.perf_counter() - start) * 1000
+    print(f"Whole formulary: {formulary['drugs']} drugs across {len(formulary['plans'])} plans in {ms:.2f} ms")
+    assert formulary["drugs"] == np.count_nonzero(~np.isnan(cost_table.drug_mrp))
+    for bad in ([0, 1], [-2, 1], [float("nan"), 1]):
+        try:
+            cost_table.compare_plans(["Cetirizine", "Paracetamol"], quantities=bad)
+        except ValueError:
+            pass
+        else:
+            raise AssertionError(f"accepted quantities {bad}")
+    print("OK")
+
+
+async def test_tool_output():
+    print("\n--- Scheme comparison shows out-of-pocket cost, cheapest first ---")
+    result = await compare_reimbursement_schemes.ainvoke("Telmisartan")
+    print(result)
+    assert "Out of pocket: ₹" in result and "Prior authorization required." in result
+    # With the cost table and catalogue loaded, an exact name needs no database query
+    await catalogue.load()
+    queries = metrics.get("db.queries")
+    assert await compare_reimbursement_schemes.ainvoke("telmisartan") == result.replace("Telmisartan", "telmisartan")
+    assert metrics.get("db.queries") == queries, "scheme lookup went to the database"
+    print("OK")
+
+
+async def test_endpoint_validation():
+    print("\n--- /api/costs rejects quantities that are not positive numbers ---")
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+        drugs = ["Cetirizine", "Paracetamol"]
+        for bad in ([0, 1], [-2, 1], ["NaN", 1], ["Infinity", 1]):
+            response = await client.post("/api/costs", json={"drugs": drugs, "quantities": bad})
+            assert response.status_code == 422, (bad, response.status_code)
+        response = await client.post("/api/costs", json={"drugs": drugs, "quantities": [2, 0.5]})
+        assert response.status_code == 200 and response.json()["drugs"] == 2
+    print("OK")
+
+
+async def test():
+    test_formulas()
+    await test_cost_table()
+    await test_tool_output()
+    await test_endpoint_validation()
+
+
+if __name__ == "__main__":
+    asyncio.run(test())
@@ -0,0 +1,44 @@
+import asyncio
+import os
+import tempfile
+from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine
+from check_data_quality import find_duplicate_names, find_orphaned_schemes
+from models.models import Base, Medicine, ReimbursementScheme
+
+
+async def test_orphans_with_null_names(path):
+    print("\n--- Orphaned schemes are found even when a medicine has no name ---")
+    engine = create_async_engine(f"sqlite+aiosqlite:///{path}")
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+    async with AsyncSession(engine) as session:
+        session.add_all([
+            Medicine(drug_name="Cetirizine"),
+            Medicine(drug_name="cetirizine "),
+            Medicine(drug_name=None),
+            ReimbursementScheme(drug_name="Cetirizine"),
+            ReimbursementScheme(drug_name="CETIRIZINE"),
+            ReimbursementScheme(drug_name="Nosuchdrug"),
+            ReimbursementScheme(drug_name="Nosuchdrug"),
+        ])
+        await session.commit()
+
+        orphans = await find_orphaned_schemes(session)
+        print(orphans)
+        assert orphans["orphaned_drug_names"] == 1 and orphans["orphaned_rows"] == 2
+        assert orphans["examples"] == [{"drug_name": "Nosuchdrug", "schemes": 2}]
+
+        duplicates = await find_duplicate_names(session)
+        print(duplicates)
+        assert duplicates["examples"] == [{"name": "cetirizine", "rows": 2}]
+    await engine.dispose()
+    print("OK")
+
+
+async def test():
+    with tempfile.TemporaryDirectory() as tmp:
+        await test_orphans_with_null_names(os.path.join(tmp, "quality.db"))
+
+
+if __name__ == "__main__":
+    asyncio.run(test())
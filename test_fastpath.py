@@ -0,0 +1,54 @@
+import asyncio
+from core.catalogue import catalogue
+from core.name_index import name_index
+from core.fastpath import _name_key, fastpath
+
+
+async def test():
+    await name_index.load()
+    await catalogue.load()
+
+    print("\n--- Fast path: structured single-drug questions ---")
+    for query in [
+        "What is the dosage of Metformin?",
+        "side effects of cetirizine",
+        "Which government schemes reimburse Cetirizine?",
+        "Is Alprazolam habit forming?",
+    ]:
+        result = await fastpath.answer(query)
+        assert result is not None, f"fast path skipped: {query}"
+        drug_name, intent, content = result
+        print(f"{query} -> {drug_name} {sorted(intent.labels)}\n{content}\n")
+
+    print("\n--- Fast path: everything else takes the LLM path ---")
+    for query in [
+        "Compare Paracetamol and Ibuprofen",          # two drugs
+        "Dosage and side effects of Metformin",        # two intents
+        "What is the dosage of Metformn?",             # typo: needs fuzzy matching
+        "Tell me about Metformin",                     # overview
+        "What is the dosage for children?",            # no drug
+    ]:
+        assert await fastpath.answer(query) is None, f"fast path answered: {query}"
+        print(f"Skipped: {query}")
+    print("OK")
+
+    print("\n--- Fast path: qualified questions take the LLM path ---")
+    for query in [
+        "What is the dosage of Metformin for a 5 year old child with kidney failure?",
+        "Is Metformin safe with alcohol?",
+        "How much Paracetamol is an overdose?",
+        "Does Metformin interact with Insulin dose",
+        "Side effects of Cetirizine in elderly patients",
+    ]:
+        assert await fastpath.answer(query) is None, f"fast path answered: {query}"
+        print(f"Skipped: {query}")
+    print("OK")
+
+    print("\n--- Fast path: combination products keep their separators ---")
+    assert _name_key("Amoxicillin+Clavulanate") == _name_key("amoxicillin + clavulanate") == "amoxicillin + clavulanate"
+    assert _name_key("Amoxicillin/Clavulanate") != _name_key("Amoxicillin+Clavulanate")
+    print("OK")
+
+
+if __name__ == "__main__":
+    asyncio.run(test())
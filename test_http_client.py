@@ -0,0 +1,42 @@
+import asyncio
+import httpx
+from core.http_client import RETRY_5XX_STATUSES, RETRY_STATUSES, RetryBudget, RetryTransport
+
+
+def failing_transport(status, failures):
+    """Answers `status` for the first `failures` requests, then 200; counts the attempts."""
+    attempts = []
+
+    def handler(request):
+        attempts.append(request)
+        return httpx.Response(status if len(attempts) <= failures else 200)
+
+    return httpx.MockTransport(handler), attempts
+
+
+async def send(status, failures, retry_statuses=RETRY_STATUSES):
+    inner, attempts = failing_transport(status, failures)
+    transport = RetryTransport(inner, max_attempts=3, backoff_base=0, backoff_cap=0,
+                               budget=RetryBudget(1.0), retry_statuses=retry_statuses)
+    async with httpx.AsyncClient(transport=transport) as client:
+        response = await client.post("http://llm.test/v1/chat/completions")
+    return response.status_code, len(attempts)
+
+
+async def test():
+    print("\n--- Only 429 and 503 are retried by default ---")
+    for status in (429, 503):
+        assert await send(status, 1) == (200, 2), status
+    for status in (500, 502, 504):
+        assert await send(status, 1) == (status, 1), status
+    print("OK")
+
+    print("\n--- 500/502/504 are retried with LLM_RETRY_5XX ---")
+    for status in (500, 502, 504):
+        assert await send(status, 1, RETRY_STATUSES | RETRY_5XX_STATUSES) == (200, 2), status
+    assert await send(503, 5) == (503, 3), "gives up after max_attempts"
+    print("OK")
+
+
+if __name__ == "__main__":
+    asyncio.run(test())
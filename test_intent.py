@@ -0,0 +1,46 @@
+from core.intent import ALL_FIELDS, CLASS_FIELDS, classify_intent, clinical_fields
+
+
+def check(query, labels, clinical, reimbursement, fields=None, has_drug=True):
+    intent = classify_intent(query, has_drug=has_drug)
+    print(f"{query!r}: {sorted(intent.labels)} clinical={intent.clinical} reimbursement={intent.reimbursement}")
+    assert intent.labels == frozenset(labels), intent
+    assert intent.clinical == clinical and intent.reimbursement == reimbursement, intent
+    if fields is not None:
+        assert intent.fields == frozenset(fields), intent
+
+
+def test_rules():
+    print("\n--- One rule per question type ---")
+    check("What is the dosage of Metformin?", {"dosage"}, True, False, {"dosage"})
+    check("Side effects of Cetirizine", {"side_effects"}, True, False, {"side_effects"})
+    check("What is Pantoprazole used for?", {"uses"}, True, False, {"uses", "therapeutic_class"})
+    check("Can I take Ibuprofen during pregnancy?", {"contraindications"}, True, False, {"contraindications"})
+    check("Generic substitutes for Augmentin", {"substitutes"}, True, False, {"substitutes"})
+    check("Is Alprazolam habit forming?", {"classification"}, True, False, CLASS_FIELDS)
+    check("Which schemes reimburse Telmisartan", {"reimbursement"}, False, True, set())
+    check("Compare Ibuprofen and Diclofenac", {"comparison"}, True, False, ALL_FIELDS)
+    # Word boundaries: "because" and "user" are not "use"
+    check("because the user asked about Metformin", {"overview"}, True, False)
+    print("OK")
+
+
+def test_combined_and_fallback():
+    print("\n--- Several rules, and the overview fallback ---")
+    check("Dosage and insurance coverage of Metformin", {"dosage", "reimbursement"}, True, True, {"dosage"})
+    # Unmatched questions about a drug: the clinical branch only
+    check("Tell me about Metformin", {"overview"}, True, False, ALL_FIELDS)
+    check("Metformin", {"overview"}, True, False, ALL_FIELDS)
+    check("is Metformin ok with alcohol?", {"overview"}, True, False, ALL_FIELDS)
+    # ...unless cost or coverage is asked for
+    check("Price of Metformin", {"reimbursement"}, False, True)
+    # No drug and nothing specific: nothing to retrieve
+    check("hello there", {"overview"}, False, False, set(), has_drug=False)
+    assert clinical_fields(classify_intent("Tell me about Metformin")) is None
+    assert clinical_fields(classify_intent("Dose of Metformin")) == ["dosage"]
+    print("OK")
+
+
+if __name__ == "__main__":
+    test_rules()
+    test_combined_and_fallback()
@@ -0,0 +1,93 @@
+import asyncio
+import os
+import tempfile
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import create_async_engine
+from core import migrations
+from models.models import Base
+
+# A database from before interning and monographs, as the original seed_db.py made it
+OLD_SCHEMA = [
+    "CREATE TABLE medicines (id INTEGER PRIMARY KEY, drug_name VARCHAR, substitutes TEXT, side_effects TEXT, uses TEXT, "
+    "chemical_class VARCHAR, habit_forming VARCHAR, therapeutic_class VARCHAR, action_class VARCHAR, dosage TEXT, contraindications TEXT)",
+    "CREATE INDEX ix_medicines_drug_name ON medicines (drug_name)",
+    "CREATE TABLE reimbursement_schemes (id INTEGER PRIMARY KEY, drug_name VARCHAR, scheme_type VARCHAR(7), plan_name VARCHAR, "
+    "coverage_percent FLOAT, copay_amount FLOAT, prior_authorization BOOLEAN)",
+    "CREATE INDEX ix_reimbursement_schemes_id ON reimbursement_schemes (id)",
+    "CREATE INDEX ix_reimbursement_schemes_drug_name ON reimbursement_schemes (drug_name)",
+    "INSERT INTO medicines (drug_name, therapeutic_class, habit_forming) VALUES "
+    "('Cetirizine', 'Allergy Medicines', 'No'), ('Levocetirizine', 'Allergy Medicines', 'No')",
+    "INSERT INTO reimbursement_schemes (drug_name, scheme_type, plan_name, coverage_percent) VALUES "
+    "('Cetirizine', 'GOVT', 'PMJAY', 100.0)",
+]
+
+
+async def test_upgrade_existing_database(path):
+    print("\n--- Upgrading a database from before migrations keeps its rows ---")
+    engine = create_async_engine(f"sqlite+aiosqlite:///{path}")
+    async with engine.begin() as conn:
+        for statement in OLD_SCHEMA:
+            await conn.execute(text(statement))
+    assert "missing table monographs" in await migrations.drift(engine)
+
+    ran = await migrations.upgrade(engine, target=1)
+    assert [m.version for m in ran] == [1]
+    ran = await migrations.upgrade(engine)
+    assert [m.version for m in ran] == [m.version for m in migrations.load_migrations()][1:], ran
+
+    async with engine.connect() as conn:
+        rows = (await conn.execute(text(
+            "SELECT m.drug_name, c.name FROM medicines m JOIN drug_classes c ON c.id = m.therapeutic_class_id ORDER BY m.id"
+        ))).all()
+        assert rows == [("Cetirizine", "Allergy Medicines"), ("Levocetirizine", "Allergy Medicines")], rows
+        plan = (await conn.execute(text(
+            "SELECT p.name FROM reimbursement_schemes s JOIN insurance_plans p ON p.id = s.plan_id"
+        ))).scalar()
+        assert plan == "PMJAY", plan
+    problems = await migrations.drift(engine)
+    assert problems == [], problems
+    assert await migrations.upgrade(engine) == [], "re-run should be a no-op"
+    print(f"Applied: {sorted(await migrations.applied(engine))}")
+    print("OK")
+    await engine.dispose()
+
+
+async def test_fresh_database_is_stamped(path):
+    print("\n--- A database built from the models is stamped at the latest version ---")
+    engine = create_async_engine(f"sqlite+aiosqlite:///{path}")
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+    await migrations.stamp(engine)
+    assert set(await migrations.applied(engine)) == {m.version for m in migrations.load_migrations()}
+    assert await migrations.upgrade(engine) == []
+    assert await migrations.drift(engine) == []
+    print("OK")
+    await engine.dispose()
+
+
+async def test_add_column_and_index(path):
+    print("\n--- Helpers add columns and indexes in place, once ---")
+    engine = create_async_engine(f"sqlite+aiosqlite:///{path}")
+    async with engine.begin() as conn:
+        op = migrations.Operations(conn, transactional=True)
+        assert await op.add_column("medicines", "pack_size", "INTEGER")
+        assert not await op.add_column("medicines", "pack_size", "INTEGER")
+        await op.create_index("ix_medicines_pack_size", "medicines", "pack_size")
+        await op.create_index("ix_medicines_pack_size", "medicines", "pack_size")
+        assert "ix_medicines_pack_size" in await op.indexes("medicines")
+    problems = await migrations.drift(engine)
+    print("\n".join(problems))
+    assert problems == ["unexpected column medicines.pack_size"], problems
+    print("OK")
+    await engine.dispose()
+
+
+async def test():
+    with tempfile.TemporaryDirectory() as tmp:
+        await test_upgrade_existing_database(os.path.join(tmp, "old.db"))
+        await test_fresh_database_is_stamped(os.path.join(tmp, "fresh.db"))
+        await test_add_column_and_index(os.path.join(tmp, "fresh.db"))
+
+
+if __name__ == "__main__":
+    asyncio.run(test())
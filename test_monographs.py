@@ -0,0 +1,69 @@
+import asyncio
+from core import metrics
+from core.catalogue import catalogue
+from core.intent import classify_intent
+from core.monographs import MonographStore, build_context, context_hash, matches_template, validate_answer
+
+
+def test_validate_answer():
+    print("\n--- Monograph validation ---")
+    assert validate_answer("**Metformin** is an antidiabetic.", "Metformin") == []
+    assert validate_answer("", "Metformin") == ["empty answer"]
+    print(validate_answer("Covered by Medicare [see plan]", "Metformin"))
+    assert len(validate_answer("Covered by Medicare [see plan]", "Metformin")) == 3
+    print("OK")
+
+
+async def test_lookup_checks_source_hash():
+    print("\n--- Monographs are served only while the source context is unchanged ---")
+    await catalogue.load()
+    query = "What is the dosage of Metformin?"
+    intent, context = await build_context("Metformin", query)
+    print(context)
+
+    store = MonographStore()
+    store.entries[("metformin", intent.labels)] = ("dosage", context_hash(context), "Stored monograph")
+    dose = "metformin dose?"
+    assert store.lookup("Metformin", classify_intent(dose), context, dose) == ("Stored monograph", True)
+    # Different intent, or edited source rows: not used
+    other = "Side effects of Metformin"
+    assert store.lookup("Metformin", classify_intent(other), context, other) == (None, False)
+    before = metrics.get("monographs.stale")
+    assert store.lookup("Metformin", intent, context + "\nDosage: revised", query) == (None, False)
+    assert metrics.get("monographs.stale") == before + 1
+    print("OK")
+
+
+async def test_only_template_questions_are_served():
+    print("\n--- Other questions about the drug get the monograph as context, not as the answer ---")
+    for query, expected in [
+        ("Tell me about Metformin", True),
+        ("metformin", True),
+        ("Tell me about Metformin please", True),
+        ("is Metformin ok with alcohol?", False),
+        ("Tell me about Metformin for my kidney disease", False),
+    ]:
+        print(f"{query!r}: {matches_template(query, 'Metformin', 'overview')}")
+        assert matches_template(query, "Metformin", "overview") == expected, query
+    assert matches_template("Metformin dose", "Metformin", "dosage")
+    assert not matches_template("What is the dosage of Metformin for a child?", "Metformin", "dosage")
+
+    query = "is Metformin ok with alcohol?"
+    intent, context = await build_context("Metformin", query)
+    assert intent.labels == {"overview"}
+    store = MonographStore()
+    store.entries[("metformin", intent.labels)] = ("overview", context_hash(context), "Stored overview")
+    hits = metrics.get("monographs.hits")
+    assert store.lookup("Metformin", intent, context, query) == ("Stored overview", False)
+    assert metrics.get("monographs.hits") == hits
+    print("OK")
+
+
+async def test():
+    test_validate_answer()
+    await test_lookup_checks_source_hash()
+    await test_only_template_questions_are_served()
+
+
+if __name__ == "__main__":
+    asyncio.run(test())
@@ -1,4 +1,10 @@
 import asyncio
+from core import metrics
+from core.catalogue import catalogue
+from core.name_index import name_index
+from core.singleflight import normalize_key
+from tools.clinical_tools import lookup_clinical_data
+from tools.commercial_tools import compare_reimbursement_schemes
 from tools.drug_db_tool import get_drug_details
 
 async def test():
@@ -12,5 +18,38 @@ async def test():
     result = await get_drug_details.ainvoke("Paracetamol, Ibuprofen")
     print(result)
 
+    # Clinical lookups: exact names come from the catalogue without touching the database
+    print("\n--- Testing Clinical Lookup (exact from memory, typo via fuzzy match) ---")
+    await name_index.load()
+    await catalogue.load()
+    queries = metrics.get("db.queries")
+    result = await lookup_clinical_data.ainvoke("cetirizine")
+    assert result.startswith("### Clinical Info: Cetirizine"), result
+    assert metrics.get("db.queries") == queries, "exact name went to the database"
+    result = await lookup_clinical_data.ainvoke("Centirizine")
+    print(result)
+    assert result.startswith("### Clinical Info: Cetirizine"), result
+    print("OK")
+
+    # Callers coalesced onto one lookup share its work, not its wording
+    print("\n--- Coalesced callers get answers worded from their own input ---")
+    assert all(normalize_key(key) == key for key in catalogue.by_name), "catalogue keyed apart from the flights"
+    assert catalogue.get("  CETIRIZINE ") is catalogue.get("cetirizine")
+    coalesced = metrics.get("singleflight.drug_details.coalesced")
+    first, second = await asyncio.gather(
+        get_drug_details.ainvoke("Citrizine"), get_drug_details.ainvoke("CITRIZINE "),
+    )
+    assert metrics.get("singleflight.drug_details.coalesced") == coalesced + 1
+    print(second.splitlines()[0])
+    assert "'Citrizine' not found" in first and "'CITRIZINE' not found" in second, (first, second)
+    coalesced = metrics.get("singleflight.reimbursement_schemes.coalesced")
+    first, second = await asyncio.gather(
+        compare_reimbursement_schemes.ainvoke("Cetirizine"), compare_reimbursement_schemes.ainvoke("CETIRIZINE"),
+    )
+    assert metrics.get("singleflight.reimbursement_schemes.coalesced") == coalesced + 1
+    assert first.startswith("### Reimbursement Schemes for Cetirizine:"), first
+    assert second.startswith("### Reimbursement Schemes for CETIRIZINE:"), second
+    print("OK")
+
 if __name__ == "__main__":
     asyncio.run(test())
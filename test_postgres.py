@@ -0,0 +1,114 @@
+import asyncio
+import os
+import shutil
+import socket
+import subprocess
+import sys
+import tempfile
+
+# Postgres backend checks against a throwaway local cluster (no Docker).
+# Needs the initdb/pg_ctl binaries on PATH (or PG_BIN) and asyncpg; skipped otherwise.
+
+
+def find_postgres():
+    candidates = [os.getenv("PG_BIN"), os.path.dirname(shutil.which("pg_ctl") or "")]
+    for directory in filter(None, candidates):
+        if all(os.path.exists(os.path.join(directory, tool)) for tool in ("initdb", "pg_ctl")):
+            return directory
+    return None
+
+
+def free_port():
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+async def run_checks():
+    from sqlalchemy import select, text
+    from core import metrics, migrations
+    from core.database import AsyncSessionLocal, engine, IS_POSTGRES
+    from tools.drug_db_tool import _resolve_drug
+    from tools.commercial_tools import compare_reimbursement_schemes
+    from models.models import Medicine
+
+    assert IS_POSTGRES
+
+    print("\n--- Migrations rebuild a missing trigram index concurrently ---")
+    async with engine.begin() as conn:
+        await conn.execute(text("DROP INDEX ix_medicines_drug_name_trgm"))
+        await conn.execute(text("DELETE FROM schema_migrations WHERE version = 3"))
+    ran = await migrations.upgrade(engine)
+    assert [m.version for m in ran] == [3], ran
+    assert await migrations.drift(engine) == []
+    print("OK")
+
+    print("\n--- Fuzzy resolution is one trigram query ---")
+    corrected_name, medicine = await _resolve_drug("Citrizine")
+    print(corrected_name)
+    assert medicine is not None and medicine.drug_name == "Cetirizine", medicine
+    result = await compare_reimbursement_schemes.ainvoke("Paracetamole")
+    assert "Reimbursement Schemes for Paracetamol" in result, result
+    assert metrics.get("fuzzy.trigram_queries") == 2, metrics.snapshot()
+    print("OK")
+
+    print("\n--- The trigram GIN index serves similarity and ILIKE ---")
+    async with AsyncSessionLocal() as session:
+        await session.execute(text("SET enable_seqscan = off"))
+        for condition in ("drug_name % 'Citrizine'", "drug_name ILIKE '%rizin%'"):
+            plan = (await session.execute(text(f"EXPLAIN SELECT drug_name FROM medicines WHERE {condition}"))).scalars().all()
+            print("\n".join(plan))
+            assert any("ix_medicines_drug_name_trgm" in line for line in plan)
+    print("OK")
+
+    print("\n--- Statements stay prepared on the connection ---")
+    async with AsyncSessionLocal() as session:
+        for name in ("Cetirizine", "Paracetamol", "Ibuprofen"):
+            await session.execute(select(Medicine.id).where(Medicine.drug_name == name))
+        prepared = (await session.execute(text("SELECT count(*) FROM pg_prepared_statements"))).scalar()
+        print(f"Prepared statements on this connection: {prepared}")
+        assert prepared >= 1
+    print("OK")
+    await engine.dispose()
+
+
+def main():
+    if "--inner" in sys.argv:
+        asyncio.run(run_checks())
+        return
+
+    bin_dir = find_postgres()
+    if bin_dir is None:
+        print("SKIPPED: no Postgres binaries (initdb, pg_ctl) on PATH; set PG_BIN to run")
+        return
+    if hasattr(os, "geteuid") and os.geteuid() == 0:
+        print("SKIPPED: initdb refuses to run as root")
+        return
+    try:
+        import asyncpg  # noqa: F401
+    except ImportError:
+        print("SKIPPED: asyncpg is not installed")
+        return
+
+    workdir = tempfile.mkdtemp(prefix="intellipharma-pg-")
+    data_dir = os.path.join(workdir, "data")
+    port = free_port()
+    pg_ctl = os.path.join(bin_dir, "pg_ctl")
+    subprocess.run([os.path.join(bin_dir, "initdb"), "-D", data_dir, "-U", "postgres", "--auth=trust"],
+                   check=True, stdout=subprocess.DEVNULL)
+    subprocess.run([pg_ctl, "-D", data_dir, "-w", "-l", os.path.join(workdir, "log"),
+                    "-o", f"-p {port} -k {workdir} -c listen_addresses=127.0.0.1", "start"],
+                   check=True, stdout=subprocess.DEVNULL)
+    try:
+        env = dict(os.environ, DATABASE_URL=f"postgresql://postgres@127.0.0.1:{port}/postgres",
+                   EXTRACTION_PROVIDER="stub", ANSWER_PROVIDER="stub")
+        for script in ("seed_db.py", "enrich_data.py"):
+            subprocess.run([sys.executable, script], env=env, check=True, stdout=subprocess.DEVNULL)
+        subprocess.run([sys.executable, __file__, "--inner"], env=env, check=True)
+    finally:
+        subprocess.run([pg_ctl, "-D", data_dir, "-m", "fast", "stop"], stdout=subprocess.DEVNULL)
+        shutil.rmtree(workdir, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,91 @@
+import asyncio
+import copy
+import os
+import tempfile
+
+# Record against the stub models, never a live provider; set before core.config is imported
+os.environ.setdefault("EXTRACTION_PROVIDER", "stub")
+os.environ.setdefault("ANSWER_PROVIDER", "stub")
+
+import httpx
+from api.index import app
+from core import traffic
+from core.catalogue import catalogue
+from core.name_index import name_index
+from replay_traffic import compare, load_cases, prepare, replay, summarize
+
+QUERIES = [
+    "What is the dosage of Metformin?",              # fast path, no LLM
+    "Compare Ibuprofen and Diclofenac",
+    "Side effects and reimbursement schemes of Paracetamol, call me on +91 98765 43210",
+]
+
+
+def test_sanitize():
+    print("\n--- Recorded text is sanitized ---")
+    text = traffic.sanitize("Mail a.b@example.com or call +91 98765 43210, PAN ABCDE1234F, Aadhaar 1234 5678 9012: Metformin 500mg")
+    print(text)
+    assert text == "Mail <email> or call <phone>, PAN <id>, Aadhaar <id>: Metformin 500mg"
+    print("OK")
+
+
+async def record(path):
+    print("\n--- Recording /api/chat traffic ---")
+    await name_index.load()
+    await catalogue.load()
+    traffic.recorder.path = path
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+        for query in QUERIES:
+            response = await client.post("/api/chat", json={"message": query})
+            assert response.status_code == 200
+    traffic.recorder.path = ""
+    cases = load_cases(path)
+    for case in cases:
+        print(case["query"], {stage: len(calls) for stage, calls in case["llm"].items()}, case["context_hash"])
+    assert [case["query"] for case in cases] == QUERIES[:2] + [QUERIES[2].replace("+91 98765 43210", "<phone>")]
+    assert cases[0]["llm"] == {} and cases[0]["answer"]
+    assert all(set(case["llm"]) == {"extraction", "answer"} and case["context"] for case in cases[1:])
+    print("OK")
+    return cases
+
+
+async def test_replay(cases):
+    print("\n--- Replaying with the recorded LLM outputs ---")
+    # A recorded answer the stub model could not produce: replay must return it verbatim
+    cases[1]["llm"]["answer"][0]["content"] = cases[1]["answer"] = "**Recorded answer**\n\n| Feature | Ibuprofen | Diclofenac |"
+    await prepare()
+    results = await replay(cases, repeat=2, warmup=1)
+    summary = summarize(cases, results)
+    print(summary)
+    assert not summary["context_changed"] and not summary["answer_changed"] and not summary["unrecorded_llm_calls"]
+    assert summary["prompt_tokens"] == summary["recorded_prompt_tokens"]
+    assert "total" in summary["stages"] and "wall" in summary["stages"]
+    assert summary["db_queries"] >= 0
+    print("OK")
+    return summary
+
+
+def test_compare(summary):
+    print("\n--- Regressions against a baseline ---")
+    assert compare(summary, summary, max_slowdown=1.25, min_ms=1.0, max_token_growth=0.02) == []
+    baseline = copy.deepcopy(summary)
+    baseline["db_queries"] = summary["db_queries"] - 1
+    baseline["prompt_tokens"]["answer"] = int(summary["prompt_tokens"]["answer"] * 0.9)
+    baseline["stages"]["total"]["p50"] = summary["stages"]["total"]["p50"] / 2 - 1
+    problems = compare(baseline, summary, max_slowdown=1.25, min_ms=1.0, max_token_growth=0.02)
+    print(problems)
+    assert len(problems) == 3, problems
+    print("OK")
+
+
+async def test():
+    test_sanitize()
+    with tempfile.TemporaryDirectory() as tmp:
+        cases = await record(os.path.join(tmp, "traffic.jsonl"))
+    summary = await test_replay(cases)
+    test_compare(summary)
+
+
+if __name__ == "__main__":
+    asyncio.run(test())
@@ -0,0 +1,67 @@
+import asyncio
+import os
+
+# Set before core.config is imported
+os.environ.setdefault("ADMIN_TOKEN", "test-admin-token")
+
+import httpx
+from sqlalchemy import text
+from api.index import app
+from core import metrics
+from core.config import settings
+from core.database import engine
+from core.store_refresh import StoreRefresher
+
+
+async def test_refresh_needs_admin_token():
+    print("\n--- POST /api/catalogue/refresh needs the admin token ---")
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+        url = "/api/catalogue/refresh"
+        assert (await client.post(url)).status_code == 403
+        assert (await client.post(url, headers={"Authorization": "Bearer wrong"})).status_code == 403
+        assert (await client.post(url, headers={"Authorization": settings.ADMIN_TOKEN})).status_code == 403
+        response = await client.post(url, headers={"Authorization": f"Bearer {settings.ADMIN_TOKEN}"})
+        print(response.status_code, response.json())
+        assert response.status_code == 200 and response.json()["records"] > 0
+    print("OK")
+
+
+async def test_other_workers_follow_data_changes():
+    print("\n--- A worker that was not asked reloads once the data changes ---")
+    worker = StoreRefresher(interval=0.05)
+    await worker.start()
+    async with engine.connect() as conn:
+        row_id, mrp = (await conn.execute(text("SELECT id, mrp FROM medicines ORDER BY id LIMIT 1"))).one()
+
+    async def write_and_wait(value):
+        reloads = metrics.get("stores.reloads")
+        # Let the file modification time move on, then write as an ingestion job would
+        await asyncio.sleep(0.05)
+        async with engine.begin() as conn:
+            await conn.execute(text("UPDATE medicines SET mrp = :mrp WHERE id = :id"), {"mrp": value, "id": row_id})
+        for _ in range(100):
+            if metrics.get("stores.reloads") > reloads:
+                break
+            await asyncio.sleep(0.05)
+        print(f"mrp {value}: reloads {reloads} -> {metrics.get('stores.reloads')}")
+        assert metrics.get("stores.reloads") == reloads + 1
+
+    try:
+        assert not await worker.refresh(), "nothing changed yet"
+        await write_and_wait((mrp or 0) + 1)
+        assert not await worker.refresh(), "reloaded once per change"
+    finally:
+        await write_and_wait(mrp)
+        await worker.stop()
+    print("OK")
+
+
+async def test():
+    await test_refresh_needs_admin_token()
+    await test_other_workers_follow_data_changes()
+    await engine.dispose()
+
+
+if __name__ == "__main__":
+    asyncio.run(test())
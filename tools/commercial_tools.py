@@ -1,7 +1,156 @@
+import numpy as np
 from langchain_core.tools import tool
 from sqlalchemy import select
-from core.database import AsyncSessionLocal
-from models.models import ReimbursementScheme, SchemeType, Medicine
+from core import dictionaries
+from core.database import AsyncSessionLocal, IS_POSTGRES
+from core.admission import db_slots
+from core.singleflight import SingleFlight, normalize_key
+from core.name_index import name_index
+from core.fuzzy import fuzzy_match, trigram_match
+from core.catalogue import catalogue, find_medicine
+from core.cost_engine import DrugCoverage, cost_table, patient_cost, rank
+from models.models import ReimbursementScheme, SchemeType, Medicine, plan_labels
+
+# Concurrent requests for the same drug share one scheme lookup
+scheme_flight = SingleFlight("reimbursement_schemes")
+
+async def _find_medicine(session, drug_name: str):
+    if catalogue.loaded:
+        record = catalogue.get(drug_name)
+        if record:
+            return record
+    return await find_medicine(session, Medicine.drug_name.ilike(drug_name))
+
+async def _db_coverage(session, drug_name: str):
+    """A drug's schemes straight from the database, for when the cost table is not loaded."""
+    stmt = select(
+        ReimbursementScheme.plan_id, ReimbursementScheme.scheme_type, ReimbursementScheme.coverage_percent,
+        ReimbursementScheme.copay_amount, ReimbursementScheme.prior_authorization, ReimbursementScheme.tier,
+    ).where(ReimbursementScheme.drug_name.ilike(drug_name))
+    rows = (await session.execute(stmt)).all()
+    if not rows:
+        return None
+    if any(row.plan_id is not None and row.plan_id not in plan_labels for row in rows):
+        await dictionaries.load(session)
+
+    medicine = await _find_medicine(session, drug_name)
+    mrp = medicine.mrp if medicine and medicine.mrp is not None else np.nan
+    coverage = np.array([row.coverage_percent or 0.0 for row in rows])
+    copay_amount = np.array([row.copay_amount or 0.0 for row in rows])
+    return DrugCoverage(
+        mrp=mrp,
+        plans=[plan_labels.get(row.plan_id) or "Unknown plan" for row in rows],
+        govt=np.array([row.scheme_type == SchemeType.GOVT for row in rows]),
+        coverage=coverage,
+        copay_amount=copay_amount,
+        cost=patient_cost(mrp, coverage, copay_amount),
+        prior_auth=np.array([bool(row.prior_authorization) for row in rows]),
+        tier=np.array([row.tier if row.tier is not None else np.nan for row in rows], dtype=float),
+    )
+
+async def _coverage(session, drug_name: str):
+    """From the in-memory cost table when it is loaded, otherwise from the database."""
+    if cost_table.loaded:
+        return cost_table.drug_coverage(drug_name)
+    return await _db_coverage(session, drug_name)
+
+async def _closest_scheme_name(session, drug_name: str):
+    if IS_POSTGRES:
+        # One indexed pg_trgm query instead of scanning every name
+        return await trigram_match(session, ReimbursementScheme.drug_name, drug_name, cutoff=0.5)
+    if name_index.loaded:
+        all_drugs = name_index.scheme_names
+    else:
+        result_all = await session.execute(select(ReimbursementScheme.drug_name).distinct())
+        all_drugs = result_all.scalars().all()
+    # cutoff=0.5 allows for "centrizine" -> "Cetirizine"
+    return await fuzzy_match(drug_name, all_drugs, cutoff=0.5)
+
+def _format_schemes(drug_name: str, medicine, coverage: DrugCoverage) -> str:
+    category = "General Medicine"
+    if medicine and medicine.therapeutic_class:
+        category = medicine.therapeutic_class
+    elif medicine and medicine.chemical_class:
+        # Fallback to chemical class if therapeutic class is missing
+        category = medicine.chemical_class
+
+    govt_schemes = []
+    private_schemes = []
+    mrp = coverage.mrp
+    copay_percent = 100 - np.floor(coverage.coverage)
+
+    # Out-of-pocket cost per plan at the drug's MRP, cheapest first (core.cost_engine)
+    for i in rank(coverage.cost, coverage.prior_auth, coverage.tier):
+        # Format requested:
+        # [Plan Name]: [Reimburses/Covers] [drug_name] under the "[Category]" category [financials].
+        # Govt -> "Reimburses", Private -> "Covers"
+        verb = "Reimburses" if coverage.govt[i] else "Covers"
+
+        financials = ""
+        if not coverage.govt[i]:
+            # Specific request: "with a co-pay of X%."
+            financials = f" with a co-pay of {int(copay_percent[i])}%"
+            if coverage.copay_amount[i]:
+                financials += f" plus ₹{coverage.copay_amount[i]:g} per claim"
+        financials += "."
+        if not np.isnan(coverage.cost[i]):
+            financials += f" Out of pocket: ₹{coverage.cost[i]:.2f} of ₹{mrp:.2f} MRP."
+        if coverage.prior_auth[i]:
+            financials += " Prior authorization required."
+
+        info = f"**{coverage.plans[i]}**: {verb} {drug_name} under the \"{category}\" category{financials}"
+
+        if coverage.govt[i]:
+            govt_schemes.append(info)
+        else:
+            private_schemes.append(info)
+
+    # Constructing Final Output
+    response = [f"### Reimbursement Schemes for {drug_name}:"]
+
+    if govt_schemes:
+        response.append("\n**Government Schemes:**")
+        response.extend([f"- {s}" for s in govt_schemes])
+
+    if private_schemes:
+        response.append("\n**Private Insurance Companies:**")
+        response.extend([f"- {s}" for s in private_schemes])
+
+    response.append("\n*Please note that reimbursement schemes and co-pays may vary depending on the specific policy, provider, and location. It is essential to verify the information with the relevant insurance company or healthcare provider for accurate details.*")
+
+    return "\n".join(response)
+
+async def _lookup_schemes(drug_name: str):
+    """
+    (corrected_name, medicine, coverage) for a drug; coverage is None when no
+    plan covers it. Shared by coalesced callers, so it holds no caller-worded text.
+    """
+    with open("debug.log", "a") as f:
+        f.write(f"\n[Tool] Input: {drug_name}\n")
+    # 1. Exact name with the cost table and catalogue in memory: no database work at all
+    if cost_table.loaded and catalogue.loaded:
+        coverage = cost_table.drug_coverage(drug_name)
+        if coverage is not None:
+            return None, catalogue.get(drug_name), coverage
+
+    async with db_slots, AsyncSessionLocal() as session:
+        corrected_name = None
+        coverage = await _coverage(session, drug_name)
+
+        if coverage is None:
+            # 1b. Closest scheme drug name ("centrizine" -> "Cetirizine")
+            corrected_name = await _closest_scheme_name(session, drug_name)
+            if corrected_name:
+                with open("debug.log", "a") as f:
+                    f.write(f"[Tool] Fuzzy Match: {drug_name} -> {corrected_name}\n")
+                coverage = await _coverage(session, corrected_name)
+
+            if coverage is None:
+                return corrected_name, None, None
+
+        # 2. Medicine details for the category (therapeutic class)
+        medicine = await _find_medicine(session, corrected_name or drug_name)
+        return corrected_name, medicine, coverage
 
 @tool
 async def compare_reimbursement_schemes(drug_name: str) -> str:
@@ -9,102 +158,13 @@ async def compare_reimbursement_schemes(drug_name: str) -> str:
     Compare reimbursement schemes for a specific drug.
     Separates government and private schemes and provides a financial comparison.
     """
-    async with AsyncSessionLocal() as session:
-        with open("debug.log", "a") as f:
-            f.write(f"\n[Tool] Input: {drug_name}\n")
-        try:
-            # 1. Fetch Reimbursement Schemes
-            stmt = select(ReimbursementScheme).where(
-                ReimbursementScheme.drug_name.ilike(drug_name)
-            )
-            result = await session.execute(stmt)
-            schemes = result.scalars().all()
-
-            if not schemes:
-                # 1b. Try Advanced Fuzzy Matching (Python-side)
-                # Fetch all variable drug names to find closest match
-                stmt_all = select(ReimbursementScheme.drug_name).distinct()
-                result_all = await session.execute(stmt_all)
-                all_drugs = result_all.scalars().all()
-                
-                import difflib
-                # cutoff=0.6 allows for "centrizine" -> "Cetirizine"
-                matches = difflib.get_close_matches(drug_name, all_drugs, n=1, cutoff=0.5)
-                
-                if matches:
-                    corrected_name = matches[0]
-                    with open("debug.log", "a") as f:
-                        f.write(f"[Tool] Fuzzy Match: {drug_name} -> {corrected_name}\n")
-                    # Query again with corrected name
-                    stmt = select(ReimbursementScheme).where(
-                        ReimbursementScheme.drug_name == corrected_name
-                    )
-                    result = await session.execute(stmt)
-                    schemes = result.scalars().all()
-                    
-                    # Update drug_name for display
-                    drug_name = corrected_name
-
-                if not schemes:
-                    return ""
-
-            # 2. Fetch Medicine Details for Category (Therapeutic Class)
-            stmt_med = select(Medicine).where(
-                Medicine.drug_name.ilike(drug_name)
-            )
-            result_med = await session.execute(stmt_med)
-            medicine = result_med.scalars().first()
-            
-            category = "General Medicine"
-            if medicine and medicine.therapeutic_class:
-                category = medicine.therapeutic_class
-            elif medicine and medicine.chemical_class:
-                # Fallback to chemical class if therapeutic class is missing
-                category = medicine.chemical_class
-
-            govt_schemes = []
-            private_schemes = []
-
-            for scheme in schemes:
-                # Format requested:
-                # [Plan Name]: [Reimburses/Covers] [drug_name] under the "[Category]" category [financials].
-                
-                # Logic:
-                # Govt -> "Reimburses"
-                # Private -> "Covers"
-                
-                verb = "Reimburses" if scheme.scheme_type == SchemeType.GOVT else "Covers"
-                
-                financials = ""
-                if scheme.scheme_type == SchemeType.PRIVATE:
-                    # Specific request: "with a co-pay of X%."
-                    # Calculate copay percentage if not stored directly
-                    copay_percent = 100 - int(scheme.coverage_percent)
-                    financials = f" with a co-pay of {copay_percent}%."
-                else:
-                    financials = "."
-
-                info = f"**{scheme.plan_name}**: {verb} {drug_name} under the \"{category}\" category{financials}"
-                
-                if scheme.scheme_type == SchemeType.GOVT:
-                    govt_schemes.append(info)
-                else:
-                    private_schemes.append(info)
-
-            # Constructing Final Output
-            response = [f"### Reimbursement Schemes for {drug_name}:"]
-            
-            if govt_schemes:
-                response.append("\n**Government Schemes:**")
-                response.extend([f"- {s}" for s in govt_schemes])
-                
-            if private_schemes:
-                response.append("\n**Private Insurance Companies:**")
-                response.extend([f"- {s}" for s in private_schemes])
-
-            response.append("\n*Please note that reimbursement schemes and co-pays may vary depending on the specific policy, provider, and location. It is essential to verify the information with the relevant insurance company or healthcare provider for accurate details.*")
-
-            return "\n".join(response)
-
-        except Exception as e:
-            return f"Error comparing schemes: {str(e)}"
+    try:
+        corrected_name, medicine, coverage = await scheme_flight.do(
+            normalize_key(drug_name), lambda: _lookup_schemes(drug_name)
+        )
+        if coverage is None:
+            return ""
+        # Displayed as this caller spelled it, or as the fuzzy match
+        return _format_schemes(corrected_name or drug_name, medicine, coverage)
+    except Exception as e:
+        return f"Error comparing schemes: {str(e)}"
@@ -1,72 +1,167 @@
+import asyncio
+from typing import Dict, Iterable, List, Optional
 from langchain_core.tools import tool
-from sqlalchemy import select
-from core.database import AsyncSessionLocal
+from sqlalchemy import select, func
+from core import dictionaries
+from core.catalogue import catalogue, find_medicine
+from core.database import AsyncSessionLocal, IS_POSTGRES
+from core.admission import db_slots
+from core.singleflight import SingleFlight, normalize_key
+from core.name_index import name_index
+from core.fuzzy import fuzzy_match, trigram_match
 from models.models import Medicine
 
+# Concurrent requests for the same drug share one resolution
+drug_flight = SingleFlight("drug_details")
+
+# Names per IN (...) query when resolving a batch without the catalogue
+RESOLVE_CHUNK_SIZE = 500
+
+# (Medicine attribute, label, fallback) in output order
+DETAIL_FIELDS = [
+    ("therapeutic_class", "Therapeutic Class", "N/A"),
+    ("action_class", "Action Class", "N/A"),
+    ("chemical_class", "Chemical Class", "N/A"),
+    ("habit_forming", "Habit Forming", "No"),
+    ("uses", "Uses", None),
+    ("dosage", "Dosage", "Consult physician"),
+    ("contraindications", "Contraindications", "Consult physician"),
+    ("side_effects", "Side Effects", "None listed"),
+    ("substitutes", "Substitutes", "None"),
+]
+
+async def _resolve_drug(drug_name: str):
+    """
+    Resolve a single drug (exact -> pattern -> fuzzy). Returns (corrected_name,
+    medicine), corrected_name being the fuzzy match or None. No caller-facing
+    text: callers coalesced onto this lookup word their own note (format_resolution).
+    """
+    corrected_name = None
+
+    # 1. Exact Match, straight from memory when the catalogue is loaded
+    if catalogue.loaded:
+        medicine = catalogue.get(drug_name)
+        if medicine:
+            return corrected_name, medicine
+
+    async with db_slots, AsyncSessionLocal() as session:
+        medicine = None
+        if not catalogue.loaded:
+            medicine = await find_medicine(session, Medicine.drug_name.ilike(drug_name))
+
+        # 2. Pattern Match
+        if not medicine:
+            medicine = await find_medicine(session, Medicine.drug_name.ilike(f"%{drug_name}%"))
+
+        # 3. Fuzzy Match (Robust Fallback)
+        if not medicine:
+            # Fetch all names to find closest match
+            # Optimized: Only fetch if input length > 3 to avoid noise
+            if len(drug_name) > 3:
+                if IS_POSTGRES:
+                    # One indexed pg_trgm query instead of scanning every name
+                    corrected_name = await trigram_match(session, Medicine.drug_name, drug_name, cutoff=0.6)
+                else:
+                    if name_index.loaded:
+                        all_drug_names = name_index.medicine_names
+                    else:
+                        stmt = select(Medicine.drug_name)
+                        result = await session.execute(stmt)
+                        all_drug_names = result.scalars().all()
+
+                    corrected_name = await fuzzy_match(drug_name, all_drug_names, cutoff=0.6)
+                
+                if corrected_name:
+                    medicine = await find_medicine(session, Medicine.drug_name == corrected_name)
+
+    return corrected_name, medicine
+
+async def resolve_drugs(drug_names: Iterable[str]) -> Dict[str, tuple]:
+    """
+    Resolve many drugs at once for batch runs; returns {normalize_key(name): (corrected_name, medicine)}.
+    Each distinct name is resolved once. Exact matches come from the catalogue
+    (or one IN query per chunk without it), and only the rest take the
+    per-name pattern/fuzzy path.
+    """
+    resolved = {}
+    pending = {}
+    for drug_name in drug_names:
+        key = normalize_key(drug_name)
+        if key in resolved or key in pending:
+            continue
+        medicine = catalogue.get(drug_name) if catalogue.loaded else None
+        if medicine:
+            resolved[key] = (None, medicine)
+        else:
+            pending[key] = drug_name
+
+    if pending and not catalogue.loaded:
+        keys = list(pending)
+        async with db_slots, AsyncSessionLocal() as session:
+            for start in range(0, len(keys), RESOLVE_CHUNK_SIZE):
+                chunk = [pending[key].strip().lower() for key in keys[start:start + RESOLVE_CHUNK_SIZE]]
+                result = await session.execute(select(Medicine).where(func.lower(Medicine.drug_name).in_(chunk)))
+                medicines = result.scalars().all()
+                await dictionaries.ensure_labels(session, medicines)
+                for medicine in medicines:
+                    key = normalize_key(medicine.drug_name)
+                    if key in pending and key not in resolved:
+                        resolved[key] = (None, medicine)
+        for key in resolved:
+            pending.pop(key, None)
+
+    # Pattern and fuzzy fallbacks; db_slots bounds how many run at once
+    fallbacks = await asyncio.gather(*(
+        drug_flight.do(key, lambda name=drug_name: _resolve_drug(name))
+        for key, drug_name in pending.items()
+    ))
+    resolved.update(zip(pending, fallbacks))
+    return resolved
+
+def format_resolution(drug_name: str, corrected_name, medicine, fields=None) -> List[str]:
+    """Output blocks for one resolved drug, as get_drug_details returns them, worded from this caller's drug_name."""
+    results = []
+    if corrected_name:
+        results.append(f"**Note**: '{drug_name}' not found. Showing results for closest match: **{corrected_name}**.\n")
+    if not medicine:
+        results.append(f"No details found for drug: {drug_name}")
+    else:
+        # Format Output (Comprehensive, or only the requested fields)
+        results.append(format_details(medicine, fields))
+    return results
+
+def format_details(medicine, fields=None) -> str:
+    """Format a Medicine (or catalogue record), restricted to `fields` when given."""
+    details = [f"Drug: {medicine.drug_name}"]
+    for attr, label, fallback in DETAIL_FIELDS:
+        if fields is not None and attr not in fields:
+            continue
+        value = getattr(medicine, attr)
+        if fallback:
+            value = value or fallback
+        details.append(f"{label}: {value}")
+    details.append("-" * 30)
+    return "\n".join(details)
+
 @tool
-async def get_drug_details(drug_names: str) -> str:
+async def get_drug_details(drug_names: str, fields: Optional[List[str]] = None) -> str:
     """
     Get detailed information about one or more drugs. 
     Input can be a single drug name or a comma-separated list of drug names.
     Returns comprehensive details including dosage, contraindications, and class.
+    Pass `fields` (Medicine column names) to return only those details.
     """
     drug_list = [d.strip() for d in drug_names.split(',')]
     results = []
 
-    async with AsyncSessionLocal() as session:
-        for drug_name in drug_list:
-            try:
-                # 1. Exact Match
-                stmt = select(Medicine).where(Medicine.drug_name.ilike(drug_name))
-                result = await session.execute(stmt)
-                medicine = result.scalars().first()
-
-                # 2. Pattern Match
-                if not medicine:
-                    stmt = select(Medicine).where(Medicine.drug_name.ilike(f"%{drug_name}%"))
-                    result = await session.execute(stmt)
-                    medicine = result.scalars().first()
-
-                # 3. Fuzzy Match (Robust Fallback)
-                if not medicine:
-                    # Fetch all names to find closest match
-                    # Optimized: Only fetch if input length > 3 to avoid noise
-                    if len(drug_name) > 3:
-                        stmt = select(Medicine.drug_name)
-                        result = await session.execute(stmt)
-                        all_drug_names = result.scalars().all()
-                        
-                        from difflib import get_close_matches
-                        matches = get_close_matches(drug_name, all_drug_names, n=1, cutoff=0.6)
-                        
-                        if matches:
-                            corrected_name = matches[0]
-                            stmt = select(Medicine).where(Medicine.drug_name == corrected_name)
-                            result = await session.execute(stmt)
-                            medicine = result.scalars().first()
-                            results.append(f"**Note**: '{drug_name}' not found. Showing results for closest match: **{corrected_name}**.\n")
-
-                if not medicine:
-                    results.append(f"No details found for drug: {drug_name}")
-                    continue
-
-                # Format Output (Comprehensive)
-                details = [
-                    f"Drug: {medicine.drug_name}",
-                    f"Therapeutic Class: {medicine.therapeutic_class or 'N/A'}",
-                    f"Action Class: {medicine.action_class or 'N/A'}",
-                    f"Chemical Class: {medicine.chemical_class or 'N/A'}",
-                    f"Habit Forming: {medicine.habit_forming or 'No'}",
-                    f"Uses: {medicine.uses}",
-                    f"Dosage: {medicine.dosage or 'Consult physician'}",
-                    f"Contraindications: {medicine.contraindications or 'Consult physician'}",
-                    f"Side Effects: {medicine.side_effects or 'None listed'}",
-                    f"Substitutes: {medicine.substitutes or 'None'}",
-                    "-" * 30 
-                ]
-                results.append("\n".join(details))
-
-            except Exception as e:
-                results.append(f"Error retrieving details for {drug_name}: {str(e)}")
+    for drug_name in drug_list:
+        try:
+            corrected_name, medicine = await drug_flight.do(
+                normalize_key(drug_name), lambda name=drug_name: _resolve_drug(name)
+            )
+            results.extend(format_resolution(drug_name, corrected_name, medicine, fields))
+
+        except Exception as e:
+            results.append(f"Error retrieving details for {drug_name}: {str(e)}")
     
     return "\n\n".join(results)
@@ -1,8 +1,32 @@
 import asyncio
+import random
 from sqlalchemy import select, func
+from core.columnar import ds, export_available, open_dataset
 from core.database import AsyncSessionLocal
 from models.models import Medicine
-import random
+
+SAMPLE_COLUMNS = ["drug_name", "uses", "side_effects", "substitutes", "therapeutic_class"]
+
+def print_sample(rows):
+    print("\nRandom Sample Verification:")
+    for row in rows:
+        print("-" * 40)
+        print(f"Name: {row['drug_name']}")
+        print(f"Uses: {row['uses']}")
+        print(f"Side Effects: {row['side_effects']}")
+        print(f"Substitutes: {row['substitutes']}")
+        print(f"Class: {row['therapeutic_class']}")
+
+def verify_export():
+    """The same checks on the columnar export, reading only the counted and sampled columns."""
+    dataset = open_dataset("medicines")
+    count = dataset.count_rows()
+    print(f"Total medicines in export: {count}")
+    # The filter runs inside the scan; only the two tested columns are decoded
+    missing = dataset.count_rows(filter=ds.field("uses").is_null() | ds.field("side_effects").is_null())
+    print(f"Missing uses or side effects: {missing}")
+    indices = sorted(random.sample(range(count), min(5, count)))
+    print_sample(dataset.take(indices, columns=SAMPLE_COLUMNS).to_pylist())
 
 async def verify():
     async with AsyncSessionLocal() as session:
@@ -12,20 +36,17 @@ async def verify():
         print(f"Total medicines in DB: {count}")
         
         # Get 5 random medicines
-        # Using a simple offset method for randomness on large table
-        random_ids = random.sample(range(1, count + 1), 5)
-        stmt = select(Medicine).where(Medicine.id.in_(random_ids))
+        # Sample existing rows rather than guessing IDs: IDs are not contiguous
+        # (deletes, failed batches). For full checks use check_data_quality.py
+        stmt = select(Medicine).order_by(func.random()).limit(5)
         result = await session.execute(stmt)
         medicines = result.scalars().all()
         
-        print("\nRandom Sample Verification:")
-        for m in medicines:
-            print("-" * 40)
-            print(f"Name: {m.drug_name}")
-            print(f"Uses: {m.uses}")
-            print(f"Side Effects: {m.side_effects}")
-            print(f"Substitutes: {m.substitutes}")
-            print(f"Class: {m.therapeutic_class}")
+        print_sample([{column: getattr(m, column) for column in SAMPLE_COLUMNS} for m in medicines])
 
 if __name__ == "__main__":
-    asyncio.run(verify())
+    # Prefer the columnar export (python3 export_catalogue.py) when there is one
+    if export_available("medicines"):
+        verify_export()
+    else:
+        asyncio.run(verify())